@@ -1,58 +1,245 @@
-# config.py (da aggiungere a .gitignore)
-API_KEY = ""
-PUBLISHER = ""
-DATASOURCE = ""
-
-# main script
-import json
-import requests
-import time
-from config import API_KEY, PUBLISHER, DATASOURCE
-
-def delete_element(element_id, api_key):
-    """Delete the element with the given ID."""
-    delete_url = f"https://proxy.onlim.com/api/ts/v1/kg/things/{element_id.split('/')[-1]}?ns=https://intendproject.eu/gate/&dryRun=false&force=true"
-    print(delete_url)
-
-    headers = {"x-api-key": api_key}
-    response = requests.delete(delete_url, headers=headers)
-    
-    if response.status_code == 200:
-        print(f"Successfully deleted element: {element_id}")
-    else:
-        print(f"Failed to delete element: {element_id}. Status code: {response.status_code}, Response: {response.text}")
-
-def add_element(payload, api_key, publisher, datasource):
-    """Add the element using the provided payload."""
-    url = "https://proxy.onlim.com/api/ts/v1/kg/things/imports"
-    headers = {
-        "x-api-key": api_key,
-        "x-publisher": publisher,
-        "x-datasource": datasource,
-        "Content-Type": "application/ld+json"
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-    
-    if response.status_code in [200, 201]:
-        print("element added successfully.")
-    else:
-        print(f"Failed to add element. Status code: {response.status_code}, Response: {response.text}")
-
-def main():
-    input_file = "Unit_1.jsonld" #file with knoledge graph content
-    
-    with open(input_file, "r") as f:
-        data = json.load(f)
-
-    for element_to_add in data:
-        element_id = element_to_add["@id"]
-        print(element_id)
-       
-        delete_element(element_id, API_KEY)
-        add_element([element_to_add], API_KEY, PUBLISHER, DATASOURCE)
-        
-        time.sleep(10)
-
-if __name__ == "__main__":
-    main()
+# config.py (da aggiungere a .gitignore)
+API_KEY = ""
+PUBLISHER = ""
+DATASOURCE = ""
+
+# main script
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+try:
+    from config import API_KEY, PUBLISHER, DATASOURCE
+except ImportError:
+    API_KEY = os.getenv("INCHAT_API_KEY", API_KEY)
+    PUBLISHER = os.getenv("INCHAT_PUBLISHER", PUBLISHER)
+    DATASOURCE = os.getenv("INCHAT_DATASOURCE", DATASOURCE)
+
+# Things API endpoint; point it at a local stub to test the sync without touching inChat
+THINGS_API_URL = os.getenv("INCHAT_THINGS_API_URL", "https://proxy.onlim.com/api/ts/v1/kg/things")
+THINGS_NAMESPACE = os.getenv("INCHAT_THINGS_NAMESPACE", "https://intendproject.eu/gate/")
+
+# Sync defaults
+DEFAULT_MANIFEST = "inchat_manifest.json"
+DEFAULT_RATE = 1.0         # requests per second
+DEFAULT_BURST = 5          # requests allowed back to back
+DEFAULT_CONCURRENCY = 4    # requests in flight
+DEFAULT_BATCH_SIZE = 50    # elements per import payload
+
+
+def delete_element(element_id, api_key, base_url=THINGS_API_URL, session=None):
+    """Delete the element with the given ID."""
+    delete_url = f"{base_url}/{element_id.split('/')[-1]}?ns={THINGS_NAMESPACE}&dryRun=false&force=true"
+    print(delete_url)
+
+    headers = {"x-api-key": api_key}
+    response = (session or requests).delete(delete_url, headers=headers)
+
+    if response.status_code == 200:
+        print(f"Successfully deleted element: {element_id}")
+        return True
+    elif response.status_code == 404:
+        # Already gone (e.g. an emptied datasource): nothing left to replace
+        print(f"Element not found, nothing to delete: {element_id}")
+        return True
+    else:
+        print(f"Failed to delete element: {element_id}. Status code: {response.status_code}, Response: {response.text}")
+        return False
+
+def add_element(payload, api_key, publisher, datasource, base_url=THINGS_API_URL, session=None):
+    """Add the element using the provided payload."""
+    url = f"{base_url}/imports"
+    headers = {
+        "x-api-key": api_key,
+        "x-publisher": publisher,
+        "x-datasource": datasource,
+        "Content-Type": "application/ld+json"
+    }
+
+    response = (session or requests).post(url, headers=headers, json=payload)
+
+    if response.status_code in [200, 201]:
+        print(f"{len(payload)} element(s) added successfully.")
+        return True
+    else:
+        print(f"Failed to add element. Status code: {response.status_code}, Response: {response.text}")
+        return False
+
+def element_hash(element):
+    """Content hash of an element, independent of key order."""
+    canonical = json.dumps(element, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def load_manifest(path):
+    """Load the {@id: hash} manifest of the last successful sync."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f).get("elements", {})
+
+def save_manifest(path, manifest):
+    """Atomically write the manifest so an interrupted sync never corrupts it."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": 1, "updated_at": time.time(), "elements": manifest}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def diff_elements(elements, manifest):
+    """Split elements into new, changed and removed compared to the manifest."""
+    current = {}
+    for element in elements:
+        current[element["@id"]] = (element, element_hash(element))
+
+    added = [element for element_id, (element, _) in current.items() if element_id not in manifest]
+    changed = [element for element_id, (element, digest) in current.items()
+               if element_id in manifest and manifest[element_id] != digest]
+    removed = [element_id for element_id in manifest if element_id not in current]
+    return added, changed, removed
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SyncEngine:
+    """Incrementally mirrors a JSON-LD element list into the inChat things API."""
+
+    def __init__(self, api_key, publisher, datasource, base_url=THINGS_API_URL,
+                 manifest_path=DEFAULT_MANIFEST, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE):
+        self.api_key = api_key
+        self.publisher = publisher
+        self.datasource = datasource
+        self.base_url = base_url
+        self.manifest_path = manifest_path
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.limiter = TokenBucket(rate, burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.manifest = load_manifest(manifest_path)
+        self.manifest_lock = threading.Lock()
+
+    def _delete(self, element_id):
+        self.limiter.acquire()
+        try:
+            deleted = delete_element(element_id, self.api_key, self.base_url, self.session)
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to delete element: {element_id}. Error: {str(e)}")
+            deleted = False
+        if deleted:
+            with self.manifest_lock:
+                self.manifest.pop(element_id, None)
+        return element_id, deleted
+
+    def _add(self, batch):
+        self.limiter.acquire()
+        try:
+            added = add_element(batch, self.api_key, self.publisher, self.datasource, self.base_url, self.session)
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to add {len(batch)} element(s). Error: {str(e)}")
+            added = False
+        if added:
+            with self.manifest_lock:
+                for element in batch:
+                    self.manifest[element["@id"]] = element_hash(element)
+        return len(batch), added
+
+    def sync(self, elements, dry_run=False, full=False):
+        """Push only new/changed elements and delete removed ones (full=True re-pushes everything); returns a summary."""
+        started = time.time()
+        added, changed, removed = diff_elements(elements, self.manifest)
+        if full:
+            # Only elements the manifest knows were pushed before and need replacing; the rest are just imported
+            pending = {element["@id"] for element in added + changed}
+            latest = {element["@id"]: element for element in elements}
+            changed = changed + [element for element_id, element in latest.items() if element_id not in pending]
+        unchanged = len(elements) - len(added) - len(changed)
+        print(f"{len(added)} new, {len(changed)} changed, {len(removed)} removed, {unchanged} unchanged")
+
+        summary = {"new": len(added), "changed": len(changed), "removed": len(removed),
+                   "unchanged": unchanged, "deleted": 0, "added": 0, "failed": 0}
+        if dry_run:
+            return summary
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            # Removed and changed elements are deleted first so the re-import replaces them
+            to_delete = removed + [element["@id"] for element in changed]
+            failed_deletes = set()
+            for element_id, ok in executor.map(self._delete, to_delete):
+                if ok:
+                    summary["deleted"] += 1
+                else:
+                    failed_deletes.add(element_id)
+                    summary["failed"] += 1
+            save_manifest(self.manifest_path, self.manifest)
+
+            # A changed element whose delete failed keeps its old hash and is retried next run
+            to_add = added + [element for element in changed if element["@id"] not in failed_deletes]
+            batches = [to_add[i:i + self.batch_size] for i in range(0, len(to_add), self.batch_size)]
+            for count, ok in executor.map(self._add, batches):
+                if ok:
+                    summary["added"] += count
+                else:
+                    summary["failed"] += count
+            save_manifest(self.manifest_path, self.manifest)
+
+        summary["seconds"] = round(time.time() - started, 2)
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally sync a KG file into inChat")
+    parser.add_argument("input_file", nargs="?", default="Unit_1.jsonld", help="file with knowledge graph content")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="hash manifest of the last sync")
+    parser.add_argument("--base-url", default=THINGS_API_URL, help="things API URL (e.g. a local stub)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="requests per second")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST, help="requests allowed back to back")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="requests in flight")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="elements per import")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and push every element")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    with open(args.input_file, "r") as f:
+        data = json.load(f)
+    elements = data.get("@graph", []) if isinstance(data, dict) else data
+
+    engine = SyncEngine(API_KEY, PUBLISHER, DATASOURCE, base_url=args.base_url,
+                        manifest_path=args.manifest, rate=args.rate, burst=args.burst,
+                        concurrency=args.concurrency, batch_size=args.batch_size)
+    summary = engine.sync(elements, dry_run=args.dry_run, full=args.full)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any
+
+# Limits apply per server worker process
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+ADMISSION_MAX_PER_REPOSITORY = int(os.getenv("ADMISSION_MAX_PER_REPOSITORY", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a query cannot get an execution slot; retry_after is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Global and per-repository concurrency limits with a bounded wait queue"""
+
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+                 max_per_repository: int = ADMISSION_MAX_PER_REPOSITORY,
+                 max_queue: int = ADMISSION_MAX_QUEUE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.max_per_repository = max_per_repository
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._running = 0
+        self._by_repository: Dict[str, int] = {}
+        self._waiting = 0
+        # Moving average of how long a slot is held, used for Retry-After hints
+        self._avg_hold = 1.0
+        self._counters = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    def _has_slot(self, repository: str) -> bool:
+        return (self._running < self.max_concurrent
+                and self._by_repository.get(repository, 0) < self.max_per_repository)
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_hold * (self._waiting + 1) / max(1, self.max_concurrent)))
+
+    def acquire(self, repository: str) -> float:
+        """Wait for a slot for the repository, returning the time it was granted"""
+        with self._cond:
+            if not self._has_slot(repository):
+                if self._waiting >= self.max_queue:
+                    self._counters["rejected_queue_full"] += 1
+                    raise AdmissionRejected("Server busy, query queue is full", self._retry_after())
+                self._waiting += 1
+                self._counters["queued"] += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while not self._has_slot(repository):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._counters["rejected_timeout"] += 1
+                            raise AdmissionRejected("Server busy, timed out waiting for a query slot",
+                                                    self._retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._running += 1
+            self._by_repository[repository] = self._by_repository.get(repository, 0) + 1
+            self._counters["admitted"] += 1
+            return time.monotonic()
+
+    def release(self, repository: str, granted_at: float):
+        with self._cond:
+            self._running -= 1
+            remaining = self._by_repository.get(repository, 1) - 1
+            if remaining:
+                self._by_repository[repository] = remaining
+            else:
+                self._by_repository.pop(repository, None)
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * (time.monotonic() - granted_at)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, repository: str):
+        """Hold an execution slot for the duration of the block"""
+        granted_at = self.acquire(repository)
+        try:
+            yield
+        finally:
+            self.release(repository, granted_at)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_per_repository": self.max_per_repository,
+                "max_queue": self.max_queue,
+                "queue_timeout_seconds": self.queue_timeout,
+                "running": self._running,
+                "running_by_repository": dict(self._by_repository),
+                "waiting": self._waiting,
+                "avg_hold_seconds": round(self._avg_hold, 3),
+                "counters": dict(self._counters),
+            }
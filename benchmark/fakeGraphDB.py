@@ -0,0 +1,178 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+DEFAULT_LATENCY_MS = 5.0
+DEFAULT_ROWS = 100
+
+_REPOSITORY_RE = re.compile(r'^/repositories/([^/]+)(/.*)?$')
+
+
+class FakeGraphDBConfig:
+    """Latency and payload settings shared by every request handler"""
+
+    def __init__(self, latency_ms=DEFAULT_LATENCY_MS, jitter_ms=0.0, rows=DEFAULT_ROWS,
+                 repositories=("second-graph",), seed=42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rows = rows
+        self.repositories = list(repositories)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_received = 0
+        self._select_body = None
+
+    def delay(self):
+        """Sleep for the configured latency plus uniform jitter"""
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000.0)
+
+    def select_body(self):
+        """SPARQL JSON results with the configured number of rows, built once"""
+        if self._select_body is None:
+            bindings = [{
+                "s": {"type": "uri", "value": f"https://intendproject.eu/fill/Machine{i}"},
+                "p": {"type": "uri", "value": f"https://intendproject.eu/schema/property{i % 17}"},
+                "o": {"type": "literal", "value": f"value {i}",
+                      "datatype": "http://www.w3.org/2001/XMLSchema#string"},
+            } for i in range(self.rows)]
+            self._select_body = json.dumps({"head": {"vars": ["s", "p", "o"]},
+                                            "results": {"bindings": bindings}}).encode("utf-8")
+        return self._select_body
+
+
+def make_handler(config):
+    """
+    Build a request handler class answering the GraphDB REST calls inGraph makes
+
+    Args:
+        config (FakeGraphDBConfig): Latency and payload settings
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _drain(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                body = self.rfile.read(length)
+            elif self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                parts = []
+                while True:
+                    size = int(self.rfile.readline().strip() or b"0", 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        break
+                    parts.append(self.rfile.read(size))
+                    self.rfile.readline()
+                body = b"".join(parts)
+            else:
+                body = b""
+            with config.lock:
+                config.requests += 1
+                config.bytes_received += len(body)
+            return body
+
+        def _send(self, status, body=b"", content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._drain()
+            config.delay()
+            path = urlparse(self.path).path
+            if path == "/rest/repositories":
+                return self._send(200, json.dumps([
+                    {"id": name, "title": name, "uri": f"http://fake/repositories/{name}",
+                     "type": "graphdb", "readable": True, "writable": True, "state": "RUNNING"}
+                    for name in config.repositories]).encode("utf-8"))
+            match = _REPOSITORY_RE.match(path)
+            if not match:
+                return self._send(404, b"Unknown endpoint", "text/plain")
+            rest = match.group(2) or ""
+            if rest == "/size":
+                return self._send(200, str(config.rows * 10).encode("ascii"), "text/plain")
+            if rest == "/contexts":
+                return self._send(200, json.dumps({"head": {"vars": ["contextID"]}, "results": {"bindings": [
+                    {"contextID": {"type": "uri", "value": f"https://intendproject.eu/graph/kg{i}"}}
+                    for i in range(3)]}}).encode("utf-8"))
+            return self._send(200, config.select_body(), "application/sparql-results+json")
+
+        def do_POST(self):
+            body = self._drain()
+            config.delay()
+            match = _REPOSITORY_RE.match(urlparse(self.path).path)
+            if not match:
+                return self._send(201 if self.path.startswith("/rest/repositories") else 404)
+            if (match.group(2) or "") == "/statements":
+                return self._send(204)
+            if re.search(rb'\bASK\b', body, re.IGNORECASE):
+                return self._send(200, b'{"head":{},"boolean":true}', "application/sparql-results+json")
+            return self._send(200, config.select_body(), "application/sparql-results+json")
+
+        def do_PUT(self):
+            self._drain()
+            config.delay()
+            self._send(204)
+
+        def do_DELETE(self):
+            self._drain()
+            config.delay()
+            self._send(204)
+
+    return Handler
+
+
+def start_fake_graphdb(config, host="127.0.0.1", port=0):
+    """
+    Start the fake server on a background thread
+
+    Args:
+        config (FakeGraphDBConfig): Latency and payload settings
+        host (str): Interface to bind
+        port (int): Port to bind, 0 picks a free one
+
+    Returns:
+        ThreadingHTTPServer: The running server; its base URL is http://host:server.server_port
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-graphdb", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in GraphDB server with configurable latency and payload size")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7200)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS, help="Delay added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the delay")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows returned by every SELECT")
+    args = parser.parse_args()
+
+    config = FakeGraphDBConfig(args.latency_ms, args.jitter_ms, args.rows)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"Fake GraphDB listening on http://{args.host}:{args.port} "
+          f"({args.latency_ms} ms latency, {args.rows} rows per SELECT)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
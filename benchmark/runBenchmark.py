@@ -0,0 +1,360 @@
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+import requests
+
+from fakeGraphDB import FakeGraphDBConfig, start_fake_graphdb, DEFAULT_LATENCY_MS, DEFAULT_ROWS
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+FIXTURES = [os.path.join(REPO_ROOT, "KG", name)
+            for name in ("fillKG.jsonld", "gateKG_fixed.jsonld", "telenorKG.jsonld")]
+QUERY_DIR = os.path.join(REPO_ROOT, "query_test")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+# Requests per scenario when --requests is not given; uploads convert whole KG files and are much slower
+DEFAULT_REQUESTS = {"query": 2000, "query-cached": 2000, "update": 1000, "upload": 60, "info": 2000}
+SUBJECTS_PER_SCENARIO = 200
+
+# Runs the app under the threaded development server, the same way for every scenario
+_SERVE_APP = (
+    "import sys; sys.path.insert(0, sys.argv[1]);"
+    "from werkzeug.serving import make_server; import inGraphApp;"
+    "make_server('127.0.0.1', int(sys.argv[2]), inGraphApp.app, threaded=True).serve_forever()"
+)
+
+
+def fixture_subjects(paths, limit):
+    """
+    Collect node IRIs from the KG fixtures to vary query and update targets
+
+    Args:
+        paths (list): JSON-LD fixture files
+        limit (int): Maximum number of IRIs to return
+    """
+    subjects = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+        nodes = document.get("@graph", []) if isinstance(document, dict) else document
+        subjects.extend(node["@id"] for node in nodes if isinstance(node, dict) and "@id" in node)
+    # A stable shuffle (not hash(), which is randomised per process) so every fixture is represented
+    return sorted(set(subjects), key=lambda iri: (zlib.crc32(iri.encode("utf-8")), iri))[:limit]
+
+
+def read_query(name):
+    with open(os.path.join(QUERY_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class Scenario:
+    """A named request generator: build(i) returns (method, path, requests keyword arguments)"""
+
+    def __init__(self, name, description, build):
+        self.name = name
+        self.description = description
+        self.build = build
+
+
+def build_scenarios(repository):
+    """
+    Define the load scenarios, all driven by the KG fixtures and the sample queries in query_test/
+
+    Args:
+        repository (str): Repository name sent with every request
+    """
+    subjects = fixture_subjects(FIXTURES, SUBJECTS_PER_SCENARIO)
+    machine_query = read_query("machine5-query.sparql")
+    insert_query = read_query("query_insert.sparql")
+    fixtures = []
+    for path in FIXTURES:
+        with open(path, "rb") as f:
+            fixtures.append((os.path.basename(path), f.read()))
+
+    def query(i, cache):
+        subject = subjects[i % (len(subjects) if not cache else 10)]
+        text = machine_query.replace("<https://intendproject.eu/fill/Machine5>", f"<{subject}>")
+        return "POST", "/query", {"data": {"query": text, "repository": repository,
+                                           "cache": "true" if cache else "false"}}
+
+    def update(i):
+        subject = subjects[i % len(subjects)]
+        text = (insert_query.replace("intend:Machine5", f"<{subject}>")
+                .replace("Production Machine 558", f"Benchmark label {i}"))
+        return "POST", "/update", {"data": {"query": text, "repository": repository}}
+
+    def upload(i):
+        name, content = fixtures[i % len(fixtures)]
+        return "POST", "/upload", {"data": {"repository": repository, "mode": "full", "count": "false"},
+                                   "files": {"file": (name, content, "application/ld+json")}}
+
+    def info(i):
+        return "GET", f"/repository/{repository}/info", {}
+
+    return {scenario.name: scenario for scenario in [
+        Scenario("query", "POST /query, a different fixture subject per request, result cache bypassed",
+                 lambda i: query(i, cache=False)),
+        Scenario("query-cached", "POST /query over 10 fixture subjects with the result cache on",
+                 lambda i: query(i, cache=True)),
+        Scenario("update", "POST /update, query_insert.sparql rewritten per fixture subject", update),
+        Scenario("upload", "POST /upload of fillKG, gateKG_fixed and telenorKG in turn (local conversion)", upload),
+        Scenario("info", "GET /repository/<name>/info (catalogue, size and named graphs)", info),
+    ]}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(graphdb_url, workdir, env_overrides):
+    """
+    Start inGraphApp in its own process so its memory can be measured apart from the load generator
+
+    Returns:
+        tuple: (process, base URL)
+    """
+    port = free_port()
+    env = dict(os.environ, GRAPHDB_BASE_URL=graphdb_url, **env_overrides)
+    process = subprocess.Popen([sys.executable, "-c", _SERVE_APP, REPO_ROOT, str(port)], cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"inGraphApp exited with code {process.returncode} during startup")
+        try:
+            requests.get(f"{base_url}/limits", timeout=1)
+            return process, base_url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("inGraphApp did not start within 30 seconds")
+
+
+def peak_rss_mb(pid):
+    """Peak resident set size of a running process from /proc (Linux only), None elsewhere"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def children_peak_rss_mb():
+    """Largest peak RSS of any reaped child process (kilobytes on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run_load(base_url, scenario, total, concurrency, warmup):
+    """
+    Send scenario requests from a pool of client threads (closed loop: each sends its next request
+    as soon as the previous one completes)
+
+    Args:
+        base_url (str): inGraphApp URL
+        scenario (Scenario): Request generator
+        total (int): Measured requests
+        concurrency (int): Client threads
+        warmup (int): Unmeasured requests sent first
+    """
+    for i in range(warmup):
+        method, path, kwargs = scenario.build(i)
+        requests.request(method, base_url + path, timeout=120, **kwargs)
+
+    lock = threading.Lock()
+    counter = [0]
+    latencies = []
+    statuses = {}
+    received = [0]
+
+    def client():
+        session = requests.Session()
+        while True:
+            with lock:
+                i = counter[0]
+                if i >= total:
+                    return
+                counter[0] += 1
+            method, path, kwargs = scenario.build(warmup + i)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, timeout=120, **kwargs)
+                status = str(response.status_code)
+                size = len(response.content)
+            except requests.exceptions.RequestException:
+                status, size = "error", 0
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+                received[0] += size
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    succeeded = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "succeeded": succeeded,
+        "errors": len(latencies) - succeeded,
+        "status_codes": statuses,
+        "concurrency": concurrency,
+        "duration_s": round(wall, 3),
+        "throughput_rps": round(succeeded / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(1000 * sum(ordered) / len(ordered), 2) if ordered else 0.0,
+            "p50": round(1000 * percentile(ordered, 0.50), 2),
+            "p90": round(1000 * percentile(ordered, 0.90), 2),
+            "p99": round(1000 * percentile(ordered, 0.99), 2),
+            "max": round(1000 * ordered[-1], 2) if ordered else 0.0,
+        },
+        "bytes_received": received[0],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """Print throughput and latency changes per scenario against a previous result file"""
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    print(f"{'scenario':<14}{'rps':>20}{'p50 ms':>22}{'p99 ms':>22}{'peak RSS MB':>22}")
+
+    def change(old, new):
+        if old in (None, 0) or new is None:
+            return f"{new}"
+        return f"{new} ({(new - old) / old * 100:+.1f}%)"
+
+    for name, result in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if not old:
+            continue
+        print(f"{name:<14}{change(old['throughput_rps'], result['throughput_rps']):>20}"
+              f"{change(old['latency_ms']['p50'], result['latency_ms']['p50']):>22}"
+              f"{change(old['latency_ms']['p99'], result['latency_ms']['p99']):>22}"
+              f"{change(old.get('peak_rss_mb'), result.get('peak_rss_mb')):>22}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inGraphApp against a local GraphDB stand-in")
+    parser.add_argument("--scenarios", nargs="+", default=None,
+                        help="Scenarios to run (default: all). Use --list to see them")
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    parser.add_argument("--requests", type=int, default=None, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client threads")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each scenario")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS, help="Fake GraphDB latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Fake GraphDB latency jitter")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows per fake SELECT result")
+    parser.add_argument("--repository", default="second-graph", help="Repository name used in requests")
+    parser.add_argument("--app-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Environment variable for the app process (repeatable)")
+    parser.add_argument("--output", help="Result file (default: benchmark/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(args.repository)
+    if args.list:
+        for scenario in scenarios.values():
+            print(f"{scenario.name:<14}{scenario.description}")
+        return
+    selected = args.scenarios or list(scenarios)
+    unknown = [name for name in selected if name not in scenarios]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}")
+    app_env = dict(item.split("=", 1) for item in args.app_env)
+
+    config = FakeGraphDBConfig(args.latency_ms, args.jitter_ms, args.rows, repositories=[args.repository])
+    graphdb = start_fake_graphdb(config)
+    graphdb_url = f"http://127.0.0.1:{graphdb.server_port}"
+
+    commit = git_commit()
+    result = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "fake_graphdb": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "rows": args.rows},
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "app_env": app_env,
+        },
+        "scenarios": {},
+    }
+
+    for name in selected:
+        scenario = scenarios[name]
+        total = args.requests or DEFAULT_REQUESTS[name]
+        print(f"▶ {name}: {total} requests, {args.concurrency} clients")
+        # A fresh app process per scenario keeps caches and peak RSS from leaking between scenarios
+        with tempfile.TemporaryDirectory(prefix="ingraph-bench-") as workdir:
+            process, base_url = start_app(graphdb_url, workdir, app_env)
+            try:
+                stats = run_load(base_url, scenario, total, args.concurrency, args.warmup)
+                stats["peak_rss_mb"] = peak_rss_mb(process.pid)
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+            if stats["peak_rss_mb"] is None:
+                stats["peak_rss_mb"] = children_peak_rss_mb()
+        stats["description"] = scenario.description
+        result["scenarios"][name] = stats
+        print(f"  {stats['throughput_rps']} req/s, p50 {stats['latency_ms']['p50']} ms, "
+              f"p99 {stats['latency_ms']['p99']} ms, errors {stats['errors']}, peak RSS {stats['peak_rss_mb']} MB")
+
+    graphdb.shutdown()
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{commit or 'nogit'}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n📄 Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
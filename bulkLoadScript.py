@@ -0,0 +1,376 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from uploadScript import post_jsonld
+
+DEFAULT_CHUNK_BYTES = 256 * 1024
+DEFAULT_MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+MULTIPART_OVERHEAD = 4 * 1024  # headroom for form fields and multipart boundaries
+
+
+def expand_paths(patterns):
+    """
+    Resolve directories, globs and file names into a sorted list of JSON-LD files
+
+    Args:
+        patterns (list): Directories, glob patterns or file paths
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*.jsonld")) + glob.glob(os.path.join(pattern, "*.json"))
+        else:
+            matches = glob.glob(pattern)
+        files.extend(path for path in matches if os.path.isfile(path))
+    return sorted(set(files))
+
+
+def estimate_triples(node):
+    """
+    Estimate the number of triples a JSON-LD node object produces
+
+    Args:
+        node: Node object, value object or list from an expanded/compacted JSON-LD document
+    """
+    if isinstance(node, list):
+        return sum(estimate_triples(item) for item in node)
+    if not isinstance(node, dict):
+        return 1
+    if "@value" in node:
+        return 1
+    if "@list" in node:
+        # Each list item needs rdf:first and rdf:rest
+        return 2 * len(node["@list"]) + 1
+
+    triples = 0
+    for key, value in node.items():
+        if key == "@type":
+            triples += len(value) if isinstance(value, list) else 1
+        elif not key.startswith("@"):
+            values = value if isinstance(value, list) else [value]
+            for item in values:
+                if isinstance(item, dict) and "@value" not in item and "@list" not in item and len(item) > 1:
+                    # Nested node: the linking triple plus its own triples
+                    triples += 1 + estimate_triples(item)
+                else:
+                    triples += estimate_triples(item)
+    return triples
+
+
+class Chunk:
+    """A slice of one file's @graph that is uploaded as its own JSON-LD document"""
+
+    def __init__(self, source, index, context, nodes):
+        self.source = source
+        self.index = index
+        self.context = context
+        self.nodes = nodes  # list of (serialised node, estimated triples)
+
+    @property
+    def triples(self):
+        return sum(triples for _, triples in self.nodes)
+
+    @property
+    def name(self):
+        stem = os.path.splitext(os.path.basename(self.source))[0]
+        return f"{stem}.part{self.index:04d}.jsonld"
+
+    def payload(self):
+        """Build the chunk document, keeping the file's shared @context"""
+        graph = "[" + ",".join(serialised for serialised, _ in self.nodes) + "]"
+        if self.context is None:
+            return graph.encode("utf-8")
+        return ('{"@context":' + json.dumps(self.context, separators=(",", ":")) +
+                ',"@graph":' + graph + '}').encode("utf-8")
+
+    def split(self):
+        """Split the chunk into two halves, used when the server rejects it as too large"""
+        middle = len(self.nodes) // 2
+        return (Chunk(self.source, self.index, self.context, self.nodes[:middle]),
+                Chunk(self.source, self.index, self.context, self.nodes[middle:]))
+
+
+def iter_chunks(file_path, max_chunk_bytes):
+    """
+    Split a JSON-LD file's @graph into chunks below max_chunk_bytes that share its @context
+
+    Args:
+        file_path (str): Path to the JSON-LD file
+        max_chunk_bytes (int): Upper bound for a serialised chunk
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        document = json.load(f)
+
+    if isinstance(document, list):
+        context, nodes = None, document
+    elif isinstance(document, dict) and "@graph" in document:
+        context, nodes = document.get("@context"), document["@graph"]
+    else:
+        context = document.pop("@context", None) if isinstance(document, dict) else None
+        nodes = [document]
+
+    context_bytes = len(json.dumps(context, separators=(",", ":"))) if context is not None else 0
+    budget = max_chunk_bytes - context_bytes - 32
+
+    index = 0
+    current, current_bytes = [], 0
+    for node in nodes:
+        serialised = json.dumps(node, separators=(",", ":"), ensure_ascii=False)
+        size = len(serialised.encode("utf-8")) + 1
+        if current and current_bytes + size > budget:
+            yield Chunk(file_path, index, context, current)
+            index += 1
+            current, current_bytes = [], 0
+        current.append((serialised, estimate_triples(node)))
+        current_bytes += size
+    if current:
+        yield Chunk(file_path, index, context, current)
+
+
+class BulkLoader:
+    """Uploads chunked JSON-LD files concurrently through the /upload endpoint"""
+
+    def __init__(self, server_url, repository, parallel, max_chunk_bytes, retries, timeout=600):
+        self.server_url = server_url.rstrip("/")
+        self.repository = repository
+        self.parallel = parallel
+        self.retries = retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=parallel)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.max_chunk_bytes = min(max_chunk_bytes, self._server_limit() - MULTIPART_OVERHEAD)
+
+        self._lock = threading.Lock()
+        self.chunks_done = 0
+        self.chunks_total = 0
+        self.chunks_failed = 0
+        self.triples_done = 0
+        self.triples_estimated = 0  # Part of triples_done counted from the JSON-LD instead of by the server
+        self.bytes_done = 0
+        self.started_at = None
+
+    def _server_limit(self):
+        """Ask the server for its MAX_CONTENT_LENGTH, falling back to the default"""
+        try:
+            response = self.session.get(f"{self.server_url}/limits", timeout=10)
+            if response.status_code == 200:
+                return int(response.json().get("max_content_length", DEFAULT_MAX_CONTENT_LENGTH))
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        return DEFAULT_MAX_CONTENT_LENGTH
+
+    def upload_chunk(self, chunk):
+        """
+        Upload one chunk, retrying transient failures and splitting it when it is too large
+
+        Args:
+            chunk (Chunk): Chunk to upload
+        """
+        payload = chunk.payload()
+        for attempt in range(self.retries + 1):
+            try:
+                response = post_jsonld(payload, chunk.name, self.repository, self.server_url,
+                                       session=self.session, count=False, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+            else:
+                if response.status_code == 200:
+                    self._record(chunk, len(payload), parsed_triples(response))
+                    return True
+                if response.status_code == 413 and len(chunk.nodes) > 1:
+                    # The server limit is lower than expected: halve and try again
+                    first, second = chunk.split()
+                    with self._lock:
+                        self.chunks_total += 1
+                    return self.upload_chunk(first) & self.upload_chunk(second)
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    break
+
+            if attempt < self.retries:
+                time.sleep(0.5 * (2 ** attempt))
+
+        with self._lock:
+            self.chunks_failed += 1
+        print(f"❌ {chunk.name} failed after {attempt + 1} attempt(s): {error}")
+        return False
+
+    def _record(self, chunk, size, parsed):
+        with self._lock:
+            self.chunks_done += 1
+            triples = parsed if parsed is not None else chunk.triples
+            self.triples_done += triples
+            if parsed is None:
+                self.triples_estimated += triples
+            self.bytes_done += size
+            elapsed = max(time.time() - self.started_at, 1e-6)
+            print(f"[{self.chunks_done}/{self.chunks_total} chunks] {chunk.name}: "
+                  f"{'~' if parsed is None else ''}{triples} triples, {size / 1024:.0f} KB "
+                  f"({self.triples_done / elapsed:,.0f} triples/s)")
+
+    def load(self, files):
+        """
+        Chunk and upload every file, pipelining chunking with the uploads already in flight
+
+        Args:
+            files (list): JSON-LD file paths
+        """
+        self.started_at = time.time()
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            for file_path in files:
+                try:
+                    for chunk in iter_chunks(file_path, self.max_chunk_bytes):
+                        with self._lock:
+                            self.chunks_total += 1
+                        futures.append(executor.submit(self.upload_chunk, chunk))
+                except (OSError, ValueError) as e:
+                    print(f"❌ Skipping {file_path}: {str(e)}")
+                    with self._lock:
+                        self.chunks_failed += 1
+            results = [future.result() for future in as_completed(futures)]
+
+        elapsed = time.time() - self.started_at
+        return {
+            "files": len(files),
+            "chunks": self.chunks_total,
+            "chunks_failed": self.chunks_failed,
+            "triples": self.triples_done,
+            "triples_estimated": self.triples_estimated,
+            "bytes": self.bytes_done,
+            "seconds": round(elapsed, 3),
+            "triples_per_second": round(self.triples_done / elapsed, 1) if elapsed else 0.0,
+            "success": all(results) and self.chunks_failed == 0,
+        }
+
+    def create_repository(self, profile):
+        """
+        Create the target repository with a configuration profile
+
+        Args:
+            profile (str): Profile name, e.g. bulk-load
+        """
+        response = self.session.post(f"{self.server_url}/repositories/create",
+                                     data={"id": self.repository, "profile": profile}, timeout=self.timeout)
+        if response.status_code != 201:
+            raise RuntimeError(f"Could not create '{self.repository}': HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def switch_profile(self, profile):
+        """
+        Switch the target repository to another profile once the data is loaded
+
+        Args:
+            profile (str): Serving profile name, e.g. read-optimized
+        """
+        response = self.session.post(f"{self.server_url}/repository/{self.repository}/profile",
+                                     data={"profile": profile}, timeout=None)
+        if response.status_code != 200:
+            raise RuntimeError(f"Could not switch '{self.repository}' to '{profile}': "
+                               f"HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def repository_size(self):
+        """Return the repository triple count reported by the server, if available"""
+        try:
+            response = self.session.get(f"{self.server_url}/repository/{self.repository}/size", timeout=30)
+            if response.status_code == 200:
+                return response.json().get("size")
+        except requests.exceptions.RequestException:
+            pass
+        return None
+
+
+def parsed_triples(response):
+    """Triples the server converted from an uploaded chunk, or None when it loaded the JSON-LD without converting"""
+    try:
+        conversion = response.json().get("conversion")
+    except ValueError:
+        return None
+    return conversion.get("triples") if isinstance(conversion, dict) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load JSON-LD knowledge graphs through the inGraph API")
+    parser.add_argument("paths", nargs="+", help="JSON-LD files, directories or glob patterns (e.g. KG/ or 'KG/*.jsonld')")
+    parser.add_argument("-r", "--repository", default="second-graph", help="Target repository")
+    parser.add_argument("-s", "--server-url", default="http://localhost:5000", help="inGraph server URL")
+    parser.add_argument("-j", "--parallel", type=int, default=os.cpu_count() or 4, help="Concurrent chunk uploads")
+    parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES,
+                        help="Maximum chunk size in bytes (capped by the server's MAX_CONTENT_LENGTH)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per failed chunk")
+    parser.add_argument("--provision", metavar="PROFILE",
+                        help="Create the repository in the bulk-load profile first, then switch it to PROFILE "
+                             "(e.g. read-optimized) once everything is loaded")
+    args = parser.parse_args()
+
+    files = expand_paths(args.paths)
+    if not files:
+        print("Error: no JSON-LD files matched")
+        return 1
+
+    loader = BulkLoader(args.server_url, args.repository, max(1, args.parallel), args.chunk_bytes, args.retries)
+    print(f"Loading {len(files)} file(s) into '{args.repository}' with {loader.parallel} parallel uploads "
+          f"(chunks up to {loader.max_chunk_bytes / 1024:.0f} KB)...")
+
+    phases = {}
+    size_before = None
+    if args.provision:
+        started = time.time()
+        try:
+            loader.create_repository("bulk-load")
+        except (RuntimeError, requests.exceptions.RequestException) as e:
+            print(f"Error: {str(e)}")
+            return 1
+        phases["create"] = round(time.time() - started, 3)
+        print(f"Created '{args.repository}' with the bulk-load profile in {phases['create']}s")
+        size_before = 0
+    else:
+        size_before = loader.repository_size()
+
+    summary = loader.load(files)
+    phases["load"] = summary["seconds"]
+
+    if args.provision and summary["success"]:
+        print(f"Switching '{args.repository}' to the {args.provision} profile (indexes and inference)...")
+        started = time.time()
+        try:
+            switched = loader.switch_profile(args.provision)
+        except (RuntimeError, requests.exceptions.RequestException) as e:
+            print(f"Error: {str(e)}")
+            return 1
+        phases["switch"] = round(time.time() - started, 3)
+        print(f"Switched to ruleset {switched['ruleset']} in {phases['switch']}s {switched['phases']}")
+    summary["repository_size"] = loader.repository_size()
+
+    # Chunks loaded without server-side conversion only have an estimate from the JSON-LD structure
+    if summary["triples_estimated"]:
+        loaded = f"{summary['triples']} triples ({summary['triples_estimated']} estimated, not counted by the server)"
+    else:
+        loaded = f"{summary['triples']} triples"
+    print(f"\n{'🎉' if summary['success'] else '💥'} Loaded {loaded} in "
+          f"{summary['chunks']} chunks from {summary['files']} file(s) in {summary['seconds']}s "
+          f"({summary['triples_per_second']:,.0f} triples/s, {summary['chunks_failed']} failed)")
+    if summary["repository_size"] is not None:
+        size = int(summary["repository_size"])
+        change = f" ({size - int(size_before):+d})" if size_before is not None else ""
+        print(f"Repository size: {size} triples{change}")
+    if args.provision:
+        print("Phases: " + ", ".join(f"{name} {seconds}s" for name, seconds in phases.items()))
+    return 0 if summary["success"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
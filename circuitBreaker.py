@@ -0,0 +1,118 @@
+import os
+import math
+import time
+import threading
+from typing import Dict, Any
+
+import requests
+
+# Consecutive upstream failures that open the circuit, and how long it stays open before a trial request
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "10"))
+CIRCUIT_HALF_OPEN_MAX = int(os.getenv("CIRCUIT_HALF_OPEN_MAX", "1"))  # Trial requests let through while half-open
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class BackendUnavailable(requests.exceptions.ConnectionError):
+    """Raised instead of calling GraphDB while the circuit is open; retry_after is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fails GraphDB calls fast after repeated failures, then lets a few trial requests through to recover"""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+                 half_open_max: int = CIRCUIT_HALF_OPEN_MAX):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._counters = {"opened": 0, "short_circuited": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def retry_after(self) -> int:
+        with self._lock:
+            if self._state != OPEN:
+                return 1
+            return max(1, math.ceil(self.reset_timeout - (time.monotonic() - self._opened_at)))
+
+    def available(self) -> bool:
+        """Whether a request could currently be sent, without claiming a half-open trial"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                return self._cooled_down()
+            return self._trials < self.half_open_max
+
+    def allow_request(self) -> bool:
+        """Claim permission to call GraphDB; every allowed call must be followed by record_success/failure"""
+        with self._lock:
+            if self._state == OPEN and self._cooled_down():
+                self._state = HALF_OPEN
+                self._trials = 0
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._trials < self.half_open_max:
+                self._trials += 1
+                return True
+            self._counters["short_circuited"] += 1
+            return False
+
+    def check(self):
+        """Raise BackendUnavailable unless a request may be sent"""
+        if not self.allow_request():
+            raise BackendUnavailable("GraphDB is unavailable (circuit open), failing fast",
+                                     self.retry_after())
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._trials = 0
+            elif self._state == OPEN:
+                # A successful health probe: let trial traffic through instead of waiting out the timeout
+                self._state = HALF_OPEN
+                self._trials = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._open()
+            elif self._state == OPEN:
+                self._opened_at = time.monotonic()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trials = 0
+        self._counters["opened"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "open_for_seconds": round(time.monotonic() - self._opened_at, 1) if self._state == OPEN else 0,
+                "counters": dict(self._counters),
+            }
@@ -0,0 +1,258 @@
+import os
+import json
+from typing import Optional, Dict, Any, List, Tuple
+
+# Namespaces of the INTEND knowledge graphs, matched before falling back to splitting IRIs at '/' or '#'
+DEFAULT_PREFIXES = [
+    "https://intendproject.eu/schema/",
+    "https://intendproject.eu/telenor/",
+    "https://intendproject.eu/gate/",
+    "https://intendproject.eu/fill/",
+    "https://aeros.eu/schema/",
+    "https://semantify.it/ds/",
+    "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "http://www.w3.org/2000/01/rdf-schema#",
+    "http://www.w3.org/2001/XMLSchema#",
+    "http://www.w3.org/2002/07/owl#",
+]
+COLUMNAR_PREFIXES = [prefix for prefix in os.getenv("COLUMNAR_PREFIXES", ",".join(DEFAULT_PREFIXES)).split(",") if prefix]
+
+COLUMNAR_CONTENT_TYPES = {
+    'columnar': 'application/vnd.ingraph.columnar+json',
+    'columnar-bin': 'application/vnd.ingraph.columnar',
+}
+
+FORMAT_NAME = "ingraph-columnar"
+FORMAT_VERSION = 1
+BINARY_MAGIC = b"IGC1"
+
+# Term kinds; also the first byte of every term in the binary variant
+KIND_IRI, KIND_LITERAL, KIND_TYPED, KIND_LANG, KIND_BNODE = range(5)
+_KIND_NAMES = {KIND_IRI: "u", KIND_LITERAL: "l", KIND_TYPED: "t", KIND_LANG: "g", KIND_BNODE: "b"}
+_KIND_CODES = {name: code for code, name in _KIND_NAMES.items()}
+
+
+class _PrefixTable:
+    """Assigns small indexes to the namespaces IRIs are split into"""
+
+    def __init__(self, known: List[str]):
+        # Longest first so nested namespaces win
+        self.known = sorted(known, key=len, reverse=True)
+        self.prefixes: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def split(self, iri: str) -> Tuple[int, str]:
+        prefix = next((known for known in self.known if iri.startswith(known)), None)
+        if prefix is None:
+            cut = max(iri.rfind('#'), iri.rfind('/'))
+            if cut <= 0:
+                return -1, iri
+            prefix = iri[:cut + 1]
+        index = self._index.get(prefix)
+        if index is None:
+            index = self._index[prefix] = len(self.prefixes)
+            self.prefixes.append(prefix)
+        return index, iri[len(prefix):]
+
+
+def encode_columnar(results: Dict[str, Any], prefixes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Turn SPARQL JSON results into dictionary-encoded columns (JSON variant)"""
+    if 'boolean' in results:
+        return {"format": FORMAT_NAME, "version": FORMAT_VERSION, "boolean": bool(results['boolean'])}
+
+    variables = results.get('head', {}).get('vars', [])
+    bindings = results.get('results', {}).get('bindings', [])
+    table = _PrefixTable(COLUMNAR_PREFIXES if prefixes is None else prefixes)
+    terms: List[List[Any]] = []
+    term_index: Dict[Tuple, int] = {}
+    columns: Dict[str, List[int]] = {var: [] for var in variables}
+
+    for row in bindings:
+        for var in variables:
+            term = row.get(var)
+            if term is None:
+                columns[var].append(-1)
+                continue
+            key = (term.get('type'), term.get('value'), term.get('datatype'), term.get('xml:lang'))
+            index = term_index.get(key)
+            if index is None:
+                index = term_index[key] = len(terms)
+                terms.append(_encode_term(term, table))
+            columns[var].append(index)
+
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "vars": variables,
+        "rows": len(bindings),
+        "prefixes": table.prefixes,
+        "terms": terms,
+        "columns": columns,
+    }
+
+
+def _encode_term(term: Dict[str, str], table: _PrefixTable) -> List[Any]:
+    term_type = term.get('type')
+    value = term.get('value', '')
+    if term_type == 'uri':
+        return ["u", *table.split(value)]
+    if term_type == 'bnode':
+        return ["b", value]
+    if term.get('xml:lang'):
+        return ["g", value, term['xml:lang']]
+    if term.get('datatype'):
+        return ["t", value, *table.split(term['datatype'])]
+    return ["l", value]
+
+
+def _decode_term(encoded: List[Any], prefixes: List[str]) -> Dict[str, str]:
+    kind = encoded[0]
+    if kind == "u":
+        return {"type": "uri", "value": (prefixes[encoded[1]] if encoded[1] >= 0 else '') + encoded[2]}
+    if kind == "b":
+        return {"type": "bnode", "value": encoded[1]}
+    if kind == "g":
+        return {"type": "literal", "value": encoded[1], "xml:lang": encoded[2]}
+    if kind == "t":
+        datatype = (prefixes[encoded[2]] if encoded[2] >= 0 else '') + encoded[3]
+        return {"type": "literal", "value": encoded[1], "datatype": datatype}
+    return {"type": "literal", "value": encoded[1]}
+
+
+def columnar_to_sparql_json(columnar: Dict[str, Any]) -> Dict[str, Any]:
+    """Expand a columnar result back into standard SPARQL JSON results"""
+    if 'boolean' in columnar:
+        return {"head": {}, "boolean": columnar['boolean']}
+    prefixes = columnar['prefixes']
+    terms = [_decode_term(term, prefixes) for term in columnar['terms']]
+    variables = columnar['vars']
+    columns = [columnar['columns'][var] for var in variables]
+    bindings = []
+    for row in range(columnar['rows']):
+        bindings.append({var: terms[column[row]] for var, column in zip(variables, columns) if column[row] >= 0})
+    return {"head": {"vars": variables}, "results": {"bindings": bindings}}
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_string(out: bytearray, value: str):
+    data = value.encode('utf-8')
+    _write_varint(out, len(data))
+    out += data
+
+
+def encode_columnar_binary(columnar: Dict[str, Any]) -> bytes:
+    """Serialise a columnar result as varint-packed bytes (binary variant)"""
+    # magic, flags (0 table, 1 false, 2 true), vars, row count, prefixes, terms,
+    # then one varint per cell column by column (term index + 1, 0 when unbound)
+    out = bytearray(BINARY_MAGIC)
+    if 'boolean' in columnar:
+        out.append(2 if columnar['boolean'] else 1)
+        return bytes(out)
+    out.append(0)
+
+    _write_varint(out, len(columnar['vars']))
+    for var in columnar['vars']:
+        _write_string(out, var)
+    _write_varint(out, columnar['rows'])
+    _write_varint(out, len(columnar['prefixes']))
+    for prefix in columnar['prefixes']:
+        _write_string(out, prefix)
+
+    _write_varint(out, len(columnar['terms']))
+    for term in columnar['terms']:
+        kind = _KIND_CODES[term[0]]
+        out.append(kind)
+        if kind == KIND_IRI:
+            _write_varint(out, term[1] + 1)
+            _write_string(out, term[2])
+        elif kind == KIND_TYPED:
+            _write_string(out, term[1])
+            _write_varint(out, term[2] + 1)
+            _write_string(out, term[3])
+        elif kind == KIND_LANG:
+            _write_string(out, term[1])
+            _write_string(out, term[2])
+        else:
+            _write_string(out, term[1])
+
+    for var in columnar['vars']:
+        for index in columnar['columns'][var]:
+            _write_varint(out, index + 1)
+    return bytes(out)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def byte(self) -> int:
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def varint(self) -> int:
+        shift = value = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def string(self) -> str:
+        length = self.varint()
+        value = self.data[self.pos:self.pos + length].decode('utf-8')
+        self.pos += length
+        return value
+
+
+def decode_columnar_binary(data: bytes) -> Dict[str, Any]:
+    """Parse the binary variant back into the columnar JSON structure"""
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError("Not an inGraph columnar payload")
+    reader = _Reader(data)
+    reader.pos = 4
+    flags = reader.byte()
+    if flags:
+        return {"format": FORMAT_NAME, "version": FORMAT_VERSION, "boolean": flags == 2}
+
+    variables = [reader.string() for _ in range(reader.varint())]
+    rows = reader.varint()
+    prefixes = [reader.string() for _ in range(reader.varint())]
+    terms = []
+    for _ in range(reader.varint()):
+        kind = reader.byte()
+        if kind == KIND_IRI:
+            terms.append(["u", reader.varint() - 1, reader.string()])
+        elif kind == KIND_TYPED:
+            terms.append(["t", reader.string(), reader.varint() - 1, reader.string()])
+        elif kind == KIND_LANG:
+            terms.append(["g", reader.string(), reader.string()])
+        else:
+            terms.append([_KIND_NAMES[kind], reader.string()])
+    columns = {var: [reader.varint() - 1 for _ in range(rows)] for var in variables}
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "vars": variables,
+        "rows": rows,
+        "prefixes": prefixes,
+        "terms": terms,
+        "columns": columns,
+    }
+
+
+def encode_results(body: bytes, output_format: str) -> bytes:
+    """Re-encode a SPARQL JSON response body in one of the columnar formats"""
+    columnar = encode_columnar(json.loads(body))
+    if output_format == 'columnar-bin':
+        return encode_columnar_binary(columnar)
+    return json.dumps(columnar, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
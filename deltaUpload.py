@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Any, List, Tuple, Optional, Set
+
+from rdfConvert import JsonLdConverter, Triple, ntriples_line, canonicalise_blank_nodes, iri_term
+
+# Where per-(repository, source file) subject fingerprints are kept
+DELTA_STATE_FOLDER = os.getenv("DELTA_STATE_FOLDER", os.path.join("uploads", "delta_state"))
+
+
+def subject_fingerprints(document: Any) -> Dict[str, Tuple[str, List[Triple]]]:
+    """Map each top-level subject to (fingerprint, triples), nested blank nodes included"""
+    grouped: Dict[str, List[Triple]] = {}
+    for subject, triples in JsonLdConverter(document).iter_subjects():
+        if subject.startswith('_:'):
+            # Top-level blank nodes cannot be addressed later, so key them by their content
+            canonical = canonicalise_blank_nodes(triples)
+            subject = '_:' + hashlib.sha1(''.join(sorted(map(ntriples_line, canonical))).encode('utf-8')).hexdigest()
+        grouped.setdefault(subject, []).extend(triples)
+
+    fingerprints = {}
+    for subject, triples in grouped.items():
+        lines = sorted(set(map(ntriples_line, canonicalise_blank_nodes(triples))))
+        digest = hashlib.sha256(''.join(lines).encode('utf-8')).hexdigest()
+        fingerprints[subject] = (digest, triples)
+    return fingerprints
+
+
+def plan_delta(previous: Dict[str, str],
+               current: Dict[str, Tuple[str, List[Triple]]]) -> Dict[str, List[str]]:
+    """Compare stored fingerprints with a new version of the file"""
+    added = [subject for subject in current if subject not in previous]
+    changed = [subject for subject, (digest, _) in current.items()
+               if subject in previous and previous[subject] != digest]
+    removed = [subject for subject in previous if subject not in current]
+    unchanged = len(current) - len(added) - len(changed)
+    return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged}
+
+
+def _is_blank(term: str) -> bool:
+    return term.startswith('_:')
+
+
+def previous_triples(stored: Dict[str, List[List[str]]], subjects: List[str]) -> List[Triple]:
+    """Triples stored for the given subjects, with blank node labels made distinct per subject"""
+    triples = []
+    for index, subject in enumerate(subjects):
+        for s, p, o in stored.get(subject, []):
+            triples.append(tuple(f"_:d{index}{term[2:]}" if _is_blank(term) else term for term in (s, p, o)))
+    return triples
+
+
+def blank_node_structures(triples: List[Triple]) -> List[List[Triple]]:
+    """Connected blank node structures, each starting with the statement that holds its root, at any depth
+
+    A structure hangs off a named subject, or is a top-level blank node with its own statements.
+    """
+    by_subject: Dict[str, List[Triple]] = {}
+    for triple in triples:
+        if _is_blank(triple[0]):
+            by_subject.setdefault(triple[0], []).append(triple)
+    roots = [triple for triple in triples if not _is_blank(triple[0]) and _is_blank(triple[2])]
+    roots += [statements[0] for statements in by_subject.values()]
+
+    reached = set()
+    structures = []
+    for root in roots:
+        node = root[0] if _is_blank(root[0]) else root[2]
+        if node in reached:
+            continue
+        reached.add(node)
+        members = [] if _is_blank(root[0]) else [root]
+        pending = [node]
+        while pending:
+            for triple in by_subject.get(pending.pop(), []):
+                members.append(triple)
+                if _is_blank(triple[2]) and triple[2] not in reached:
+                    reached.add(triple[2])
+                    pending.append(triple[2])
+        structures.append(members)
+    return structures
+
+
+def build_delta_update(delete_triples: List[Triple], insert_triples: List[Triple],
+                       graph: Optional[str] = None, keep: Optional[Set[str]] = None) -> str:
+    """Generate one SPARQL update that removes exactly the given triples and inserts new ones, optionally in a named graph
+
+    Ground triples whose N-Triples line is in keep (still asserted by this or another source) are not deleted.
+    A SPARQL update cannot name blank nodes, so each blank node structure is deleted by matching its whole
+    shape, one copy per structure.
+    """
+    operations = []
+    graph_term = iri_term(graph) if graph else None
+    keep = keep or set()
+
+    def in_graph(body: str) -> str:
+        return f"GRAPH {graph_term} {{ {body} }}" if graph else body
+
+    def data_block(triples: List[Triple]) -> str:
+        body = ''.join('  ' + ntriples_line(triple) for triple in triples)
+        return f"  GRAPH {graph_term} {{\n{body}  }}\n" if graph else body
+
+    ground = [triple for triple in dict.fromkeys(delete_triples)
+              if not _is_blank(triple[0]) and not _is_blank(triple[2]) and ntriples_line(triple) not in keep]
+    if ground:
+        operations.append(f"DELETE DATA {{\n{data_block(ground)}}}")
+
+    # Identical structures are matched together so that each copy is a different blank node
+    shapes: Dict[Tuple[Triple, ...], int] = {}
+    for structure in blank_node_structures(delete_triples):
+        shape = tuple(canonicalise_blank_nodes(structure))
+        shapes[shape] = shapes.get(shape, 0) + 1
+    template, where = [], []
+    variables = 0
+    for shape, copies in shapes.items():
+        patterns, names, roots = [], [], []
+        for _ in range(copies):
+            labels = {term: f"?b{variables + n}" for n, term in
+                      enumerate(dict.fromkeys(t for triple in shape for t in triple if _is_blank(t)))}
+            variables += len(labels)
+            patterns.extend(' '.join(labels.get(term, term) for term in triple) + ' .' for triple in shape)
+            names.extend(labels.values())
+            roots.append(labels['_:c0'])
+        conditions = [f"isBlank({name})" for name in names]
+        conditions += [f"{a} != {b}" for n, a in enumerate(roots) for b in roots[n + 1:]]
+        pattern = ' '.join(patterns)
+        template.append(pattern)
+        # A structure that is already gone leaves its variables unbound, so the others are still deleted
+        match = in_graph(f"{pattern} FILTER({' && '.join(conditions)})")
+        where.append(f"  OPTIONAL {{ SELECT {' '.join(names)} WHERE {{ {match} }} LIMIT 1 }}")
+    if template:
+        operations.append(f"DELETE {{ {in_graph(' '.join(template))} }}\nWHERE {{\n" + '\n'.join(where) + "\n}")
+
+    if insert_triples:
+        operations.append(f"INSERT DATA {{\n{data_block(insert_triples)}}}")
+    return ' ;\n'.join(operations)
+
+
+class DeltaStateStore:
+    """File-backed store of the subject fingerprints and triples last loaded per (repository, source)"""
+
+    def __init__(self, folder: str = DELTA_STATE_FOLDER):
+        self.folder = folder
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, repository: str, source: str, graph: Optional[str] = None) -> str:
+        key = hashlib.sha1(f"{repository}\n{source}\n{graph or ''}".encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, f"{key}.json")
+
+    def lock(self, repository: str, source: str, graph: Optional[str] = None) -> threading.Lock:
+        """Lock serialising delta uploads of the same source into the same repository and graph"""
+        path = self._path(repository, source, graph)
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def load(self, repository: str, source: str,
+             graph: Optional[str] = None) -> Tuple[Dict[str, str], Optional[Dict[str, List[List[str]]]]]:
+        """Stored (fingerprints, triples per subject); triples is None for state written without them"""
+        path = self._path(repository, source, graph)
+        if not os.path.exists(path):
+            return {}, {}
+        with open(path, 'r') as f:
+            state = json.load(f)
+        return state.get("subjects", {}), state.get("triples")
+
+    def other_sources_triples(self, repository: str, source: str, graph: Optional[str] = None) -> Set[str]:
+        """N-Triples lines of the ground triples other sources loaded into the same repository and graph"""
+        lines = set()
+        for name in os.listdir(self.folder):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.folder, name), 'r') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if state.get("repository") != repository or state.get("graph") != graph or state.get("source") == source:
+                continue
+            for triples in (state.get("triples") or {}).values():
+                lines.update(ntriples_line(triple) for triple in triples
+                             if not _is_blank(triple[0]) and not _is_blank(triple[2]))
+        return lines
+
+    def save(self, repository: str, source: str, fingerprints: Dict[str, str],
+             graph: Optional[str] = None, triples: Optional[Dict[str, List[Triple]]] = None):
+        """Atomically replace the stored fingerprints and the triples behind them"""
+        path = self._path(repository, source, graph)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "repository": repository,
+                "source": source,
+                "graph": graph,
+                "updated_at": time.time(),
+                "subjects": fingerprints,
+                "triples": {subject: [list(triple) for triple in canonicalise_blank_nodes(subject_triples)]
+                            for subject, subject_triples in (triples or {}).items()}
+            }, f)
+        os.replace(tmp_path, path)
+
+    def forget(self, repository: str, graph: Optional[str] = None, all_graphs: bool = True):
+        """Drop stored state of a repository, or only of one graph (None is the default graph)"""
+        for name in os.listdir(self.folder):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                with open(path, 'r') as f:
+                    state = json.load(f)
+                if state.get("repository") == repository and (all_graphs or state.get("graph") == graph):
+                    os.remove(path)
+            except (OSError, ValueError):
+                continue
@@ -0,0 +1,198 @@
+import os
+import time
+import threading
+import logging
+from typing import Optional, Dict, Any, Tuple, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from circuitBreaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Connection pool configuration
+GRAPHDB_POOL_CONNECTIONS = int(os.getenv("GRAPHDB_POOL_CONNECTIONS", "4"))
+GRAPHDB_POOL_MAXSIZE = int(os.getenv("GRAPHDB_POOL_MAXSIZE", "32"))
+GRAPHDB_POOL_BLOCK = os.getenv("GRAPHDB_POOL_BLOCK", "false").lower() == "true"
+
+# Retry configuration (only applied to idempotent reads)
+GRAPHDB_MAX_RETRIES = int(os.getenv("GRAPHDB_MAX_RETRIES", "2"))
+GRAPHDB_RETRY_BACKOFF = float(os.getenv("GRAPHDB_RETRY_BACKOFF", "0.2"))
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+# (connect, read) timeouts in seconds per route class
+GRAPHDB_CONNECT_TIMEOUT = float(os.getenv("GRAPHDB_CONNECT_TIMEOUT", "3"))
+ROUTE_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    'health': (GRAPHDB_CONNECT_TIMEOUT, float(os.getenv("GRAPHDB_HEALTH_TIMEOUT", "5"))),
+    'metadata': (GRAPHDB_CONNECT_TIMEOUT, float(os.getenv("GRAPHDB_METADATA_TIMEOUT", "30"))),
+    'query': (GRAPHDB_CONNECT_TIMEOUT, float(os.getenv("GRAPHDB_QUERY_TIMEOUT", "120"))),
+    'update': (GRAPHDB_CONNECT_TIMEOUT, float(os.getenv("GRAPHDB_UPDATE_TIMEOUT", "300"))),
+    'upload': (GRAPHDB_CONNECT_TIMEOUT, float(os.getenv("GRAPHDB_UPLOAD_TIMEOUT", "600"))),
+}
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def is_query_timeout(response: requests.Response) -> bool:
+    """True if GraphDB stopped a query at its execution timeout (repeating it would only time out again)"""
+    return response.status_code == 503 and 'too long' in response.text.lower()
+
+
+class GraphDBClient:
+    """Shared keep-alive HTTP client for all GraphDB traffic"""
+
+    def __init__(self, base_url: str,
+                 pool_connections: int = GRAPHDB_POOL_CONNECTIONS,
+                 pool_maxsize: int = GRAPHDB_POOL_MAXSIZE,
+                 pool_block: bool = GRAPHDB_POOL_BLOCK,
+                 max_retries: int = GRAPHDB_MAX_RETRIES,
+                 retry_backoff: float = GRAPHDB_RETRY_BACKOFF,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip('/')
+        self.breaker = breaker
+        # Called after every attempt with (method, route_class, status or 'error', seconds until headers arrived)
+        self.observer: Optional[Callable[[str, str, str, float], None]] = None
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.pool_maxsize = pool_maxsize
+
+        # Retries are handled here so that only idempotent reads are repeated
+        self._adapter = HTTPAdapter(pool_connections=pool_connections,
+                                    pool_maxsize=pool_maxsize,
+                                    pool_block=pool_block,
+                                    max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+        self.session.headers.update({'Connection': 'keep-alive'})
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "timeouts": 0,
+        }
+        self._by_route_class: Dict[str, int] = {}
+
+    def url(self, path: str) -> str:
+        """Build an absolute GraphDB URL from a path"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def reset(self):
+        """Drop all pooled connections, e.g. after forking into a server worker"""
+        self._adapter.poolmanager.clear()
+
+    def request(self, method: str, url: str, route_class: str = 'metadata',
+                headers: Dict[str, str] = None, data: Any = None, files: Dict = None,
+                params: Dict[str, Any] = None, idempotent: Optional[bool] = None,
+                stream: bool = False) -> requests.Response:
+        """Send a request through the shared pool, retrying idempotent reads with backoff
+
+        Raises BackendUnavailable without touching the network while the circuit breaker is open.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        timeout = ROUTE_TIMEOUTS.get(route_class, ROUTE_TIMEOUTS['metadata'])
+        attempts = 1 + self.max_retries if idempotent else 1
+
+        with self._lock:
+            self._in_flight += 1
+            self._counters["requests"] += 1
+            self._by_route_class[route_class] = self._by_route_class.get(route_class, 0) + 1
+
+        try:
+            for attempt in range(attempts):
+                last_attempt = attempt == attempts - 1
+                if self.breaker:
+                    self.breaker.check()
+                started = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, headers=headers, data=data,
+                                                    files=files, params=params,
+                                                    timeout=timeout, stream=stream)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    self._observe(method, route_class, 'error', started)
+                    self._record(False)
+                    if isinstance(e, requests.exceptions.Timeout):
+                        self._count("timeouts")
+                    if last_attempt:
+                        raise
+                    self._backoff(attempt, method, url, str(e))
+                    continue
+
+                self._observe(method, route_class, str(response.status_code), started)
+                backend_error = (response.status_code in RETRYABLE_STATUS_CODES
+                                 and not is_query_timeout(response))
+                self._record(not backend_error)
+                if backend_error and not last_attempt:
+                    response.close()
+                    self._backoff(attempt, method, url, f"HTTP {response.status_code}")
+                    continue
+
+                if not response.ok:
+                    # Drain the body so the connection can go back to the pool
+                    response.content
+                response.raise_for_status()
+                return response
+        except requests.exceptions.RequestException:
+            self._count("failures")
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _backoff(self, attempt: int, method: str, url: str, reason: str):
+        """Sleep before the next retry attempt"""
+        self._count("retries")
+        delay = self.retry_backoff * (2 ** attempt)
+        logger.warning(f"GraphDB {method} {url} failed ({reason}), retrying in {delay:.2f}s")
+        time.sleep(delay)
+
+    def _observe(self, method: str, route_class: str, status: str, started: float):
+        if self.observer:
+            self.observer(method, route_class, status, time.perf_counter() - started)
+
+    def _record(self, healthy: bool):
+        """Feed the outcome of one attempt to the circuit breaker"""
+        if self.breaker:
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters and connection pool usage"""
+        pools = []
+        manager = self._adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+            pools.append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "maxsize": pool.pool.maxsize if pool.pool else 0,
+                "connections_opened": pool.num_connections,
+                "requests_sent": pool.num_requests,
+                "idle_connections": idle,
+            })
+
+        with self._lock:
+            return {
+                "base_url": self.base_url,
+                "pool_maxsize": self.pool_maxsize,
+                "in_flight": self._in_flight,
+                "counters": dict(self._counters),
+                "requests_by_route_class": dict(self._by_route_class),
+                "timeouts": {name: {"connect": t[0], "read": t[1]} for name, t in ROUTE_TIMEOUTS.items()},
+                "pools": pools,
+                "circuit": self.breaker.stats() if self.breaker else None,
+            }
@@ -0,0 +1,55 @@
+# Production server configuration for inGraphApp
+#
+#   gunicorn -c gunicorn.conf.py inGraphApp:app
+#
+# Every route is an I/O-bound proxy to GraphDB, so each worker process runs many
+# threads (gthread) or greenlets (gevent) rather than one request at a time.
+import os
+import multiprocessing
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+worker_class = os.getenv("INGRAPH_WORKER_CLASS", "gthread")
+
+# gevent must patch the standard library before the app (requests, threading) is preloaded
+if worker_class == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = f"{os.getenv('INGRAPH_HOST', '0.0.0.0')}:{os.getenv('INGRAPH_PORT', '5000')}"
+workers = int(os.getenv("INGRAPH_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+threads = int(os.getenv("INGRAPH_THREADS", "32"))                              # gthread
+worker_connections = int(os.getenv("INGRAPH_WORKER_CONNECTIONS", "1000"))      # gevent
+backlog = int(os.getenv("INGRAPH_BACKLOG", "2048"))
+
+# Hot reload is for development only and cannot be combined with a preloaded app
+reload = _env_flag("INGRAPH_RELOAD", "false")
+preload_app = _env_flag("INGRAPH_PRELOAD", "true") and not reload
+
+# Must exceed the longest GraphDB read timeout so slow queries are not killed mid-flight
+timeout = int(os.getenv("INGRAPH_WORKER_TIMEOUT", "660"))
+# On SIGTERM workers stop accepting and get this long to drain in-flight queries
+graceful_timeout = int(os.getenv("INGRAPH_GRACEFUL_TIMEOUT", "60"))
+keepalive = int(os.getenv("INGRAPH_KEEPALIVE", "5"))
+
+# Recycle workers periodically to bound memory growth (0 disables)
+max_requests = int(os.getenv("INGRAPH_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("INGRAPH_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("INGRAPH_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("INGRAPH_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    """Give each worker its own GraphDB connections instead of sockets inherited from the master"""
+    if server.cfg.preload_app:
+        from inGraphApp import graphdb
+        graphdb.reset()
+
+
+def worker_exit(server, worker):
+    worker.log.info(f"Worker {worker.pid} drained and exited")
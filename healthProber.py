@@ -0,0 +1,101 @@
+import os
+import time
+import threading
+import logging
+from typing import Optional, Dict, Any
+
+import requests
+
+from graphdbClient import GraphDBClient, ROUTE_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background probes while GraphDB is healthy, and while it is not
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))
+HEALTH_PROBE_INTERVAL_UNHEALTHY = float(os.getenv("HEALTH_PROBE_INTERVAL_UNHEALTHY", "1"))
+HEALTH_PROBE_PATH = "/rest/repositories"
+
+
+class HealthProber:
+    """Background thread that keeps GraphDB's status and latency in memory and feeds the circuit breaker"""
+
+    def __init__(self, client: GraphDBClient,
+                 interval: float = HEALTH_PROBE_INTERVAL,
+                 unhealthy_interval: float = HEALTH_PROBE_INTERVAL_UNHEALTHY):
+        self.client = client
+        self.interval = interval
+        self.unhealthy_interval = unhealthy_interval
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._healthy: Optional[bool] = None
+        self._latency_ms: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._since: Optional[float] = None
+        self._error: Optional[str] = None
+        self._probes = 0
+
+    def ensure_started(self):
+        """Start the probe thread once per process (threads do not survive a server worker fork)"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="graphdb-health", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            healthy = self.probe()
+            time.sleep(self.interval if healthy else self.unhealthy_interval)
+
+    def probe(self) -> bool:
+        """Check GraphDB once, bypassing the circuit breaker, and record the result"""
+        started = time.monotonic()
+        error = None
+        try:
+            response = self.client.session.get(self.client.url(HEALTH_PROBE_PATH),
+                                               timeout=ROUTE_TIMEOUTS['health'])
+            response.content
+            if not response.ok:
+                error = f"HTTP {response.status_code}"
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+        latency_ms = round((time.monotonic() - started) * 1000, 1)
+        healthy = error is None
+
+        if self.client.breaker:
+            if healthy:
+                self.client.breaker.record_success()
+            else:
+                self.client.breaker.record_failure()
+
+        with self._lock:
+            if healthy != self._healthy:
+                if self._healthy is not None:
+                    logger.warning(f"GraphDB became {'healthy' if healthy else 'unhealthy'}"
+                                   + (f": {error}" if error else ""))
+                self._since = time.time()
+            self._healthy = healthy
+            self._latency_ms = latency_ms
+            self._checked_at = time.time()
+            self._error = error
+            self._probes += 1
+        return healthy
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Last known GraphDB status; probes synchronously if nothing has been recorded yet"""
+        if self._checked_at is None:
+            self.probe()
+        with self._lock:
+            return {
+                "healthy": self._healthy,
+                "latency_ms": self._latency_ms,
+                "checked_at": self._checked_at,
+                "age_seconds": round(time.time() - self._checked_at, 1),
+                "status_since": self._since,
+                "error": self._error,
+                "probes": self._probes,
+            }
@@ -1,9 +1,34 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, g, has_request_context
 import requests
 import os
+import select
+import socket
+from urllib.parse import quote
 import json
+import time
 import logging
-from typing import Optional, Dict, Any
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, Tuple, Callable, List, Iterator
+from graphdbClient import GraphDBClient, is_query_timeout
+from circuitBreaker import CircuitBreaker, BackendUnavailable
+from healthProber import HealthProber
+from metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from slowQueryLog import SlowQueryLog
+from tripleIndex import TripleReplica
+from admissionControl import AdmissionController, AdmissionRejected
+from queryCache import QueryCache, QueryAbandoned
+from sharedState import WriteGenerations
+from ingestJobs import IngestJobManager, IngestJob, JobQueueFull
+from deltaUpload import DeltaStateStore, subject_fingerprints, plan_delta, build_delta_update, previous_triples
+from repoMetadata import RepositoryMetadata
+from repoProfiles import (resolve_profile, list_profiles, repository_config, reconfigure, current_ruleset,
+                          switch_ruleset_update, REINFER_UPDATE, REPOSITORY_PROFILE_SERVING)
+from rdfConvert import (JsonLdConverter, ConversionStats, UnsupportedJsonLd, iter_ntriples_batches, iri_term,
+                        ntriples_line)
+from queryTemplates import QueryTemplate, TemplateStore, TemplateError
+from columnarFormat import COLUMNAR_CONTENT_TYPES, encode_results
+from queryPaging import PagedQuery, PagingError, decode_cursor, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
 
 app = Flask(__name__)
 
@@ -12,6 +37,19 @@ GRAPHDB_BASE_URL = os.getenv("GRAPHDB_BASE_URL", "http://localhost:7200")
 UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {'jsonld', 'json', 'sparql', 'rq'}
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+GRAPH_BASE_IRI = os.getenv("GRAPH_BASE_IRI", "https://intendproject.eu/graph/")  # prefix for graphs named after files
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(64 * 1024)))  # bytes per streamed chunk
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))  # bytes per chunk sent to GraphDB
+UPLOAD_CONVERT = os.getenv("UPLOAD_CONVERT", "true").lower() == "true"  # convert JSON-LD to N-Triples before loading
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "100"))  # queries accepted per /query/batch call
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "8"))  # queries of one batch running at once
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "32"))  # threads shared by all batches in a process
+UPDATE_BATCH_MAX_OPERATIONS = int(os.getenv("UPDATE_BATCH_MAX_OPERATIONS", "1000"))  # updates accepted per /update/batch call
+UPDATE_BATCH_GROUP_SIZE = int(os.getenv("UPDATE_BATCH_GROUP_SIZE", "50"))  # updates sent per request in non-atomic batches
+TEMPLATE_MAX_BINDINGS = int(os.getenv("TEMPLATE_MAX_BINDINGS", "1000"))  # bindings accepted per template call
+TEMPLATE_VALUES_ROWS = int(os.getenv("TEMPLATE_VALUES_ROWS", "200"))  # bindings folded into one VALUES query
+QUERY_MAX_EXECUTION_SECONDS = int(os.getenv("QUERY_MAX_EXECUTION_SECONDS", "60"))  # GraphDB-side query timeout
+METRICS_MAX_REPOSITORIES = int(os.getenv("METRICS_MAX_REPOSITORIES", "100"))  # distinct repository labels before 'other'
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
@@ -23,49 +61,437 @@ logger = logging.getLogger(__name__)
 # Create upload directory if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Shared pooled client used for every GraphDB call, failing fast while GraphDB is down
+breaker = CircuitBreaker()
+graphdb = GraphDBClient(GRAPHDB_BASE_URL, breaker=breaker)
+
+# Keeps GraphDB's status in memory for /health and lets the circuit recover without user traffic
+health_prober = HealthProber(graphdb)
+
+# Request and GraphDB instrumentation exposed on /metrics
+metrics = MetricsRegistry()
+metrics.describe('ingraph_http_requests_total', 'counter', 'HTTP requests by route, method, repository and status')
+metrics.describe('ingraph_http_request_duration_seconds', 'histogram', 'Time from request start until the response is sent')
+metrics.describe('ingraph_http_upstream_duration_seconds', 'histogram', 'GraphDB time spent while handling a request')
+metrics.describe('ingraph_http_phase_duration_seconds', 'histogram', 'Time spent parsing and validating request bodies')
+metrics.describe('ingraph_http_request_bytes_total', 'counter', 'Request body bytes received')
+metrics.describe('ingraph_http_response_bytes_total', 'counter', 'Response body bytes sent')
+metrics.describe('ingraph_http_requests_in_flight', 'gauge', 'Requests currently being handled by route and repository')
+metrics.describe('ingraph_graphdb_requests_total', 'counter', 'GraphDB requests by route class, method and status')
+metrics.describe('ingraph_graphdb_request_duration_seconds', 'histogram', 'GraphDB time until response headers arrive')
+metrics.describe('ingraph_graphdb_circuit_open', 'gauge', '1 while the GraphDB circuit breaker is open')
+metrics.describe('ingraph_query_cache_bytes', 'gauge', 'Bytes held by the query result cache')
+metrics.describe('ingraph_query_cache_events_total', 'counter', 'Query cache lookups and evictions by outcome')
+metrics.describe('ingraph_admission_running', 'gauge', 'Queries holding an admission slot')
+metrics.describe('ingraph_admission_waiting', 'gauge', 'Queries waiting for an admission slot')
+metrics.describe('ingraph_admission_events_total', 'counter', 'Admission decisions by outcome')
+metric_repositories = set()
+
+def observe_graphdb_request(method: str, route_class: str, status: str, seconds: float):
+    """GraphDBClient observer: count every upstream attempt and charge it to the current request"""
+    metrics.inc('ingraph_graphdb_requests_total', (('route_class', route_class), ('method', method), ('status', status)))
+    metrics.observe('ingraph_graphdb_request_duration_seconds', (('route_class', route_class), ('method', method)), seconds)
+    metrics.add_upstream_time(seconds)
+
+graphdb.observer = observe_graphdb_request
+
+# Per-repository write counters shared by all server workers, checked by the caches below
+write_generations = WriteGenerations()
+
+# In-process SPARQL result cache, invalidated by every write to a repository in any worker
+query_cache = QueryCache(shared=write_generations)
+
+# Limits how many queries this process runs against GraphDB at once
+admission = AdmissionController()
+
+# Threads executing /query/batch items, shared so concurrent batches cannot exhaust the GraphDB pool
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch-query")
+
+# Registered query templates, stored on disk so every server worker sees them
+query_templates = TemplateStore()
+
+# Slow /query and /update calls, aggregated by query fingerprint (plans are captured via fetch_query_plan)
+slow_queries = SlowQueryLog()
+
+QUERY_ACCEPT_HEADERS = {
+    'json': 'application/sparql-results+json',
+    'xml': 'application/sparql-results+xml',
+    'csv': 'text/csv',
+    'turtle': 'text/turtle',
+    'rdf': 'application/rdf+xml'
+}
+
+# Endpoints served without GraphDB, so they keep working while the circuit is open
+LOCAL_ENDPOINTS = {
+    'static', 'health_check', 'list_jobs', 'get_job', 'list_query_templates', 'get_query_template',
+    'delete_query_template', 'get_limits', 'get_metrics', 'list_slow_queries', 'top_slow_queries',
+    'get_slow_query', 'clear_slow_queries', 'get_pool_stats', 'get_graphdb_health', 'get_admission_stats',
+    'get_cache_stats', 'clear_cache', 'get_replica_stats', 'get_repository_profiles', 'get_examples'
+}
+
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def make_graphdb_request(method: str, url: str, headers: Dict[str, str] = None, 
-                        data: str = None, files: Dict = None) -> requests.Response:
-    """Make HTTP request to GraphDB with error handling"""
+                        data: str = None, files: Dict = None, route_class: str = 'metadata',
+                        idempotent: Optional[bool] = None, stream: bool = False,
+                        params: Dict[str, Any] = None) -> requests.Response:
+    """Make HTTP request to GraphDB through the shared pooled client"""
+    if method.upper() not in ('GET', 'POST', 'PUT', 'DELETE'):
+        raise ValueError(f"Unsupported HTTP method: {method}")
     try:
-        if method.upper() == 'GET':
-            response = requests.get(url, headers=headers)
-        elif method.upper() == 'POST':
-            if files:
-                response = requests.post(url, headers=headers, files=files)
-            else:
-                response = requests.post(url, headers=headers, data=data)
-        else:
-            raise ValueError(f"Unsupported HTTP method: {method}")
-        
-        response.raise_for_status()
-        return response
+        return graphdb.request(method, url, route_class=route_class, headers=headers,
+                               data=data, files=files, params=params,
+                               idempotent=idempotent, stream=stream)
     except requests.exceptions.RequestException as e:
         logger.error(f"GraphDB request failed: {str(e)}")
         raise
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
+def is_truthy(value: Optional[str]) -> bool:
+    """Interpret a form/query flag such as 'true', '1' or 'yes'"""
+    return (value or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def graph_from_filename(filename: str) -> str:
+    """Derive a named graph IRI from an uploaded file name (e.g. telenorKG.jsonld -> <base>telenorKG)"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return GRAPH_BASE_IRI + quote(stem, safe='-._~')
+
+def parse_graph(value: Optional[str]) -> Optional[str]:
+    """Validate a client-supplied graph: None if absent, 'default' for the default graph, else an absolute IRI"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    if value == 'default':
+        return value
+    if ':' not in value:
+        raise ValueError(f"Invalid graph IRI: {value!r}")
+    iri_term(value)
+    return value
+
+def context_param(graph: Optional[str]) -> Optional[Dict[str, str]]:
+    """RDF4J 'context' parameter for a graph IRI, 'default' meaning the default graph"""
+    if graph is None:
+        return None
+    return {'context': 'null' if graph == 'default' else f"<{graph}>"}
+
+def stream_graphdb_response(response: requests.Response, repository: str,
+                            output_format: str, on_close: Optional[Callable[[int], None]] = None) -> Response:
+    """Pipe a streamed GraphDB response body to the client chunk by chunk, calling on_close with the bytes sent"""
+    def generate():
+        sent = 0
+        try:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if chunk:
+                    sent += len(chunk)
+                    yield chunk
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Streaming from GraphDB aborted: {str(e)}")
+        finally:
+            # Also runs when the client disconnects: closing the upstream socket makes GraphDB abandon the query
+            response.close()
+            if on_close:
+                on_close(sent)
+
+    headers = {
+        'X-Repository': repository,
+        'X-Query-Format': output_format,
+        'X-GraphDB-Status': str(response.status_code),
+        'X-Accel-Buffering': 'no',
+    }
+    # iter_content() decodes any transfer compression, so only forward the length if it is unchanged
+    if 'Content-Length' in response.headers and 'Content-Encoding' not in response.headers:
+        headers['Content-Length'] = response.headers['Content-Length']
+
+    return Response(generate(), status=200, headers=headers,
+                    content_type=response.headers.get('Content-Type', 'application/octet-stream'))
+
+def fetch_repository_catalogue() -> List[Dict[str, Any]]:
+    """Fetch the repository listing from GraphDB"""
+    return make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/rest/repositories").json()
+
+def fetch_repository_size(repository: str) -> int:
+    """Fetch the triple count of a repository from GraphDB"""
+    response = make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/repositories/{repository}/size")
+    return int(response.text)
+
+def fetch_named_graphs(repository: str) -> List[str]:
+    """List named graphs from GraphDB's context index instead of scanning every statement"""
+    headers = {'Accept': 'application/sparql-results+json'}
+    response = make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/repositories/{repository}/contexts",
+                                    headers=headers)
+    return [binding['contextID']['value'] for binding in response.json()['results']['bindings']]
+
+# Repository catalogue and per-repository stats, cached with a TTL
+repository_metadata = RepositoryMetadata(fetch_repository_catalogue, fetch_repository_size,
+                                         fetch_named_graphs)
+
+def export_repository_statements(repository: str) -> Iterator[str]:
+    """Stream every statement of a repository, inferred ones included, as N-Quads lines"""
+    headers = {'Accept': 'application/n-quads'}
+    response = make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/repositories/{repository}/statements",
+                                    headers=headers, route_class='upload', stream=True)
+    try:
+        for line in response.iter_lines(chunk_size=STREAM_CHUNK_SIZE, decode_unicode=False):
+            if line:
+                yield line.decode('utf-8')
+    finally:
+        response.close()
+
+# In-memory SPO/POS/OSP indexes of the repositories listed in TRIPLE_REPLICA
+triple_replica = TripleReplica(export_repository_statements, shared=write_generations)
+
+@contextmanager
+def repository_write(repository: str, replica_load: Optional[Tuple[List[bytes], Optional[str], bool]] = None):
+    """Wrap a write so cached results, metadata and the triple replica follow it (replica_load: batches, graph, replace)"""
+    # The shared counter moves before and after the write, so other worker processes drop what they hold
+    before = write_generations.bump(repository)
+    succeeded = False
     try:
-        response = requests.get(f"{GRAPHDB_BASE_URL}/rest/repositories", timeout=5)
-        if response.status_code == 200:
-            return jsonify({"status": "healthy", "graphdb": "connected"}), 200
+        with query_cache.writing(repository):
+            yield
+        succeeded = True
+    finally:
+        after = write_generations.bump(repository)
+        repository_metadata.invalidate(repository)
+        if succeeded and replica_load is not None:
+            triple_replica.apply_load(repository, *replica_load, write_counters=(before, after))
         else:
-            return jsonify({"status": "unhealthy", "graphdb": "disconnected"}), 503
-    except Exception as e:
-        return jsonify({"status": "unhealthy", "error": str(e)}), 503
+            triple_replica.invalidate(repository)
+
+def query_timeout(requested: Any = None) -> int:
+    """GraphDB execution timeout in seconds: the client's value, capped at QUERY_MAX_EXECUTION_SECONDS"""
+    try:
+        timeout = int(requested) if requested not in (None, '') else QUERY_MAX_EXECUTION_SECONDS
+    except (TypeError, ValueError):
+        raise ValueError("timeout must be an integer number of seconds")
+    return max(1, min(timeout, QUERY_MAX_EXECUTION_SECONDS))
+
+def backend_unavailable(e: BackendUnavailable):
+    """503 response while the circuit breaker keeps GraphDB calls from being made"""
+    return jsonify({"error": str(e), "retry_after": e.retry_after}), 503, {'Retry-After': str(e.retry_after)}
+
+def record_query_time(kind: str, repository: str, query: str, started: float,
+                      result_bytes: int = 0, status: str = "success"):
+    """Feed one /query or /update execution into the slow query log"""
+    slow_queries.record(kind, repository, query, (time.monotonic() - started) * 1000, result_bytes, status)
+
+def failure_status(e: Exception) -> str:
+    """'timeout' when GraphDB stopped the operation at its execution timeout, 'error' otherwise"""
+    if isinstance(e, requests.exceptions.HTTPError) and e.response is not None and is_query_timeout(e.response):
+        return "timeout"
+    return "error"
+
+def fetch_query_plan(repository: str, explain: str) -> str:
+    """Run a query rewritten with GraphDB's explain graph and return the plan text"""
+    headers = {'Content-Type': 'application/sparql-query', 'Accept': 'application/sparql-results+json'}
+    with admission.slot(repository):
+        response = make_graphdb_request('POST', f"{GRAPHDB_BASE_URL}/repositories/{repository}",
+                                        headers=headers, data=explain,
+                                        params={'timeout': QUERY_MAX_EXECUTION_SECONDS},
+                                        route_class='query', idempotent=True)
+    bindings = response.json().get('results', {}).get('bindings', [])
+    return '\n'.join(value['value'] for row in bindings for value in row.values())
+
+slow_queries.explain_fn = fetch_query_plan
+
+def too_busy(e: AdmissionRejected):
+    """429 response telling the client when to retry"""
+    return jsonify({"error": str(e), "retry_after": e.retry_after}), 429, {'Retry-After': str(e.retry_after)}
+
+def client_disconnect_check() -> Callable[[], bool]:
+    """Function telling whether the client of the current request has closed its connection"""
+    sock = None
+    if has_request_context():
+        sock = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+    if sock is None:
+        return lambda: False
+
+    def gone() -> bool:
+        try:
+            poller = select.poll()
+            poller.register(sock, select.POLLIN | select.POLLPRI)
+            events = poller.poll(0)
+            if not events:
+                return False
+            if events[0][1] & (select.POLLHUP | select.POLLERR | select.POLLNVAL):
+                return True
+            # The body has been read already, so a readable socket either holds the next request or is at EOF
+            return sock.recv(1, socket.MSG_PEEK) == b''
+        except BlockingIOError:
+            return False
+        except ValueError:
+            # TLS sockets cannot be peeked at; assume the client is still there
+            return False
+        except OSError:
+            return True
+    return gone
+
+def run_sparql_query(repository: str, query: str, output_format: str,
+                     use_cache: bool = True, timeout: Optional[int] = None,
+                     client_gone: Optional[Callable[[], bool]] = None) -> Tuple[bytes, str, str]:
+    """Run a SPARQL query through the result cache, returning (body, content_type, cache_status)"""
+    accept_header = QUERY_ACCEPT_HEADERS.get(output_format, 'application/sparql-results+json')
+    client_gone = client_gone or client_disconnect_check()
+
+    def load() -> Tuple[bytes, str]:
+        headers = {
+            'Content-Type': 'application/sparql-query',
+            'Accept': accept_header
+        }
+        url = f"{GRAPHDB_BASE_URL}/repositories/{repository}"
+        # Only queries that actually reach GraphDB need a slot; cache hits never wait
+        with admission.slot(repository):
+            if client_gone():
+                raise QueryAbandoned("Client disconnected while the query was waiting for a slot")
+            response = make_graphdb_request('POST', url, headers=headers, data=query,
+                                            params={'timeout': timeout or QUERY_MAX_EXECUTION_SECONDS},
+                                            route_class='query', idempotent=True, stream=True)
+            # Read the body chunk by chunk so a client that hung up stops the upstream query
+            chunks = []
+            try:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    if client_gone():
+                        raise QueryAbandoned("Client disconnected while the query was running")
+                    chunks.append(chunk)
+            finally:
+                # Closing the socket before the body is complete makes GraphDB abandon the query
+                response.close()
+        body = b''.join(chunks)
+        if output_format in COLUMNAR_CONTENT_TYPES:
+            # Columnar results are re-encoded from SPARQL JSON once and cached encoded
+            return encode_results(body, output_format), COLUMNAR_CONTENT_TYPES[output_format]
+        return body, response.headers.get('content-type', accept_header)
+
+    if not use_cache:
+        body, content_type = load()
+        return body, content_type, "BYPASS"
+    # Single triple-pattern lookups on a mirrored repository never leave the process
+    if output_format == 'json' or output_format in COLUMNAR_CONTENT_TYPES:
+        local = triple_replica.select(repository, query)
+        if local is not None:
+            if output_format in COLUMNAR_CONTENT_TYPES:
+                return encode_results(local, output_format), COLUMNAR_CONTENT_TYPES[output_format], "REPLICA"
+            return local, accept_header, "REPLICA"
+    return query_cache.get_or_load(repository, query, output_format, load)
+
+def route_label() -> str:
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+def repository_label() -> str:
+    """Repository the request targets, from the URL or an already parsed body, with bounded cardinality"""
+    repository = g.get('repository') or (request.view_args or {}).get('repository_name') or ''
+    if repository and repository not in metric_repositories:
+        if len(metric_repositories) >= METRICS_MAX_REPOSITORIES:
+            return 'other'
+        metric_repositories.add(repository)
+    return repository
+
+def track_in_flight():
+    """Count the request as in flight under its route and repository, moving it once the body names the repository"""
+    labels = (('route', route_label()), ('repository', repository_label()))
+    previous = g.get('in_flight_labels')
+    if labels == previous:
+        return
+    if previous is not None:
+        metrics.add('ingraph_http_requests_in_flight', previous, -1)
+    metrics.add('ingraph_http_requests_in_flight', labels, 1)
+    g.in_flight_labels = labels
+
+@app.before_request
+def start_request_metrics():
+    metrics.begin_request()
+    track_in_flight()
+
+@app.before_request
+def fail_fast_when_graphdb_down():
+    """Reject GraphDB-backed requests up front while the circuit is open, before reading their bodies"""
+    health_prober.ensure_started()
+    if request.endpoint in LOCAL_ENDPOINTS or request.endpoint is None:
+        return None
+    if not breaker.available():
+        return backend_unavailable(BackendUnavailable("GraphDB is unavailable, try again later",
+                                                      breaker.retry_after()))
+    return None
+
+@app.before_request
+def parse_request_body():
+    """Parse form and JSON bodies up front so their cost is measured apart from the route itself"""
+    if request.method not in ('POST', 'PUT'):
+        return None
+    with metrics.phase('parse'):
+        if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+            g.repository = request.form.get('repository')
+        elif request.is_json:
+            payload = request.get_json(silent=True)
+            if isinstance(payload, dict) and isinstance(payload.get('repository'), str):
+                g.repository = payload['repository']
+    track_in_flight()
+    return None
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """Record request metrics once the response has been fully sent, including streamed bodies"""
+    state = metrics.end_request()
+    if state is None:
+        return response
+    route = route_label()
+    repository = repository_label()
+    method = request.method
+    in_flight = g.get('in_flight_labels')
+    request_bytes = request.content_length or 0
+    sent = [response.content_length or 0]
+
+    if response.is_streamed and not response.direct_passthrough:
+        body = response.response
+        sent[0] = 0
+
+        def counting_body():
+            try:
+                for chunk in body:
+                    sent[0] += len(chunk)
+                    yield chunk
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        response.response = counting_body()
+
+    def finish():
+        labels = (('route', route), ('repository', repository))
+        metrics.inc('ingraph_http_requests_total', (('route', route), ('method', method),
+                                                    ('repository', repository), ('status', str(response.status_code))))
+        metrics.observe('ingraph_http_request_duration_seconds', labels, time.perf_counter() - state.started)
+        metrics.observe('ingraph_http_upstream_duration_seconds', labels, state.upstream)
+        for phase, seconds in state.phases.items():
+            metrics.observe('ingraph_http_phase_duration_seconds', labels + (('phase', phase),), seconds)
+        metrics.inc('ingraph_http_request_bytes_total', labels, request_bytes)
+        metrics.inc('ingraph_http_response_bytes_total', labels, sent[0])
+        if in_flight is not None:
+            metrics.add('ingraph_http_requests_in_flight', in_flight, -1)
+    response.call_on_close(finish)
+    return response
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint, served from the background prober's last result"""
+    probe = health_prober.snapshot()
+    body = {
+        "status": "healthy" if probe["healthy"] else "unhealthy",
+        "graphdb": "connected" if probe["healthy"] else "disconnected",
+        "latency_ms": probe["latency_ms"],
+        "checked_seconds_ago": probe["age_seconds"],
+        "circuit": breaker.state
+    }
+    if probe["error"]:
+        body["error"] = probe["error"]
+    return jsonify(body), 200 if probe["healthy"] else 503
 
 @app.route('/repositories', methods=['GET'])
 def list_repositories():
     """List all available GraphDB repositories"""
     try:
-        response = make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/rest/repositories")
-        repositories = response.json()
+        repositories = repository_metadata.catalogue()
         return jsonify({
             "repositories": [repo['id'] for repo in repositories],
             "count": len(repositories),
@@ -74,6 +500,173 @@ def list_repositories():
     except Exception as e:
         return jsonify({"error": f"Failed to fetch repositories: {str(e)}"}), 500
 
+def validate_jsonld(content: bytes) -> str:
+    """Decode and parse uploaded JSON-LD, raising ValueError if it is not valid JSON"""
+    with metrics.phase('validate'):
+        text = content.decode('utf-8')
+        try:
+            json.loads(text)
+        except json.JSONDecodeError:
+            raise ValueError("Invalid JSON format")
+    return text
+
+def load_jsonld(repository: str, content: bytes,
+                on_progress: Optional[Callable[[int], None]] = None,
+                graph: Optional[str] = None, replace: bool = False) -> requests.Response:
+    """Load JSON-LD in chunks into a repository or named graph; replace=True swaps the graph content in one operation"""
+    def chunks():
+        for start in range(0, len(content), UPLOAD_CHUNK_SIZE):
+            chunk = content[start:start + UPLOAD_CHUNK_SIZE]
+            yield chunk
+            if on_progress:
+                on_progress(len(chunk))
+
+    headers = {'Content-Type': 'application/ld+json'}
+    url = f"{GRAPHDB_BASE_URL}/repositories/{repository}/statements"
+    with repository_write(repository):
+        return make_graphdb_request('PUT' if replace else 'POST', url, headers=headers,
+                                    data=chunks() if on_progress else content,
+                                    params=context_param(graph), route_class='upload')
+
+def convert_and_load_jsonld(repository: str, content: bytes,
+                            on_progress: Optional[Callable[[int], None]] = None,
+                            graph: Optional[str] = None, replace: bool = False) -> Dict[str, Any]:
+    """Expand JSON-LD locally and stream it to GraphDB as deduplicated N-Triples/N-Quads in one request"""
+    document = json.loads(content)
+    named_graph = graph if graph and graph != 'default' else None
+    if named_graph:
+        iri_term(named_graph)
+    try:
+        # A first pass checks every term without keeping the output, so the streamed upload cannot fail halfway
+        total_subjects = sum(1 for _ in JsonLdConverter(document).iter_subjects())
+    except UnsupportedJsonLd as e:
+        # E.g. remote @context references or @reverse: let GraphDB expand the document itself
+        logger.info(f"Local conversion not possible ({str(e)}), loading JSON-LD as is")
+        load_jsonld(repository, content, on_progress=on_progress, graph=graph, replace=replace)
+        return {"converted": False, "reason": str(e)}
+    
+    stats = ConversionStats()
+    
+    def batches():
+        reported = 0
+        for batch in iter_ntriples_batches(document, graph=named_graph, stats=stats):
+            yield batch
+            if on_progress and total_subjects:
+                # Progress is measured against the source file, as for unconverted uploads
+                loaded = len(content) * stats.subjects // total_subjects
+                on_progress(loaded - reported)
+                reported = loaded
+    
+    # The in-memory replica is filled from the same batches once GraphDB has accepted them
+    sent = [] if triple_replica.enabled(repository) else None
+    
+    def send():
+        for batch in batches():
+            if sent is not None:
+                sent.append(batch)
+            yield batch
+    
+    headers = {'Content-Type': 'application/n-quads' if named_graph else 'application/n-triples'}
+    url = f"{GRAPHDB_BASE_URL}/repositories/{repository}/statements"
+    with repository_write(repository, replica_load=(sent, graph, replace) if sent is not None else None):
+        make_graphdb_request('PUT' if replace else 'POST', url, headers=headers, data=send(),
+                             params=context_param(graph), route_class='upload')
+    
+    result = {"converted": True, "format": headers['Content-Type'], **stats.to_dict()}
+    logger.info(f"Converted {stats.triples} triples ({stats.duplicates} duplicates dropped) for "
+                f"'{repository}' at {result['triples_per_second']} triples/s")
+    return result
+
+def count_repository_triples(repository: str) -> str:
+    """Count all triples in a repository"""
+    count_query = "SELECT (COUNT(*) as ?count) WHERE { ?s ?p ?o }"
+    count_headers = {
+        'Content-Type': 'application/sparql-query',
+        'Accept': 'application/sparql-results+json'
+    }
+    count_response = make_graphdb_request('POST', 
+                                        f"{GRAPHDB_BASE_URL}/repositories/{repository}",
+                                        headers=count_headers, 
+                                        data=count_query,
+                                        route_class='query',
+                                        idempotent=True)
+    
+    count_result = count_response.json()
+    return count_result['results']['bindings'][0]['count']['value']
+
+def apply_delta_upload(repository: str, source: str, text: str,
+                       graph: Optional[str] = None) -> Dict[str, Any]:
+    """Diff a JSON-LD file against the version last loaded from the same source and apply only the changes"""
+    started = time.time()
+    current = subject_fingerprints(json.loads(text))
+    # The default graph is addressed without GRAPH and its state is kept under None, as the clear route expects
+    graph = None if graph == 'default' else graph
+    
+    with delta_state.lock(repository, source, graph):
+        previous, stored_triples = delta_state.load(repository, source, graph)
+        if previous and stored_triples is None:
+            raise ValueError(f"The stored state of source '{source}' has no triples to delete. Clear the graph "
+                             "(which drops the state) and upload the file again")
+        plan = plan_delta(previous, current)
+        
+        # Delete exactly what this source loaded last time, but no triple that is still asserted
+        delete_triples = previous_triples(stored_triples or {}, plan['changed'] + plan['removed'])
+        keep = delta_state.other_sources_triples(repository, source, graph)
+        keep.update(ntriples_line(triple) for _, triples in current.values() for triple in triples)
+        insert_triples = [triple for subject in plan['added'] + plan['changed']
+                          for triple in current[subject][1]]
+        update = build_delta_update(delete_triples, insert_triples, graph, keep=keep)
+        
+        if update:
+            headers = {'Content-Type': 'application/sparql-update'}
+            url = f"{GRAPHDB_BASE_URL}/repositories/{repository}/statements"
+            with repository_write(repository):
+                make_graphdb_request('POST', url, headers=headers, data=update.encode('utf-8'),
+                                     route_class='update')
+        
+        delta_state.save(repository, source,
+                         {subject: digest for subject, (digest, _) in current.items()}, graph,
+                         triples={subject: triples for subject, (_, triples) in current.items()})
+    
+    return {
+        "source": source,
+        "subjects_added": len(plan['added']),
+        "subjects_changed": len(plan['changed']),
+        "subjects_removed": len(plan['removed']),
+        "subjects_unchanged": plan['unchanged'],
+        "triples_deleted": len(delete_triples),
+        "triples_inserted": len(insert_triples),
+        "update_bytes": len(update),
+        "duration_seconds": round(time.time() - started, 3)
+    }
+
+def run_ingest_job(job: IngestJob, content: bytes):
+    """Background pipeline for asynchronous uploads: validate, load, count"""
+    job.set_stage("validate")
+    text = validate_jsonld(content)
+    
+    job.set_stage("load")
+    graph = job.options.get('graph')
+    if job.options.get('mode') == 'delta':
+        job.delta = apply_delta_upload(job.repository, job.options['source'], text, graph)
+        job.add_bytes(len(content))
+    elif job.options.get('convert', UPLOAD_CONVERT):
+        job.conversion = convert_and_load_jsonld(job.repository, content, on_progress=job.add_bytes,
+                                                 graph=graph, replace=job.options.get('replace_graph', False))
+    else:
+        load_jsonld(job.repository, content, on_progress=job.add_bytes,
+                    graph=graph, replace=job.options.get('replace_graph', False))
+    
+    job.set_stage("count")
+    job.total_triples = count_repository_triples(job.repository)
+    job.set_stage("done")
+
+# Background worker pool for async uploads
+ingest_jobs = IngestJobManager(run_ingest_job)
+
+# Subject fingerprints of the last delta upload per (repository, source file)
+delta_state = DeltaStateStore()
+
 @app.route('/upload', methods=['POST'])
 def upload_jsonld():
     """Upload JSON-LD file to specified repository"""
@@ -91,52 +684,166 @@ def upload_jsonld():
     if not allowed_file(file.filename):
         return jsonify({"error": "File type not allowed. Use: jsonld, json"}), 400
     
+    # Delta mode only sends the subjects that changed since the last upload of the same source
+    mode = request.form.get('mode', 'full')
+    if mode not in ('full', 'delta'):
+        return jsonify({"error": "Invalid mode. Use: full, delta"}), 400
+    
+    # Named graph: explicit IRI, or derived from the file name
     try:
-        # Read file content
-        file_content = file.read().decode('utf-8')
-        
-        # Validate JSON-LD
+        graph = parse_graph(request.form.get('graph'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not graph and is_truthy(request.form.get('graph_from_filename')):
+        graph = graph_from_filename(file.filename)
+    replace_graph = is_truthy(request.form.get('replace_graph'))
+    if replace_graph and not graph:
+        return jsonify({"error": "replace_graph requires graph or graph_from_filename"}), 400
+    if replace_graph and mode == 'delta':
+        return jsonify({"error": "replace_graph cannot be combined with mode=delta"}), 400
+    
+    options = {
+        "mode": mode,
+        "source": request.form.get('source', file.filename),
+        "graph": graph,
+        "replace_graph": replace_graph,
+        "convert": is_truthy(request.form.get('convert')) if 'convert' in request.form else UPLOAD_CONVERT
+    }
+    
+    # Async mode: hand the file to the ingestion workers and return a job id at once
+    if is_truthy(request.form.get('async')):
         try:
-            json.loads(file_content)
-        except json.JSONDecodeError:
-            return jsonify({"error": "Invalid JSON format"}), 400
-        
-        # Upload to GraphDB
-        headers = {'Content-Type': 'application/ld+json'}
-        url = f"{GRAPHDB_BASE_URL}/repositories/{repository}/statements"
-        
-        response = make_graphdb_request('POST', url, headers=headers, data=file_content)
-        
-        # Count triples for confirmation
-        count_query = "SELECT (COUNT(*) as ?count) WHERE { ?s ?p ?o }"
-        count_headers = {
-            'Content-Type': 'application/sparql-query',
-            'Accept': 'application/sparql-results+json'
-        }
-        count_response = make_graphdb_request('POST', 
-                                            f"{GRAPHDB_BASE_URL}/repositories/{repository}",
-                                            headers=count_headers, 
-                                            data=count_query)
-        
-        count_result = count_response.json()
-        total_triples = count_result['results']['bindings'][0]['count']['value']
-        
+            job = ingest_jobs.submit(repository, file.filename, file.read(), options)
+        except JobQueueFull as e:
+            return jsonify({"error": str(e)}), 429, {'Retry-After': '5'}
         return jsonify({
+            "message": "Upload queued",
+            "job_id": job.id,
+            "repository": repository,
+            "filename": file.filename,
+            "graph": graph,
+            "status_url": f"/jobs/{job.id}",
+            "status": job.status
+        }), 202
+    
+    try:
+        # Read and validate JSON-LD
+        file_content = file.read()
+        try:
+            file_text = validate_jsonld(file_content)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        result = {
             "message": "File uploaded successfully",
             "repository": repository,
             "filename": file.filename,
-            "total_triples": total_triples,
+            "mode": mode,
+            "graph": graph,
+            "replace_graph": replace_graph,
             "status": "success"
-        }), 200
+        }
+        
+        # Upload to GraphDB
+        if mode == 'delta':
+            result["delta"] = apply_delta_upload(repository, options["source"], file_text, graph)
+        elif options["convert"]:
+            result["conversion"] = convert_and_load_jsonld(repository, file_content, graph=graph,
+                                                           replace=replace_graph)
+        else:
+            load_jsonld(repository, file_content, graph=graph, replace=replace_graph)
         
+        # Count triples for confirmation (bulk loaders skip this per chunk)
+        if request.form.get('count', 'true').lower() != 'false':
+            result["total_triples"] = count_repository_triples(repository)
+        
+        return jsonify(result), 200
+        
+    except ValueError as e:
+        return jsonify({"error": f"Upload rejected: {str(e)}"}), 400
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}")
         return jsonify({"error": f"Upload failed: {str(e)}"}), 500
 
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List asynchronous upload jobs and queue usage"""
+    return jsonify({
+        "jobs": ingest_jobs.statuses(),
+        "queue": ingest_jobs.stats()
+    }), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """Get status, progress and failure details of an upload job"""
+    status = ingest_jobs.status(job_id)
+    if not status:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    return jsonify(status), 200
+
+def paged_response(result: Dict[str, Any], repository: str, paged: PagedQuery, started: float):
+    """JSON response for one page, recording its time unless it came from the cache"""
+    cache_status = result.pop("cache")
+    response = jsonify(result)
+    if cache_status not in ('HIT', 'REPLICA'):
+        record_query_time('query', repository, paged.query, started, response.content_length or 0)
+    return response, 200, {'X-Cache': cache_status}
+
+def run_paged_query(repository: str, paged: PagedQuery, offset: int = 0,
+                    after: Optional[str] = None, use_cache: bool = True,
+                    timeout: Optional[int] = None) -> Dict[str, Any]:
+    """Fetch one page of a SELECT query and describe how to get the next one"""
+    body, _, cache_status = run_sparql_query(repository, paged.page_query(offset, after), 'json',
+                                             use_cache=use_cache, timeout=timeout)
+    results, has_more, last_key = paged.split_page(json.loads(body))
+    return {
+        "query": paged.query,
+        "repository": repository,
+        "results": results,
+        "page": {
+            "mode": paged.mode,
+            "size": paged.page_size,
+            "offset": offset if paged.mode == "offset" else None,
+            "rows": len(results['results']['bindings']),
+            "has_more": has_more,
+            "next_cursor": paged.next_cursor(repository, offset, last_key) if has_more else None
+        },
+        "cache": cache_status,
+        "status": "success"
+    }
+
 @app.route('/query', methods=['POST'])
 def execute_sparql_query():
     """Execute SPARQL SELECT/ASK/CONSTRUCT/DESCRIBE query"""
+    started = time.monotonic()
     repository = request.form.get('repository', 'second-graph')
+    use_cache = request.form.get('cache', 'true').lower() != 'false'
+    try:
+        timeout = query_timeout(request.form.get('timeout'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Continue a paged query: the cursor carries the query, repository and position
+    if request.form.get('cursor'):
+        paged = None
+        try:
+            state = decode_cursor(request.form['cursor'])
+            paged = PagedQuery.from_state(state)
+            repository = state.get('r', repository)
+            result = run_paged_query(repository, paged, int(state.get('o', 0)),
+                                     state.get('a'), use_cache=use_cache, timeout=timeout)
+        except PagingError as e:
+            return jsonify({"error": str(e)}), 400
+        except AdmissionRejected as e:
+            return too_busy(e)
+        except BackendUnavailable as e:
+            return backend_unavailable(e)
+        except Exception as e:
+            logger.error(f"Paged query failed: {str(e)}")
+            if paged:
+                record_query_time('query', repository, paged.query, started, status=failure_status(e))
+            return jsonify({"error": f"Query execution failed: {str(e)}"}), 500
+        return paged_response(result, repository, paged, started)
     
     # Handle file upload or direct query
     if 'file' in request.files and request.files['file'].filename:
@@ -151,44 +858,397 @@ def execute_sparql_query():
     
     # Get output format
     output_format = request.form.get('format', 'json')
+    stream_results = is_truthy(request.form.get('stream'))
     
-    accept_headers = {
-        'json': 'application/sparql-results+json',
-        'xml': 'application/sparql-results+xml',
-        'csv': 'text/csv',
-        'turtle': 'text/turtle',
-        'rdf': 'application/rdf+xml'
-    }
+    accept_header = QUERY_ACCEPT_HEADERS.get(output_format, 'application/sparql-results+json')
+    if output_format in COLUMNAR_CONTENT_TYPES:
+        if stream_results:
+            return jsonify({"error": "Columnar formats cannot be combined with stream=true"}), 400
+        accept_header = COLUMNAR_CONTENT_TYPES[output_format]
     
-    accept_header = accept_headers.get(output_format, 'application/sparql-results+json')
+    # Paged mode: return page_size rows plus a cursor for the next page
+    if request.form.get('page_size') or request.form.get('key'):
+        if output_format != 'json' or stream_results:
+            return jsonify({"error": "Paging requires format=json without stream"}), 400
+        try:
+            page_size = int(request.form.get('page_size') or PAGE_SIZE_DEFAULT)
+        except ValueError:
+            return jsonify({"error": "page_size must be an integer"}), 400
+        try:
+            paged = PagedQuery(query, page_size, key=request.form.get('key') or None)
+            result = run_paged_query(repository, paged, use_cache=use_cache, timeout=timeout)
+        except PagingError as e:
+            return jsonify({"error": str(e)}), 400
+        except AdmissionRejected as e:
+            return too_busy(e)
+        except BackendUnavailable as e:
+            return backend_unavailable(e)
+        except Exception as e:
+            logger.error(f"Paged query failed: {str(e)}")
+            record_query_time('query', repository, query, started, status=failure_status(e))
+            return jsonify({"error": f"Query execution failed: {str(e)}"}), 500
+        return paged_response(result, repository, paged, started)
     
     try:
-        headers = {
-            'Content-Type': 'application/sparql-query',
-            'Accept': accept_header
-        }
+        # Streaming mode: pass GraphDB's body through untouched, metadata goes in headers
+        if stream_results:
+            headers = {
+                'Content-Type': 'application/sparql-query',
+                'Accept': accept_header
+            }
+            url = f"{GRAPHDB_BASE_URL}/repositories/{repository}"
+            # The slot is held until the stream ends or the client goes away
+            granted_at = admission.acquire(repository)
+            try:
+                response = make_graphdb_request('POST', url, headers=headers, data=query,
+                                                params={'timeout': timeout},
+                                                route_class='query', idempotent=True, stream=True)
+            except Exception:
+                admission.release(repository, granted_at)
+                raise
+            
+            def finish_stream(sent: int):
+                admission.release(repository, granted_at)
+                record_query_time('query', repository, query, started, sent)
+            return stream_graphdb_response(response, repository, output_format, on_close=finish_stream)
         
-        url = f"{GRAPHDB_BASE_URL}/repositories/{repository}"
-        response = make_graphdb_request('POST', url, headers=headers, data=query)
+        body, content_type, cache_status = run_sparql_query(repository, query, output_format,
+                                                             use_cache=use_cache, timeout=timeout)
+        if cache_status not in ('HIT', 'REPLICA'):
+            record_query_time('query', repository, query, started, len(body))
         
         # Return appropriate response based on format
         if output_format == 'json':
-            return jsonify({
+            result = jsonify({
                 "query": query,
                 "repository": repository,
-                "results": response.json() if response.headers.get('content-type', '').startswith('application/json') else response.text,
+                "results": json.loads(body) if content_type.startswith('application/json') else body.decode('utf-8'),
                 "status": "success"
-            }), 200
+            })
+            result.headers['X-Cache'] = cache_status
+            return result, 200
         else:
-            return response.text, 200, {'Content-Type': accept_header}
+            return body, 200, {'Content-Type': accept_header, 'X-Cache': cache_status}
             
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except BackendUnavailable as e:
+        return backend_unavailable(e)
+    except QueryAbandoned as e:
+        logger.info(f"Query on {repository} abandoned: {str(e)}")
+        record_query_time('query', repository, query, started, status="abandoned")
+        return jsonify({"error": str(e)}), 499
     except Exception as e:
         logger.error(f"Query failed: {str(e)}")
+        record_query_time('query', repository, query, started, status=failure_status(e))
         return jsonify({"error": f"Query execution failed: {str(e)}"}), 500
 
+def run_batch_item(index: int, item: Dict[str, Any], default_repository: str,
+                   client_gone: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """Run one /query/batch entry and describe its outcome as a single NDJSON record"""
+    started = time.monotonic()
+    record = {"index": index, "id": item.get("id", index)}
+    try:
+        query = item.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("No query provided")
+        repository = item.get("repository", default_repository)
+        output_format = item.get("format", "json")
+        # Binary results cannot be embedded in an NDJSON line
+        if output_format not in QUERY_ACCEPT_HEADERS and output_format != 'columnar':
+            raise ValueError(f"Unsupported format: {output_format}")
+        record.update({"repository": repository, "format": output_format})
+
+        body, content_type, cache_status = run_sparql_query(repository, query, output_format,
+                                                             use_cache=item.get("cache", True) is not False,
+                                                             client_gone=client_gone)
+        record.update({
+            "status": "success",
+            "cache": cache_status,
+            "results": json.loads(body) if 'json' in content_type else body.decode('utf-8')
+        })
+    except AdmissionRejected as e:
+        record.update({"status": "rejected", "error": str(e), "retry_after": e.retry_after})
+    except Exception as e:
+        logger.error(f"Batch query {record['id']} failed: {str(e)}")
+        record.update({"status": "error", "error": str(e)})
+    record["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return record
+
+@app.route('/query/batch', methods=['POST'])
+def execute_sparql_query_batch():
+    """Execute many SPARQL queries concurrently, streaming each result as an NDJSON line when it completes"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('queries'), list):
+        return jsonify({"error": "Expected a JSON body with a 'queries' list"}), 400
+    
+    items = payload['queries']
+    if not items:
+        return jsonify({"error": "No queries provided"}), 400
+    if len(items) > BATCH_MAX_QUERIES:
+        return jsonify({"error": f"Too many queries ({len(items)}), at most {BATCH_MAX_QUERIES} per batch"}), 400
+    if not all(isinstance(item, dict) for item in items):
+        return jsonify({"error": "Every query must be a JSON object"}), 400
+    
+    default_repository = payload.get('repository', 'second-graph')
+    # Items run on executor threads, outside this request's context
+    client_gone = client_disconnect_check()
+    try:
+        parallel = max(1, min(int(payload.get('max_parallel', BATCH_MAX_PARALLEL)), BATCH_MAX_PARALLEL))
+    except (TypeError, ValueError):
+        return jsonify({"error": "max_parallel must be an integer"}), 400
+    
+    def generate():
+        started = time.monotonic()
+        pending = iter(enumerate(items))
+        running = set()
+        succeeded = 0
+        try:
+            while True:
+                # Keep at most `parallel` queries of this batch in flight
+                for index, item in pending:
+                    running.add(batch_executor.submit(run_batch_item, index, item, default_repository,
+                                                      client_gone))
+                    if len(running) >= parallel:
+                        break
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = future.result()
+                    succeeded += record["status"] == "success"
+                    yield json.dumps(record) + '\n'
+        finally:
+            # Client went away: do not start the rest of the batch
+            for future in running:
+                future.cancel()
+        yield json.dumps({
+            "summary": True,
+            "count": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1)
+        }) + '\n'
+    
+    return Response(generate(), status=200, content_type='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})
+
+def run_template_chunk(template: QueryTemplate, repository: str, rows: List[Tuple[Tuple[str, ...], Tuple[str, ...]]],
+                       use_cache: bool) -> Tuple[List[Dict[str, Any]], str]:
+    """Run one VALUES query for a chunk of bindings and split its rows back out per binding"""
+    query = template.render([terms for terms, _ in rows])
+    body, _, cache_status = run_sparql_query(repository, query, 'json', use_cache=use_cache)
+    return template.split(json.loads(body), [key for _, key in rows]), cache_status
+
+@app.route('/templates', methods=['GET'])
+def list_query_templates():
+    """List registered query templates"""
+    templates = [template.to_dict() for template in query_templates.list()]
+    return jsonify({"templates": templates, "count": len(templates)}), 200
+
+@app.route('/templates', methods=['POST'])
+def register_query_template():
+    """Register (or replace) a named SELECT query template with typed $parameters"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON body with name, query and parameters"}), 400
+    try:
+        template = QueryTemplate(payload.get('name'), payload.get('query'), payload.get('parameters'),
+                                 repository=payload.get('repository'),
+                                 description=payload.get('description') or "")
+    except TemplateError as e:
+        return jsonify({"error": f"Invalid template: {str(e)}"}), 400
+    
+    # Let GraphDB parse the query once now; with no VALUES rows it returns nothing
+    if payload.get('validate', True) is not False:
+        repository = template.repository or 'second-graph'
+        try:
+            run_sparql_query(repository, template.render([]), 'json', use_cache=False)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 400:
+                return jsonify({"error": f"GraphDB rejected the template: {e.response.text.strip()}"}), 400
+            return jsonify({"error": f"Could not validate template: {str(e)}"}), 502
+        except Exception as e:
+            return jsonify({"error": f"Could not validate template: {str(e)}"}), 502
+    
+    replaced = query_templates.get(template.name) is not None
+    query_templates.save(template)
+    return jsonify({
+        "message": f"Template '{template.name}' {'replaced' if replaced else 'registered'}",
+        "template": template.to_dict(),
+        "status": "success"
+    }), 200 if replaced else 201
+
+@app.route('/templates/<name>', methods=['GET'])
+def get_query_template(name: str):
+    """Get a registered query template"""
+    template = query_templates.get(name)
+    if template is None:
+        return jsonify({"error": f"Template '{name}' not found"}), 404
+    return jsonify(template.to_dict()), 200
+
+@app.route('/templates/<name>', methods=['DELETE'])
+def delete_query_template(name: str):
+    """Remove a registered query template"""
+    if not query_templates.delete(name):
+        return jsonify({"error": f"Template '{name}' not found"}), 404
+    return jsonify({"message": f"Template '{name}' deleted", "status": "success"}), 200
+
+@app.route('/templates/<name>/run', methods=['POST'])
+def run_query_template(name: str):
+    """Run a template for one binding object, or fold a list of bindings into VALUES queries"""
+    template = query_templates.get(name)
+    if template is None:
+        return jsonify({"error": f"Template '{name}' not found"}), 404
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or 'bindings' not in payload:
+        return jsonify({"error": "Expected a JSON body with 'bindings'"}), 400
+    
+    single = isinstance(payload['bindings'], dict)
+    bindings = [payload['bindings']] if single else payload['bindings']
+    if not isinstance(bindings, list) or not bindings:
+        return jsonify({"error": "'bindings' must be an object or a non-empty list of objects"}), 400
+    if len(bindings) > TEMPLATE_MAX_BINDINGS:
+        return jsonify({"error": f"Too many bindings ({len(bindings)}), at most {TEMPLATE_MAX_BINDINGS} per call"}), 400
+    try:
+        rows = template.binding_rows(bindings)
+    except TemplateError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    repository = payload.get('repository') or template.repository or 'second-graph'
+    use_cache = payload.get('cache', True) is not False
+    chunk_size = TEMPLATE_VALUES_ROWS if template.batchable else 1
+    chunks = [rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size)]
+    
+    try:
+        if len(chunks) == 1:
+            outcomes = [run_template_chunk(template, repository, chunks[0], use_cache)]
+        else:
+            outcomes = list(batch_executor.map(
+                lambda chunk: run_template_chunk(template, repository, chunk, use_cache), chunks))
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except Exception as e:
+        logger.error(f"Template '{name}' failed: {str(e)}")
+        return jsonify({"error": f"Template execution failed: {str(e)}"}), 500
+    
+    results = [result for split, _ in outcomes for result in split]
+    cache_statuses = [status for _, status in outcomes]
+    response = {
+        "template": name,
+        "repository": repository,
+        "graphdb_queries": sum(1 for status in cache_statuses if status in ("MISS", "BYPASS")),
+        "status": "success"
+    }
+    if single:
+        response.update({"binding": bindings[0], "results": results[0]})
+    else:
+        response.update({
+            "count": len(bindings),
+            "results": [{"binding": binding, "results": result} for binding, result in zip(bindings, results)]
+        })
+    result = jsonify(response)
+    result.headers['X-Cache'] = cache_statuses[0] if len(set(cache_statuses)) == 1 else "MIXED"
+    return result, 200
+
+def send_sparql_update(repository: str, update: str) -> requests.Response:
+    """Send a SPARQL update to GraphDB, which executes and commits it as one transaction"""
+    headers = {'Content-Type': 'application/sparql-update'}
+    url = f"{GRAPHDB_BASE_URL}/repositories/{repository}/statements"
+    return make_graphdb_request('POST', url, headers=headers, data=update, route_class='update')
+
+def join_sparql_updates(updates: List[str]) -> str:
+    """Combine update operations into one SPARQL update request (each keeps its own PREFIX prologue)"""
+    return ' ;\n'.join(update.strip().rstrip(';').rstrip() for update in updates)
+
+def apply_update_group(repository: str, operations: List[Dict[str, Any]]) -> int:
+    """Apply a group of operations in one request, retrying them one by one if the group fails; returns requests sent"""
+    try:
+        send_sparql_update(repository, join_sparql_updates([op["update"] for op in operations]))
+        for op in operations:
+            op["status"] = "success"
+        return 1
+    except Exception as e:
+        if len(operations) == 1:
+            operations[0].update({"status": "failed", "error": str(e)})
+            return 1
+        logger.warning(f"Update group of {len(operations)} failed, applying operations individually: {str(e)}")
+    return 1 + sum(apply_update_group(repository, [op]) for op in operations)
+
+@app.route('/update/batch', methods=['POST'])
+def execute_sparql_update_batch():
+    """Apply many SPARQL updates in as few GraphDB requests as possible, optionally all-or-nothing"""
+    payload = request.get_json(silent=True)
+    if payload is not None:
+        if not isinstance(payload, dict) or not isinstance(payload.get('updates'), list):
+            return jsonify({"error": "Expected a JSON body with an 'updates' list"}), 400
+        repository = payload.get('repository', 'second-graph')
+        atomic = payload.get('atomic', False) is True
+        raw_updates = [item if isinstance(item, dict) else {"update": item} for item in payload['updates']]
+    else:
+        # Multipart: one update per uploaded .sparql/.rq file, applied in upload order
+        repository = request.form.get('repository', 'second-graph')
+        atomic = is_truthy(request.form.get('atomic'))
+        raw_updates = []
+        for file in request.files.getlist('file'):
+            if not allowed_file(file.filename):
+                return jsonify({"error": f"File type not allowed: {file.filename}. Use: sparql, rq"}), 400
+            raw_updates.append({"id": file.filename, "update": file.read().decode('utf-8')})
+    
+    if not raw_updates:
+        return jsonify({"error": "No updates provided"}), 400
+    if len(raw_updates) > UPDATE_BATCH_MAX_OPERATIONS:
+        return jsonify({"error": f"Too many updates ({len(raw_updates)}), at most {UPDATE_BATCH_MAX_OPERATIONS} per batch"}), 400
+    
+    operations = []
+    for index, item in enumerate(raw_updates):
+        update = item.get("update")
+        if not isinstance(update, str) or not update.strip():
+            return jsonify({"error": f"Update {item.get('id', index)} is empty or not a string"}), 400
+        operations.append({"index": index, "id": item.get("id", index), "update": update})
+    
+    started = time.monotonic()
+    requests_sent = 0
+    with repository_write(repository):
+        if atomic:
+            # A single update request is one GraphDB transaction: every operation commits or none does
+            requests_sent = 1
+            try:
+                send_sparql_update(repository, join_sparql_updates([op["update"] for op in operations]))
+                for op in operations:
+                    op["status"] = "success"
+            except Exception as e:
+                logger.error(f"Atomic update batch failed: {str(e)}")
+                for op in operations:
+                    op.update({"status": "rolled_back", "error": str(e)})
+        else:
+            for start in range(0, len(operations), UPDATE_BATCH_GROUP_SIZE):
+                requests_sent += apply_update_group(repository, operations[start:start + UPDATE_BATCH_GROUP_SIZE])
+    
+    succeeded = sum(1 for op in operations if op["status"] == "success")
+    if succeeded == len(operations):
+        status, code = "success", 200
+    elif succeeded:
+        status, code = "partial", 207
+    else:
+        status, code = "failed", 500
+    
+    return jsonify({
+        "repository": repository,
+        "atomic": atomic,
+        "status": status,
+        "count": len(operations),
+        "succeeded": succeeded,
+        "failed": len(operations) - succeeded,
+        "graphdb_requests": requests_sent,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        "operations": [{key: value for key, value in op.items() if key != "update"} for op in operations]
+    }), code
+
 @app.route('/update', methods=['POST'])
 def execute_sparql_update():
     """Execute SPARQL INSERT/DELETE/UPDATE operations"""
+    started = time.monotonic()
     repository = request.form.get('repository', 'second-graph')
     
     # Handle file upload or direct query
@@ -203,10 +1263,9 @@ def execute_sparql_update():
         return jsonify({"error": "No update query provided (file or query parameter)"}), 400
     
     try:
-        headers = {'Content-Type': 'application/sparql-update'}
-        url = f"{GRAPHDB_BASE_URL}/repositories/{repository}/statements"
-        
-        response = make_graphdb_request('POST', url, headers=headers, data=update_query)
+        with repository_write(repository):
+            send_sparql_update(repository, update_query)
+        record_query_time('update', repository, update_query, started)
         
         return jsonify({
             "message": "Update operation completed successfully",
@@ -217,16 +1276,16 @@ def execute_sparql_update():
         
     except Exception as e:
         logger.error(f"Update failed: {str(e)}")
+        record_query_time('update', repository, update_query, started, status=failure_status(e))
         return jsonify({"error": f"Update operation failed: {str(e)}"}), 500
 
 @app.route('/repository/<repository_name>/size', methods=['GET'])
 def get_repository_size(repository_name: str):
     """Get the number of triples in a repository"""
     try:
-        response = make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/repositories/{repository_name}/size")
         return jsonify({
             "repository": repository_name,
-            "size": int(response.text),
+            "size": repository_metadata.size(repository_name),
             "status": "success"
         }), 200
     except Exception as e:
@@ -234,59 +1293,80 @@ def get_repository_size(repository_name: str):
 
 @app.route('/repository/<repository_name>/clear', methods=['DELETE'])
 def clear_repository(repository_name: str):
-    """Clear all data from a repository"""
+    """Clear all data from a repository, or a single graph with ?graph=<iri> (or ?graph=default)"""
     try:
-        headers = {'Content-Type': 'application/sparql-update'}
-        clear_query = "DELETE { ?s ?p ?o } WHERE { ?s ?p ?o }"
+        graph = parse_graph(request.args.get('graph'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        # Native statement/context deletion instead of materialising every triple in a SPARQL update
         url = f"{GRAPHDB_BASE_URL}/repositories/{repository_name}/statements"
         
-        response = make_graphdb_request('POST', url, headers=headers, data=clear_query)
+        with repository_write(repository_name, replica_load=([], graph, True)):
+            response = make_graphdb_request('DELETE', url, params=context_param(graph),
+                                            route_class='update')
+        if graph is None:
+            delta_state.forget(repository_name)
+        else:
+            delta_state.forget(repository_name, None if graph == 'default' else graph, all_graphs=False)
         
+        target = f"Graph '{graph}' in repository '{repository_name}'" if graph else f"Repository '{repository_name}'"
         return jsonify({
-            "message": f"Repository '{repository_name}' cleared successfully",
+            "message": f"{target} cleared successfully",
             "repository": repository_name,
+            "graph": graph,
             "status": "success"
         }), 200
         
     except Exception as e:
         return jsonify({"error": f"Failed to clear repository: {str(e)}"}), 500
 
+@app.route('/repository/<repository_name>/entity', methods=['GET'])
+def describe_entity(repository_name: str):
+    """Get the outgoing and incoming statements of one IRI, from the in-memory replica when it is ready"""
+    iri = request.args.get('iri', '').strip()
+    if not iri or any(char in iri for char in '<>"{}|^`\\ \t\n'):
+        return jsonify({"error": "iri must be an absolute IRI without angle brackets"}), 400
+    
+    try:
+        statements = triple_replica.describe(repository_name, iri)
+        source = "replica"
+        if statements is None:
+            query = (f"SELECT ?direction ?p ?v WHERE {{ {{ BIND(\"out\" AS ?direction) <{iri}> ?p ?v }} "
+                     f"UNION {{ BIND(\"in\" AS ?direction) ?v ?p <{iri}> }} }}")
+            body, _, _ = run_sparql_query(repository_name, query, 'json')
+            bindings = json.loads(body)['results']['bindings']
+            statements = {
+                "outgoing": [{"predicate": row['p'], "object": row['v']}
+                             for row in bindings if row['direction']['value'] == 'out'],
+                "incoming": [{"subject": row['v'], "predicate": row['p']}
+                             for row in bindings if row['direction']['value'] == 'in']
+            }
+            source = "graphdb"
+        
+        return jsonify({
+            "repository": repository_name,
+            "iri": iri,
+            "source": source,
+            **statements,
+            "status": "success"
+        }), 200
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except BackendUnavailable as e:
+        return backend_unavailable(e)
+    except Exception as e:
+        return jsonify({"error": f"Failed to describe entity: {str(e)}"}), 500
+
 @app.route('/repository/<repository_name>/info', methods=['GET'])
 def get_repository_info(repository_name: str):
     """Get detailed information about a specific repository"""
     try:
-        # Get repository details
-        response = make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/rest/repositories")
-        repositories = response.json()
-        
-        repo_info = next((repo for repo in repositories if repo['id'] == repository_name), None)
+        # Catalogue, size and named graphs are fetched concurrently and cached
+        repo_info = repository_metadata.info(repository_name)
         if not repo_info:
             return jsonify({"error": f"Repository '{repository_name}' not found"}), 404
         
-        # Get repository size
-        try:
-            size_response = make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/repositories/{repository_name}/size")
-            repo_info['triple_count'] = int(size_response.text)
-        except:
-            repo_info['triple_count'] = "Unknown"
-        
-        # Get namespace info
-        try:
-            ns_query = "SELECT DISTINCT ?g WHERE { GRAPH ?g { ?s ?p ?o } }"
-            ns_headers = {
-                'Content-Type': 'application/sparql-query',
-                'Accept': 'application/sparql-results+json'
-            }
-            ns_response = make_graphdb_request('POST', 
-                                             f"{GRAPHDB_BASE_URL}/repositories/{repository_name}",
-                                             headers=ns_headers, 
-                                             data=ns_query)
-            
-            ns_result = ns_response.json()
-            repo_info['named_graphs'] = [binding['g']['value'] for binding in ns_result['results']['bindings']]
-        except:
-            repo_info['named_graphs'] = []
-        
         return jsonify({
             "repository": repository_name,
             "info": repo_info,
@@ -300,8 +1380,7 @@ def get_repository_info(repository_name: str):
 def list_active_repositories():
     """List only active/running repositories"""
     try:
-        response = make_graphdb_request('GET', f"{GRAPHDB_BASE_URL}/rest/repositories")
-        repositories = response.json()
+        repositories = repository_metadata.catalogue()
         
         active_repos = [repo for repo in repositories if repo.get('state') == 'RUNNING']
         
@@ -315,98 +1394,311 @@ def list_active_repositories():
 
 @app.route('/repositories/create', methods=['POST'])
 def create_repository():
-    """Create a new GraphDB repository"""
+    """Create a new GraphDB repository from a configuration profile (read-optimized unless told otherwise)"""
     repository_id = request.form.get('id')
     repository_title = request.form.get('title', repository_id)
     
     if not repository_id:
         return jsonify({"error": "Repository ID is required"}), 400
     
-    # Basic repository configuration
-    config = {
-        "id": repository_id,
-        "title": repository_title,
-        "type": "graphdb",
-        "params": {
-            "baseURL": {
-                "name": "baseURL",
-                "label": "Base URL",
-                "value": "http://example.org/owlim#"
-            },
-            "defaultNS": {
-                "name": "defaultNS",
-                "label": "Default namespaces for imports(';' delimited)",
-                "value": ""
-            },
-            "imports": {
-                "name": "imports",
-                "label": "Imported RDF files(';' delimited)",
-                "value": ""
-            },
-            "ruleset": {
-                "name": "ruleset",
-                "label": "Ruleset",
-                "value": request.form.get('ruleset', 'rdfsplus-optimized')
-            },
-            "storageFolder": {
-                "name": "storageFolder",
-                "label": "Storage folder",
-                "value": "storage"
-            },
-            "repositoryType": {
-                "name": "repositoryType",
-                "label": "Repository type",
-                "value": "file-repository"
-            },
-            "checkForInconsistencies": {
-                "name": "checkForInconsistencies",
-                "label": "Enable consistency checks",
-                "value": "false"
-            },
-            "disableSameAs": {
-                "name": "disableSameAs",
-                "label": "Disable owl:sameAs",
-                "value": "true"
-            },
-            "enablePredicateList": {
-                "name": "enablePredicateList",
-                "label": "Enable predicate list index",
-                "value": "true"
-            },
-            "enableLiteralIndex": {
-                "name": "enableLiteralIndex",
-                "label": "Enable literal index",
-                "value": "true"
-            },
-            "enableContextIndex": {
-                "name": "enableContextIndex",
-                "label": "Enable context index",
-                "value": "true"
-            },
-            "readOnly": {
-                "name": "readOnly",
-                "label": "Read-only",
-                "value": "false"
-            }
-        }
-    }
+    try:
+        profile = resolve_profile(request.form.get('profile'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    config = repository_config(repository_id, repository_title, profile, request.form.get('ruleset') or None)
     
     try:
         headers = {'Content-Type': 'application/json'}
         url = f"{GRAPHDB_BASE_URL}/rest/repositories"
         
-        response = make_graphdb_request('POST', url, headers=headers, data=json.dumps(config))
+        started = time.monotonic()
+        make_graphdb_request('POST', url, headers=headers, data=json.dumps(config))
+        repository_metadata.invalidate_catalogue()
         
         return jsonify({
             "message": f"Repository '{repository_id}' created successfully",
             "repository": repository_id,
+            "profile": profile,
             "config": config,
+            "seconds": round(time.monotonic() - started, 3),
             "status": "success"
         }), 201
         
     except Exception as e:
         return jsonify({"error": f"Failed to create repository: {str(e)}"}), 500
 
+def apply_repository_profile(repository: str, profile: str, ruleset: Optional[str] = None,
+                             reinfer: Optional[bool] = None) -> Dict[str, Any]:
+    """Switch an existing repository to a profile: new index settings, then the ruleset and a reinference"""
+    phases = {}
+    started = time.monotonic()
+    url = f"{GRAPHDB_BASE_URL}/rest/repositories/{repository}"
+    current = make_graphdb_request('GET', url, headers={'Accept': 'application/json'}).json()
+    previous_ruleset = current_ruleset(current)
+    config = reconfigure(current, profile, ruleset)
+    target_ruleset = current_ruleset(config)
+    switch_update = switch_ruleset_update(target_ruleset) if target_ruleset != previous_ruleset else None
+    
+    # GraphDB restarts the repository with the new configuration and builds the enabled indexes
+    with repository_write(repository):
+        make_graphdb_request('PUT', url, headers={'Content-Type': 'application/json'}, data=json.dumps(config))
+    phases["configure_seconds"] = round(time.monotonic() - started, 3)
+    
+    if reinfer is None:
+        reinfer = switch_update is not None
+    if switch_update or reinfer:
+        started = time.monotonic()
+        with repository_write(repository):
+            if switch_update:
+                send_sparql_update(repository, switch_update)
+            if reinfer:
+                # As heavy as a full load, so it gets the upload timeout
+                make_graphdb_request('POST', f"{GRAPHDB_BASE_URL}/repositories/{repository}/statements",
+                                     headers={'Content-Type': 'application/sparql-update'},
+                                     data=REINFER_UPDATE, route_class='upload')
+        phases["inference_seconds"] = round(time.monotonic() - started, 3)
+    
+    logger.info(f"Repository '{repository}' switched to profile '{profile}' "
+                f"(ruleset {previous_ruleset} -> {target_ruleset}) in {sum(phases.values()):.1f}s")
+    return {
+        "profile": profile,
+        "ruleset": target_ruleset,
+        "previous_ruleset": previous_ruleset,
+        "reinferred": bool(reinfer),
+        "phases": phases
+    }
+
+@app.route('/repositories/profiles', methods=['GET'])
+def get_repository_profiles():
+    """List the repository profiles accepted by create, provision and profile switching"""
+    return jsonify({"profiles": list_profiles()}), 200
+
+@app.route('/repository/<repository_name>/profile', methods=['POST'])
+def switch_repository_profile(repository_name: str):
+    """Reconfigure an existing repository with another profile, e.g. bulk-load -> read-optimized after loading"""
+    try:
+        profile = resolve_profile(request.form.get('profile') or REPOSITORY_PROFILE_SERVING)
+        reinfer = is_truthy(request.form['reinfer']) if 'reinfer' in request.form else None
+        result = apply_repository_profile(repository_name, profile, request.form.get('ruleset') or None, reinfer)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except BackendUnavailable as e:
+        return backend_unavailable(e)
+    except Exception as e:
+        logger.error(f"Profile switch failed: {str(e)}")
+        return jsonify({"error": f"Failed to switch repository profile: {str(e)}"}), 500
+    
+    return jsonify({
+        "message": f"Repository '{repository_name}' switched to profile '{profile}'",
+        "repository": repository_name,
+        **result,
+        "status": "success"
+    }), 200
+
+def remove_provisioned_repository(repository: str) -> bool:
+    """Delete a repository left behind by a failed provisioning run, returning whether it is gone"""
+    try:
+        with repository_write(repository):
+            make_graphdb_request('DELETE', f"{GRAPHDB_BASE_URL}/rest/repositories/{repository}")
+    except Exception as e:
+        logger.error(f"Could not remove repository '{repository}' after failed provisioning: {str(e)}")
+        return False
+    finally:
+        repository_metadata.invalidate_catalogue()
+    delta_state.forget(repository)
+    return True
+
+@app.route('/repositories/provision', methods=['POST'])
+def provision_repository():
+    """Create a repository in the bulk-load profile, load the uploaded files, then switch it to its serving profile"""
+    repository_id = request.form.get('id')
+    if not repository_id:
+        return jsonify({"error": "Repository ID is required"}), 400
+    files = [file for file in request.files.getlist('file') if file.filename]
+    if any(not allowed_file(file.filename) for file in files):
+        return jsonify({"error": "File type not allowed. Use: jsonld, json"}), 400
+    try:
+        profile = resolve_profile(request.form.get('profile') or REPOSITORY_PROFILE_SERVING)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    ruleset = request.form.get('ruleset') or None
+    graph_per_file = is_truthy(request.form.get('graph_from_filename'))
+    convert = is_truthy(request.form.get('convert')) if 'convert' in request.form else UPLOAD_CONVERT
+    keep_on_failure = is_truthy(request.form.get('keep_on_failure'))
+    
+    phases = {}
+    loaded = []
+    stage = "create"
+    started = time.monotonic()
+    try:
+        config = repository_config(repository_id, request.form.get('title', repository_id), 'bulk-load')
+        make_graphdb_request('POST', f"{GRAPHDB_BASE_URL}/rest/repositories",
+                             headers={'Content-Type': 'application/json'}, data=json.dumps(config))
+        repository_metadata.invalidate_catalogue()
+        phases["create_seconds"] = round(time.monotonic() - started, 3)
+        
+        # No inference and no optional indexes yet, so this phase runs at raw ingest speed
+        stage = "load"
+        load_started = time.monotonic()
+        for file in files:
+            content = file.read()
+            validate_jsonld(content)
+            graph = graph_from_filename(file.filename) if graph_per_file else None
+            if convert:
+                conversion = convert_and_load_jsonld(repository_id, content, graph=graph)
+            else:
+                load_jsonld(repository_id, content, graph=graph)
+                conversion = None
+            loaded.append({"filename": file.filename, "bytes": len(content), "graph": graph,
+                           "triples": conversion.get("triples") if conversion else None})
+        phases["load_seconds"] = round(time.monotonic() - load_started, 3)
+        
+        stage = "switch"
+        switched = apply_repository_profile(repository_id, profile, ruleset)
+        phases.update(switched["phases"])
+        
+        stage = "count"
+        count_started = time.monotonic()
+        total_triples = count_repository_triples(repository_id)
+        phases["count_seconds"] = round(time.monotonic() - count_started, 3)
+    except Exception as e:
+        logger.error(f"Provisioning '{repository_id}' failed during {stage}: {str(e)}")
+        # A half-loaded bulk-load repository would make a retry with the same id fail at create
+        removed = False
+        if stage != "create" and not keep_on_failure:
+            removed = remove_provisioned_repository(repository_id)
+        if isinstance(e, BackendUnavailable):
+            return backend_unavailable(e)
+        return jsonify({
+            "error": f"Provisioning failed during {stage}: {str(e)}",
+            "repository": repository_id,
+            "stage": stage,
+            "removed": removed,
+            "files": loaded,
+            "phases": phases
+        }), 400 if isinstance(e, ValueError) else 500
+    
+    phases["total_seconds"] = round(time.monotonic() - started, 3)
+    return jsonify({
+        "message": f"Repository '{repository_id}' provisioned with profile '{profile}'",
+        "repository": repository_id,
+        "profile": profile,
+        "ruleset": switched["ruleset"],
+        "files": loaded,
+        "total_triples": total_triples,
+        "phases": phases,
+        "status": "success"
+    }), 201
+
+@app.route('/limits', methods=['GET'])
+def get_limits():
+    """Get request limits clients need to size their uploads"""
+    return jsonify({
+        "max_content_length": MAX_CONTENT_LENGTH,
+        "allowed_extensions": sorted(ALLOWED_EXTENSIONS),
+        "batch_max_queries": BATCH_MAX_QUERIES,
+        "batch_max_parallel": BATCH_MAX_PARALLEL,
+        "update_batch_max_operations": UPDATE_BATCH_MAX_OPERATIONS,
+        "page_size_max": PAGE_SIZE_MAX,
+        "query_max_execution_seconds": QUERY_MAX_EXECUTION_SECONDS,
+        "admission_max_concurrent": admission.max_concurrent,
+        "admission_max_per_repository": admission.max_per_repository
+    }), 200
+
+@app.route('/graphdb/pool', methods=['GET'])
+def get_pool_stats():
+    """Get GraphDB connection pool usage statistics"""
+    return jsonify(graphdb.stats()), 200
+
+@app.route('/graphdb/health', methods=['GET'])
+def get_graphdb_health():
+    """Get the background prober's view of GraphDB and the circuit breaker state"""
+    return jsonify({"probe": health_prober.snapshot(), "circuit": breaker.stats()}), 200
+
+@app.route('/slow-queries', methods=['GET'])
+def list_slow_queries():
+    """Get the most recent slow queries and updates, newest first"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({"stats": slow_queries.stats(), "entries": slow_queries.recent(limit)}), 200
+
+@app.route('/slow-queries/top', methods=['GET'])
+def top_slow_queries():
+    """Get query fingerprints ranked by total, p95, max or mean time, or by count"""
+    by = request.args.get('by', 'total_ms')
+    if by not in ('total_ms', 'p95_ms', 'p50_ms', 'max_ms', 'mean_ms', 'count', 'slow_count'):
+        return jsonify({"error": f"Cannot rank by '{by}'"}), 400
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({"by": by, "fingerprints": slow_queries.top(limit, by)}), 200
+
+@app.route('/slow-queries/<fingerprint_id>', methods=['GET'])
+def get_slow_query(fingerprint_id: str):
+    """Get the aggregates and captured plan of one query fingerprint"""
+    fingerprint = slow_queries.fingerprint(fingerprint_id)
+    if not fingerprint:
+        return jsonify({"error": f"Fingerprint '{fingerprint_id}' not found"}), 404
+    return jsonify(fingerprint), 200
+
+@app.route('/slow-queries/<fingerprint_id>/explain', methods=['POST'])
+def explain_slow_query(fingerprint_id: str):
+    """Re-run the latest query of a fingerprint with GraphDB's explain and store its plan"""
+    try:
+        return jsonify(slow_queries.explain(fingerprint_id)), 200
+    except KeyError:
+        return jsonify({"error": f"Fingerprint '{fingerprint_id}' not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except Exception as e:
+        logger.error(f"Explaining {fingerprint_id} failed: {str(e)}")
+        return jsonify({"error": f"Explain failed: {str(e)}"}), 500
+
+@app.route('/slow-queries', methods=['DELETE'])
+def clear_slow_queries():
+    """Drop the slow query log and fingerprint aggregates"""
+    slow_queries.clear()
+    return jsonify({"message": "Slow query log cleared", "status": "success"}), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, GraphDB, cache and admission metrics in the Prometheus text format"""
+    # Components that keep their own counters are sampled at scrape time
+    metrics.set('ingraph_graphdb_circuit_open', (), 1 if breaker.state == 'open' else 0)
+    cache_stats = query_cache.stats()
+    metrics.set('ingraph_query_cache_bytes', (), cache_stats['bytes'])
+    for event, value in cache_stats['counters'].items():
+        metrics.set('ingraph_query_cache_events_total', (('event', event),), value)
+    admission_stats = admission.stats()
+    metrics.set('ingraph_admission_running', (), admission_stats['running'])
+    metrics.set('ingraph_admission_waiting', (), admission_stats['waiting'])
+    for event, value in admission_stats['counters'].items():
+        metrics.set('ingraph_admission_events_total', (('event', event),), value)
+    return Response(metrics.render(), mimetype=METRICS_CONTENT_TYPE)
+
+@app.route('/admission/stats', methods=['GET'])
+def get_admission_stats():
+    """Get query slot usage, queue depth and rejection counts for this worker"""
+    return jsonify(admission.stats()), 200
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get SPARQL result and repository metadata cache statistics"""
+    stats = query_cache.stats()
+    stats["metadata"] = repository_metadata.stats()
+    return jsonify(stats), 200
+
+@app.route('/replica/stats', methods=['GET'])
+def get_replica_stats():
+    """Get the state and size of the in-memory triple replicas of this worker"""
+    return jsonify(triple_replica.stats()), 200
+
+@app.route('/cache', methods=['DELETE'])
+def clear_cache():
+    """Drop every cached SPARQL result"""
+    query_cache.clear()
+    repository_metadata.invalidate()
+    return jsonify({"message": "Query cache cleared", "status": "success"}), 200
+
 @app.route('/examples', methods=['GET'])
 def get_examples():
     """Get API usage examples"""
@@ -429,6 +1721,24 @@ import requests
 files = {"file": open("machine5-query.sparql", "rb")}
 data = {"repository": "second-graph", "format": "json"}
 response = requests.post("http://0.0.0.0:5000/query", files=files, data=data)
+'''
+        },
+        "sparql_query_stream": {
+            "description": "Stream SPARQL query results straight from GraphDB (metadata in X-Repository/X-GraphDB-Status headers)",
+            "curl": 'curl -N -X POST http://0.0.0.0:5000/query -F "repository=second-graph" -F "file=@machine5-query.sparql" -F "format=json" -F "stream=true"',
+        },
+        "sparql_query_batch": {
+            "description": "Run several queries concurrently, one NDJSON result line per query as it completes",
+            "curl": 'curl -N -X POST http://0.0.0.0:5000/query/batch -H "Content-Type: application/json" -d \'{"repository": "second-graph", "queries": [{"id": "machines", "query": "SELECT * WHERE { ?s a ?t } LIMIT 10"}, {"id": "count", "query": "SELECT (COUNT(*) AS ?n) WHERE { ?s ?p ?o }"}]}\'',
+            "python": '''
+import json, requests
+batch = {"repository": "second-graph", "queries": [
+    {"id": "machines", "query": "SELECT * WHERE { ?s a ?t } LIMIT 10"},
+    {"id": "count", "query": "SELECT (COUNT(*) AS ?n) WHERE { ?s ?p ?o }", "format": "csv"}
+]}
+with requests.post("http://0.0.0.0:5000/query/batch", json=batch, stream=True) as response:
+    for line in response.iter_lines():
+        print(json.loads(line))
 '''
         },
         "sparql_update": {
@@ -446,7 +1756,7 @@ response = requests.post("http://0.0.0.0:5000/update", files=files, data=data)
 
 @app.errorhandler(413)
 def too_large(e):
-    return jsonify({"error": "File too large"}), 413
+    return jsonify({"error": "File too large", "max_content_length": MAX_CONTENT_LENGTH}), 413
 
 @app.errorhandler(404)
 def not_found(e):
@@ -462,11 +1772,27 @@ if __name__ == '__main__':
     print("  GET  /health              - Health check")
     print("  GET  /repositories        - List repositories")
     print("  POST /upload              - Upload JSON-LD file")
+    print("  GET  /jobs/<id>           - Async upload job status")
     print("  POST /query               - Execute SPARQL query")
+    print("  POST /query/batch         - Execute many SPARQL queries concurrently (NDJSON)")
+    print("  POST /templates           - Register a parameterised query template")
+    print("  POST /templates/<name>/run - Run a template for one or many bindings")
     print("  POST /update              - Execute SPARQL update")
+    print("  POST /update/batch        - Apply many SPARQL updates in few requests")
+    print("  POST /repositories/provision - Create, bulk-load and switch a repository to its serving profile")
+    print("  POST /repository/<name>/profile - Switch a repository profile")
     print("  GET  /repository/<name>/size - Get repository size")
     print("  DELETE /repository/<name>/clear - Clear repository")
+    print("  GET  /graphdb/pool        - GraphDB connection pool stats")
+    print("  GET  /graphdb/health      - GraphDB probe and circuit breaker state")
+    print("  GET  /admission/stats     - Query admission control stats")
+    print("  GET  /metrics             - Prometheus metrics")
+    print("  GET  /slow-queries/top    - Slowest query fingerprints")
+    print("  GET  /repository/<name>/entity - Statements about one IRI")
+    print("  GET  /cache/stats         - Query cache statistics")
+    print("  GET  /replica/stats       - In-memory triple replica state")
     print("  GET  /examples            - API usage examples")
     print("\n🌐 Server running on http://0.0.0.0:5000")
+    print("⚠️  Development server only, use 'gunicorn -c gunicorn.conf.py inGraphApp:app' in production")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=is_truthy(os.getenv('FLASK_DEBUG')), host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
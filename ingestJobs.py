@@ -0,0 +1,276 @@
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import threading
+import logging
+from collections import OrderedDict
+from typing import Callable, Optional, Dict, Any, List
+
+from sharedState import SHARED_STATE_FOLDER, process_alive
+
+logger = logging.getLogger(__name__)
+
+# Worker pool configuration
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", "8"))
+INGEST_JOB_RETENTION = int(os.getenv("INGEST_JOB_RETENTION", "200"))
+# Job status files, so a job can be polled through any server worker
+INGEST_JOB_FOLDER = os.getenv("INGEST_JOB_FOLDER", os.path.join(SHARED_STATE_FOLDER, "jobs"))
+INGEST_PROGRESS_SYNC_SECONDS = float(os.getenv("INGEST_PROGRESS_SYNC_SECONDS", "1"))
+
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when the ingestion queue is at capacity"""
+
+
+class IngestJob:
+    """State and progress of one asynchronous upload"""
+
+    def __init__(self, repository: str, filename: str, bytes_total: int,
+                 options: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.repository = repository
+        self.filename = filename
+        self.options = options or {}
+        self.status = JOB_QUEUED
+        self.stage: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.bytes_total = bytes_total
+        self.bytes_loaded = 0
+        self.total_triples: Optional[str] = None
+        self.delta: Optional[Dict[str, Any]] = None
+        self.conversion: Optional[Dict[str, Any]] = None
+        self.error: Optional[Dict[str, str]] = None
+        self.worker_pid = os.getpid()
+        # Called with (job, force) whenever the status changes, to publish it to other workers
+        self.on_change: Optional[Callable[["IngestJob", bool], None]] = None
+
+    def _changed(self, force: bool = False):
+        if self.on_change:
+            self.on_change(self, force)
+
+    def set_stage(self, stage: str):
+        """Record the pipeline stage currently running"""
+        self.stage = stage
+        self._changed(force=True)
+
+    def add_bytes(self, count: int):
+        """Record bytes sent to GraphDB"""
+        self.bytes_loaded += count
+        self._changed()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the job for the status endpoints"""
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "repository": self.repository,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": round(end - self.started_at, 3) if self.started_at else None,
+            "progress": {
+                "bytes_loaded": self.bytes_loaded,
+                "bytes_total": self.bytes_total,
+                "percent": round(100.0 * self.bytes_loaded / self.bytes_total, 1) if self.bytes_total else 100.0,
+                "total_triples": self.total_triples,
+            },
+            "delta": self.delta,
+            "conversion": self.conversion,
+            "error": self.error,
+            "worker_pid": self.worker_pid,
+        }
+
+
+class IngestJobManager:
+    """Bounded worker pool that runs uploads in the background"""
+
+    def __init__(self, run_job: Callable[[IngestJob, bytes], None],
+                 workers: int = INGEST_WORKERS, max_queue: int = INGEST_MAX_QUEUE,
+                 retention: int = INGEST_JOB_RETENTION, folder: str = INGEST_JOB_FOLDER):
+        self.run_job = run_job
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.folder = folder
+        self._saved_at: Dict[str, float] = {}
+        os.makedirs(folder, exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Status files are written in the order their snapshots are taken, so the newest state always lands last
+        self._publish_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._active = 0
+
+    def _ensure_workers(self):
+        """Start worker threads lazily, and again after a fork into a server worker"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = []
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"ingest-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, repository: str, filename: str, content: bytes,
+               options: Optional[Dict[str, Any]] = None) -> IngestJob:
+        """Queue an upload, raising JobQueueFull when the queue is at capacity"""
+        self._ensure_workers()
+        job = IngestJob(repository, filename, len(content), options)
+        job.on_change = self._publish
+        try:
+            self._queue.put_nowait((job, content))
+        except queue.Full:
+            raise JobQueueFull(f"Ingestion queue is full ({self.max_queue} jobs waiting)")
+
+        with self._lock:
+            self._jobs[job.id] = job
+            pruned = self._prune()
+        self._publish(job, force=True)
+        for job_id in pruned:
+            self._remove_file(job_id)
+        self._prune_files()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job run by any worker process, or None if it is unknown"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if not _JOB_ID_RE.match(job_id):
+            return None
+        return self._read_file(os.path.join(self.folder, f"{job_id}.json"))
+
+    def statuses(self) -> List[Dict[str, Any]]:
+        """Status of every retained job of every worker process, oldest first"""
+        found: Dict[str, Dict[str, Any]] = {}
+        for name in os.listdir(self.folder):
+            if name.endswith('.json'):
+                status = self._read_file(os.path.join(self.folder, name))
+                if status:
+                    found[status["job_id"]] = status
+        for job in self.list():
+            found[job.id] = job.to_dict()
+        return sorted(found.values(), key=lambda status: status["created_at"])
+
+    def _publish(self, job: IngestJob, force: bool = False):
+        """Write the job's status file; progress alone is written at most every INGEST_PROGRESS_SYNC_SECONDS"""
+        with self._publish_lock:
+            now = time.monotonic()
+            if not force and now - self._saved_at.get(job.id, 0.0) < INGEST_PROGRESS_SYNC_SECONDS:
+                return
+            self._saved_at[job.id] = now
+            path = os.path.join(self.folder, f"{job.id}.json")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(job.to_dict(), f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Could not publish the status of job {job.id}: {str(e)}")
+
+    def _read_file(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r') as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if status.get("status") in (JOB_QUEUED, JOB_RUNNING) and not process_alive(status.get("worker_pid")):
+            # The worker process holding the job exited (restart, crash or recycling) before finishing it
+            status["status"] = JOB_FAILED
+            status["error"] = {"stage": status.get("stage") or "unknown",
+                               "message": "The server worker running this job exited"}
+        return status
+
+    def _prune_files(self):
+        """Drop the oldest finished status files beyond the retention limit, e.g. left by exited workers"""
+        names = [name for name in os.listdir(self.folder) if name.endswith('.json')]
+        if len(names) <= self.retention:
+            return
+        finished = [status for status in self.statuses() if status["status"] in (JOB_SUCCEEDED, JOB_FAILED)]
+        for status in finished[:len(names) - self.retention]:
+            if self.get(status["job_id"]) is None:
+                self._remove_file(status["job_id"])
+
+    def _remove_file(self, job_id: str):
+        self._saved_at.pop(job_id, None)
+        try:
+            os.remove(os.path.join(self.folder, f"{job_id}.json"))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and worker utilisation"""
+        with self._lock:
+            by_status: Dict[str, int] = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {
+                "workers": self.workers,
+                "active_workers": self._active,
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "jobs_by_status": by_status,
+            }
+
+    def _prune(self) -> List[str]:
+        """Forget the oldest finished jobs beyond the retention limit and return their ids (caller holds the lock)"""
+        excess = len(self._jobs) - self.retention
+        if excess <= 0:
+            return []
+        pruned = [job_id for job_id, job in self._jobs.items()
+                  if job.status in (JOB_SUCCEEDED, JOB_FAILED)][:excess]
+        for job_id in pruned:
+            del self._jobs[job_id]
+        return pruned
+
+    def _work(self):
+        while True:
+            job, content = self._queue.get()
+            with self._lock:
+                self._active += 1
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            self._publish(job, force=True)
+            try:
+                self.run_job(job, content)
+                job.status = JOB_SUCCEEDED
+            except Exception as e:
+                logger.error(f"Ingestion job {job.id} failed during {job.stage}: {str(e)}")
+                job.error = {"stage": job.stage or "unknown", "message": str(e)}
+                job.status = JOB_FAILED
+            finally:
+                job.finished_at = time.time()
+                self._publish(job, force=True)
+                # Release the payload as soon as the job is done
+                content = None
+                with self._lock:
+                    self._active -= 1
+                self._queue.task_done()
@@ -0,0 +1,140 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Tuple, List, Optional
+
+# Histogram bucket upper bounds in seconds
+METRICS_BUCKETS = tuple(float(b) for b in os.getenv(
+    "METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60").split(","))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class _RequestState:
+    """Per-request timings collected on the handling thread"""
+    __slots__ = ('started', 'upstream', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.upstream = 0.0
+        self.phases: Dict[str, float] = {}
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms rendered in the Prometheus text format"""
+
+    def __init__(self, buckets: Tuple[float, ...] = METRICS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._local = threading.local()
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+        {'counter': self._counters, 'gauge': self._gauges, 'histogram': self._histograms}[kind].setdefault(name, {})
+
+    def inc(self, name: str, labels: Labels, value: float = 1.0):
+        with self._lock:
+            series = self._counters[name]
+            series[labels] = series.get(labels, 0.0) + value
+
+    def add(self, name: str, labels: Labels, value: float):
+        """Move a gauge up or down"""
+        with self._lock:
+            series = self._gauges[name]
+            series[labels] = series.get(labels, 0.0) + value
+
+    def set(self, name: str, labels: Labels, value: float):
+        """Overwrite a series, e.g. with a snapshot of counters kept elsewhere"""
+        with self._lock:
+            (self._counters if name in self._counters else self._gauges)[name][labels] = value
+
+    def observe(self, name: str, labels: Labels, seconds: float):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    # Per-request timing, kept on the thread handling the request
+
+    def begin_request(self):
+        self._local.request = _RequestState()
+
+    def end_request(self) -> Optional[_RequestState]:
+        state = getattr(self._local, 'request', None)
+        self._local.request = None
+        return state
+
+    def add_upstream_time(self, seconds: float):
+        """Attribute GraphDB time to the request being handled on this thread, if any"""
+        state = getattr(self._local, 'request', None)
+        if state is not None:
+            state.upstream += seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a named step of the current request (e.g. form parsing or validation)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            state = getattr(self._local, 'request', None)
+            if state is not None:
+                state.phases[name] = state.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def render(self) -> str:
+        """Serialise every series in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text) in self._help.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == 'histogram':
+                    for labels, histogram in self._histograms[name].items():
+                        cumulative = 0
+                        for bound, count in zip(self.buckets, histogram.counts):
+                            cumulative += count
+                            lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+                else:
+                    series = self._counters[name] if kind == 'counter' else self._gauges[name]
+                    for labels, value in series.items():
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(value)
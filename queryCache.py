@@ -0,0 +1,222 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Tuple, Optional
+
+from sharedState import WriteGenerations
+
+# Cache configuration
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_MAX_ENTRY_BYTES = int(os.getenv("QUERY_CACHE_MAX_ENTRY_BYTES", str(4 * 1024 * 1024)))
+
+# Splits a SPARQL string into literals, IRIs, comments, whitespace and everything else
+_TOKEN_RE = re.compile(r'''
+    (?P<literal>"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<iri><[^<>"{}|^`\\\s]*>)
+  | (?P<comment>\#[^\n]*)
+  | (?P<space>\s+)
+  | (?P<other>[^\s"'<\#]+|.)
+''', re.VERBOSE)
+
+# Queries using these functions return different results on every call
+_NON_DETERMINISTIC_RE = re.compile(r'\b(NOW|RAND|UUID|STRUUID|BNODE)\s*\(', re.IGNORECASE)
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and drop comments outside of literals and IRIs"""
+    parts = []
+    pending_space = False
+    for match in _TOKEN_RE.finditer(query):
+        kind = match.lastgroup
+        if kind in ('space', 'comment'):
+            pending_space = True
+            continue
+        if pending_space and parts:
+            parts.append(' ')
+        pending_space = False
+        parts.append(match.group())
+    return ''.join(parts)
+
+
+def is_cacheable_query(query: str) -> bool:
+    """Check that a query is deterministic enough to be cached"""
+    return not _NON_DETERMINISTIC_RE.search(normalize_query(query))
+
+
+class QueryAbandoned(Exception):
+    """Raised by a loader that gave up because its client went away"""
+
+
+class _Flight:
+    """An upstream load shared by identical concurrent requests"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QueryCache:
+    """Byte-bounded LRU cache of SPARQL results with per-repository generations"""
+
+    def __init__(self, max_bytes: int = QUERY_CACHE_MAX_BYTES,
+                 max_entry_bytes: int = QUERY_CACHE_MAX_ENTRY_BYTES,
+                 shared: Optional[WriteGenerations] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.shared = shared
+        self._entries: "OrderedDict[Tuple, Tuple[bytes, str]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        # Shared write counter per repository that the local entries were cached under
+        self._shared_seen: Dict[str, int] = {}
+        self._in_flight: Dict[Tuple, _Flight] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "shared_invalidations": 0,
+            "uncacheable": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def generation(self, repository: str) -> int:
+        """Return the current write generation of a repository"""
+        with self._lock:
+            return self._generations.get(repository, 0)
+
+    def invalidate(self, repository: str):
+        """Bump the repository generation and drop its cached results"""
+        with self._lock:
+            self._counters["invalidations"] += 1
+            self._drop(repository)
+
+    def _drop(self, repository: str):
+        """Make every cached or loading result of a repository unusable (caller holds the lock)"""
+        self._generations[repository] = self._generations.get(repository, 0) + 1
+        stale = [key for key in self._entries if key[0] == repository]
+        for key in stale:
+            body, _ = self._entries.pop(key)
+            self._bytes -= len(body)
+
+    def _sync(self, repository: str):
+        """Drop local results of a repository once any worker process has recorded a write to it since"""
+        if self.shared is None:
+            return
+        try:
+            current = self.shared.current(repository)
+        except OSError:
+            current = -1  # unreadable: treat as a write, never as "unchanged"
+        with self._lock:
+            if current < 0 or self._shared_seen.get(repository, 0) != current:
+                self._shared_seen[repository] = current
+                self._counters["shared_invalidations"] += 1
+                self._drop(repository)
+
+    @contextmanager
+    def writing(self, repository: str):
+        """Invalidate a repository before and after a write so reads racing it are never kept"""
+        self.invalidate(repository)
+        try:
+            yield
+        finally:
+            self.invalidate(repository)
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_or_load(self, repository: str, query: str, output_format: str,
+                    loader: Callable[[], Tuple[bytes, str]]) -> Tuple[bytes, str, str]:
+        """Return (body, content_type, cache_status), loading once for identical concurrent requests"""
+        if not self.enabled or not is_cacheable_query(query):
+            with self._lock:
+                self._counters["uncacheable"] += 1
+            body, content_type = loader()
+            return body, content_type, "BYPASS"
+
+        self._sync(repository)
+        with self._lock:
+            generation = self._generations.get(repository, 0)
+            key = (repository, generation, output_format, normalize_query(query))
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[0], entry[1], "HIT"
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._in_flight[key] = flight
+                self._counters["misses"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if isinstance(flight.error, QueryAbandoned):
+                # The leader's client disconnected, but this request still wants the result
+                return self.get_or_load(repository, query, output_format, loader)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result[0], flight.result[1], "COALESCED"
+
+        try:
+            flight.result = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # A write by another worker during the load bumps the generation, so the result is not stored
+            self._sync(repository)
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if flight.error is None:
+                    self._store(key, flight.result)
+            flight.event.set()
+
+        return flight.result[0], flight.result[1], "MISS"
+
+    def _store(self, key: Tuple, value: Tuple[bytes, str]):
+        """Insert an entry and evict least recently used ones (caller holds the lock)"""
+        repository, generation = key[0], key[1]
+        size = len(value[0])
+        # A write landed while this result was loading, so it may already be stale
+        if generation != self._generations.get(repository, 0) or size > self.max_entry_bytes:
+            return
+
+        self._entries[key] = value
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, (body, _) = self._entries.popitem(last=False)
+            self._bytes -= len(body)
+            self._counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and memory usage"""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"] + self._counters["coalesced"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "hit_ratio": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "counters": dict(self._counters),
+                "generations": dict(self._generations),
+                "in_flight": len(self._in_flight),
+            }
@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import zlib
+import base64
+from typing import Optional, Dict, Any, Tuple
+
+from rdfConvert import escape_literal
+from queryTemplates import mask_query, matching_brace, projected_variables
+
+# Rows per page when the client does not ask for a size, and the largest size allowed
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "1000"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "10000"))
+
+CURSOR_VERSION = 1
+_VAR_RE = re.compile(r'[?$]([A-Za-z_][A-Za-z0-9_]*)')
+_ALIAS_RE = re.compile(r'\bAS\s+[?$]([A-Za-z_][A-Za-z0-9_]*)', re.IGNORECASE)
+
+
+class PagingError(ValueError):
+    """A query cannot be paged or a cursor is invalid"""
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Pack paging state into an opaque, URL-safe token"""
+    raw = json.dumps({"v": CURSOR_VERSION, **state}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(zlib.compress(raw)).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    try:
+        raw = zlib.decompress(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        state = json.loads(raw)
+    except (ValueError, zlib.error):
+        raise PagingError("Invalid cursor")
+    if not isinstance(state, dict) or state.get("v") != CURSOR_VERSION:
+        raise PagingError("Invalid or outdated cursor")
+    fields_ok = (isinstance(state.get("q"), str) and isinstance(state.get("r"), str)
+                 and _is_count(state.get("n")) and isinstance(state.get("k"), (str, type(None)))
+                 and (_is_count(state.get("o")) if state.get("k") is None
+                      else isinstance(state.get("a"), str)))
+    if not fields_ok:
+        raise PagingError("Invalid cursor")
+    return state
+
+
+def _is_count(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+class PagedQuery:
+    """A SELECT query rewritten to return one page at a time, by OFFSET or by keyset on a unique variable"""
+
+    def __init__(self, query: str, page_size: int, key: Optional[str] = None):
+        if page_size < 1 or page_size > PAGE_SIZE_MAX:
+            raise PagingError(f"page_size must be between 1 and {PAGE_SIZE_MAX}")
+        self.query = query
+        self.page_size = page_size
+        self.key = key.lstrip('?$') if key else None
+        if self.key is not None and not _VAR_RE.fullmatch(f"?{self.key}"):
+            raise PagingError(f"Invalid key variable: {key}")
+
+        masked = mask_query(query)
+        select = re.search(r'\bSELECT\b(\s+(?:DISTINCT|REDUCED)\b)?', masked, re.IGNORECASE)
+        if not select or re.search(r'\b(?:ASK|CONSTRUCT|DESCRIBE)\b', masked[:select.start()], re.IGNORECASE):
+            raise PagingError("Only SELECT queries can be paged")
+        open_brace = masked.find('{', select.end())
+        if open_brace < 0:
+            raise PagingError("Query has no WHERE clause")
+        where = re.search(r'\bWHERE\b', masked[select.end():open_brace], re.IGNORECASE)
+        projection_end = select.end() + where.start() if where else open_brace
+        try:
+            self._close_brace = matching_brace(masked, open_brace)
+        except ValueError as e:
+            raise PagingError(str(e))
+        modifiers = masked[self._close_brace + 1:]
+
+        if re.search(r'\b(?:LIMIT|OFFSET)\b', modifiers, re.IGNORECASE):
+            raise PagingError("Remove LIMIT/OFFSET from a paged query, pages are sized with page_size")
+        if re.search(r'\bVALUES\b', modifiers, re.IGNORECASE):
+            raise PagingError("Queries with a trailing VALUES block cannot be paged")
+        self._has_order_by = bool(re.search(r'\bORDER\s+BY\b', modifiers, re.IGNORECASE))
+        # The ORDER BY clause ends at the last character that is not blank or inside a trailing comment
+        uncommented = re.sub(r'#[^\n]*', lambda m: ' ' * len(m.group(0)), masked)
+        self._order_end = len(uncommented.rstrip())
+        if self.key and self._has_order_by:
+            raise PagingError("Keyset paging orders by the key variable, remove ORDER BY")
+
+        projection = masked[select.end():projection_end]
+        select_all, projected = projected_variables(projection)
+        if select_all:
+            projected = list(dict.fromkeys(_VAR_RE.findall(masked[open_brace:self._close_brace])))
+        if self.key and self.key not in projected:
+            raise PagingError(f"Key variable ?{self.key} must be part of the result")
+        # The keyset FILTER goes into the WHERE clause, where a (expr AS ?key) alias is not bound yet
+        if self.key and self.key in _ALIAS_RE.findall(projection):
+            raise PagingError(f"Key variable ?{self.key} is computed in the SELECT clause, "
+                              "key on a variable bound in WHERE or page by offset")
+        # Ordering by every result column makes the order total, so OFFSET pages are stable
+        self._tiebreak = ' '.join(f"?{name}" for name in projected)
+
+    @property
+    def mode(self) -> str:
+        return "keyset" if self.key else "offset"
+
+    def page_query(self, offset: int = 0, after: Optional[str] = None) -> str:
+        """Render the query for one page, fetching one extra row to tell whether another page follows"""
+        limit = f"LIMIT {self.page_size + 1}"
+        if self.key:
+            body = self.query[:self._close_brace]
+            if after is not None:
+                body += f' FILTER(STR(?{self.key}) > "{escape_literal(after)}") '
+            return f"{body}{self.query[self._close_brace:]}\nORDER BY STR(?{self.key})\n{limit}"
+        if self._has_order_by:
+            query = f"{self.query[:self._order_end]} {self._tiebreak}{self.query[self._order_end:]}"
+        else:
+            query = f"{self.query}\nORDER BY {self._tiebreak}"
+        return f"{query}\n{limit} OFFSET {offset}"
+
+    def split_page(self, results: Dict[str, Any]) -> Tuple[Dict[str, Any], bool, Optional[str]]:
+        """Trim SPARQL JSON results to the page, returning (results, has_more, key value of the last row)"""
+        bindings = results.get('results', {}).get('bindings', [])
+        has_more = len(bindings) > self.page_size
+        bindings = bindings[:self.page_size]
+        last_key = None
+        if self.key and bindings:
+            if self.key not in bindings[-1]:
+                raise PagingError(f"Key variable ?{self.key} is unbound in a result row")
+            last_key = bindings[-1][self.key]['value']
+        page = dict(results)
+        page['results'] = {**results.get('results', {}), 'bindings': bindings}
+        return page, has_more, last_key
+
+    def next_cursor(self, repository: str, offset: int, last_key: Optional[str]) -> str:
+        """Token for the page after the one starting at offset (or ending at last_key)"""
+        state = {"r": repository, "q": self.query, "n": self.page_size, "k": self.key}
+        if self.key:
+            state["a"] = last_key
+        else:
+            state["o"] = offset + self.page_size
+        return encode_cursor(state)
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "PagedQuery":
+        return cls(state.get("q", ""), int(state.get("n", PAGE_SIZE_DEFAULT)), state.get("k"))
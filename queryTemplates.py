@@ -0,0 +1,300 @@
+import os
+import re
+import json
+import time
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+from rdfConvert import XSD, iri_term, literal_term
+
+# Where registered templates are kept, shared by every server worker
+QUERY_TEMPLATE_FOLDER = os.getenv("QUERY_TEMPLATE_FOLDER", os.path.join("uploads", "query_templates"))
+
+_NAME_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+_PARAM_RE = re.compile(r'\$([A-Za-z_][A-Za-z0-9_]*)')
+_VAR_RE = re.compile(r'[?$]([A-Za-z_][A-Za-z0-9_]*)')
+_AGGREGATE_RE = re.compile(r'\b(?:COUNT|SUM|MIN|MAX|AVG|SAMPLE|GROUP_CONCAT)\s*\(', re.IGNORECASE)
+# IRIs, string literals and comments, whose content must not be mistaken for syntax
+_OPAQUE_RE = re.compile(r'<[^<>"{}|^`\\\x00-\x20]*>'
+                        r'|"""(?:[^"\\]|\\.|"(?!""))*"""'
+                        r"|'''(?:[^'\\]|\\.|'(?!''))*'''"
+                        r'|"(?:[^"\\\n]|\\.)*"'
+                        r"|'(?:[^'\\\n]|\\.)*'"
+                        r'|#[^\n]*')
+
+PARAMETER_TYPES = {
+    'iri': None,
+    'string': f"{XSD}string",
+    'integer': f"{XSD}integer",
+    'decimal': f"{XSD}decimal",
+    'boolean': f"{XSD}boolean",
+    'date': f"{XSD}date",
+    'dateTime': f"{XSD}dateTime",
+}
+
+
+class TemplateError(ValueError):
+    """A template or a set of bindings is invalid"""
+
+
+def mask_query(query: str) -> str:
+    """Blank out IRIs, strings and comments, keeping every other character at its position"""
+    return _OPAQUE_RE.sub(lambda m: m.group(0)[0] + ' ' * (len(m.group(0)) - 1), query)
+
+
+def matching_brace(masked: str, start: int) -> int:
+    """Index of the '}' closing the '{' at start, in a masked query"""
+    depth = 0
+    for index in range(start, len(masked)):
+        if masked[index] == '{':
+            depth += 1
+        elif masked[index] == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError("Unbalanced braces in query")
+
+
+def projected_variables(projection: str) -> Tuple[bool, List[str]]:
+    """Return (is SELECT *, variables visible in the result) of a SELECT clause"""
+    if projection.strip() == '*':
+        return True, []
+    names, depth = [], 0
+    for index, char in enumerate(projection):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char in '?$' and depth == 0:
+            match = _VAR_RE.match(projection, index)
+            if match:
+                names.append(match.group(1))
+    names.extend(re.findall(r'\bAS\s+[?$]([A-Za-z_][A-Za-z0-9_]*)', projection, re.IGNORECASE))
+    return False, names
+
+
+class QueryTemplate:
+    """A named SELECT query with typed $parameters, rendered as one VALUES query for many bindings"""
+
+    def __init__(self, name: str, query: str, parameters: List[Dict[str, str]],
+                 repository: Optional[str] = None, description: str = "",
+                 created_at: Optional[float] = None):
+        if not isinstance(name, str) or not _NAME_RE.match(name):
+            raise TemplateError("Template name must be 1-64 letters, digits, '_' or '-'")
+        if not isinstance(query, str) or not query.strip():
+            raise TemplateError("Template query is empty")
+        if not isinstance(parameters, list) or not parameters:
+            raise TemplateError("A template needs at least one parameter")
+
+        self.name = name
+        self.query = query
+        self.repository = repository
+        self.description = description
+        self.created_at = created_at or time.time()
+        self.parameters: List[Dict[str, str]] = []
+        for parameter in parameters:
+            if not isinstance(parameter, dict) or not _NAME_RE.match(str(parameter.get('name', ''))):
+                raise TemplateError(f"Invalid parameter declaration: {parameter!r}")
+            param_type = parameter.get('type', 'iri')
+            if param_type not in PARAMETER_TYPES:
+                raise TemplateError(f"Unsupported type '{param_type}' for parameter '{parameter['name']}', "
+                                    f"use one of: {', '.join(PARAMETER_TYPES)}")
+            self.parameters.append({'name': parameter['name'], 'type': param_type})
+        self.parameter_names = [parameter['name'] for parameter in self.parameters]
+        if len(set(self.parameter_names)) != len(self.parameter_names):
+            raise TemplateError("Parameter names must be unique")
+
+        self._compile()
+
+    def _compile(self):
+        """Validate the query shape once and work out where bindings are injected"""
+        masked = mask_query(self.query)
+        used = set(_PARAM_RE.findall(masked))
+        missing = [name for name in self.parameter_names if name not in used]
+        if missing:
+            raise TemplateError(f"Parameters not used in the query as $name: {', '.join(missing)}")
+        undeclared = sorted(used - set(self.parameter_names))
+        if undeclared:
+            raise TemplateError(f"Undeclared parameters in the query: {', '.join(undeclared)}")
+
+        select = re.search(r'\bSELECT\b(\s+(?:DISTINCT|REDUCED)\b)?', masked, re.IGNORECASE)
+        if not select or re.search(r'\b(?:ASK|CONSTRUCT|DESCRIBE)\b', masked[:select.start()], re.IGNORECASE):
+            raise TemplateError("Only SELECT queries can be registered as templates")
+        open_brace = masked.find('{', select.end())
+        if open_brace < 0:
+            raise TemplateError("Query has no WHERE clause")
+        where = re.search(r'\bWHERE\b', masked[select.end():open_brace], re.IGNORECASE)
+        projection_end = select.end() + where.start() if where else open_brace
+        try:
+            close_brace = matching_brace(masked, open_brace)
+        except ValueError as e:
+            raise TemplateError(str(e))
+        modifiers = masked[close_brace + 1:]
+
+        select_all, projected = projected_variables(masked[select.end():projection_end])
+        # Parameter columns are needed in the result to split rows back out per binding
+        self._added_columns = [] if select_all else [name for name in self.parameter_names if name not in projected]
+        self._projection_end = projection_end
+        self._values_at = open_brace + 1
+        group_by = re.search(r'\bGROUP\s+BY\b', modifiers, re.IGNORECASE)
+        self._group_by_at = close_brace + 1 + group_by.end() if group_by else None
+        # An aggregate without GROUP BY is one implicit group; it becomes one group per binding
+        aggregates = _AGGREGATE_RE.search(masked[select.end():projection_end])
+        self._add_group_by_at = close_brace + 1 if aggregates and not group_by else None
+        # LIMIT/OFFSET apply to the whole result, so folding bindings together would change the answer
+        self.batchable = not re.search(r'\b(?:LIMIT|OFFSET)\b', modifiers, re.IGNORECASE)
+        # $name and ?name are the same SPARQL variable; use ?name in what is sent to GraphDB
+        self._compiled = ''.join(
+            '?' if masked[index] == '$' else char for index, char in enumerate(self.query)
+        )
+
+    def term(self, name: str, value: Any) -> Tuple[str, str]:
+        """Return (SPARQL term, lexical value as GraphDB reports it) for a bound value"""
+        param_type = next(parameter['type'] for parameter in self.parameters if parameter['name'] == name)
+        try:
+            if param_type == 'iri':
+                if not isinstance(value, str):
+                    raise ValueError("expected an IRI string")
+                return iri_term(value), value
+            if param_type == 'integer':
+                if isinstance(value, bool):
+                    raise ValueError("expected an integer")
+                lexical = str(int(value))
+            elif param_type == 'decimal':
+                if isinstance(value, bool):
+                    raise ValueError("expected a number")
+                float(value)
+                lexical = str(value)
+            elif param_type == 'boolean':
+                if isinstance(value, bool):
+                    lexical = 'true' if value else 'false'
+                elif str(value).lower() in ('true', 'false'):
+                    lexical = str(value).lower()
+                else:
+                    raise ValueError("expected true or false")
+            else:
+                if not isinstance(value, str):
+                    raise ValueError("expected a string")
+                lexical = value
+        except (TypeError, ValueError) as e:
+            raise TemplateError(f"Invalid value for parameter '{name}' ({param_type}): {e}")
+        return literal_term(lexical, PARAMETER_TYPES[param_type]), lexical
+
+    def binding_rows(self, bindings: List[Dict[str, Any]]) -> List[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """Check bindings and turn each into (SPARQL terms, lexical key), in parameter order"""
+        rows = []
+        for binding in bindings:
+            if not isinstance(binding, dict):
+                raise TemplateError("Each binding must be a JSON object")
+            unknown = sorted(set(binding) - set(self.parameter_names))
+            if unknown:
+                raise TemplateError(f"Unknown parameters: {', '.join(unknown)}")
+            missing = [name for name in self.parameter_names if name not in binding]
+            if missing:
+                raise TemplateError(f"Missing parameters: {', '.join(missing)}")
+            terms = [self.term(name, binding[name]) for name in self.parameter_names]
+            rows.append((tuple(term for term, _ in terms), tuple(key for _, key in terms)))
+        return rows
+
+    def render(self, rows: List[Tuple[str, ...]]) -> str:
+        """Instantiate the template with one VALUES row per binding (no rows validates the syntax only)"""
+        variables = ' '.join(f"?{name}" for name in self.parameter_names)
+        values = ' '.join(f"({' '.join(row)})" for row in dict.fromkeys(rows))
+        inserts = [(self._values_at, f" VALUES ({variables}) {{ {values} }} ")]
+        if self._added_columns:
+            inserts.append((self._projection_end, ' ' + ' '.join(f"?{name}" for name in self._added_columns) + ' '))
+        if self._group_by_at is not None:
+            inserts.append((self._group_by_at, f" {variables} "))
+        if self._add_group_by_at is not None:
+            inserts.append((self._add_group_by_at, f" GROUP BY {variables} "))
+
+        query = self._compiled
+        for position, text in sorted(inserts, reverse=True):
+            query = query[:position] + text + query[position:]
+        return query
+
+    def split(self, results: Dict[str, Any], keys: List[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+        """Split SPARQL JSON results into one result set per binding key"""
+        head_vars = [var for var in results.get('head', {}).get('vars', []) if var not in self._added_columns]
+        grouped: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in results.get('results', {}).get('bindings', []):
+            key = tuple(row.get(name, {}).get('value') for name in self.parameter_names)
+            grouped.setdefault(key, []).append(
+                {var: value for var, value in row.items() if var not in self._added_columns}
+            )
+        return [{'head': {'vars': head_vars}, 'results': {'bindings': grouped.get(key, [])}} for key in keys]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "repository": self.repository,
+            "parameters": self.parameters,
+            "query": self.query,
+            "batchable": self.batchable,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QueryTemplate":
+        return cls(data.get('name'), data.get('query'), data.get('parameters'),
+                   repository=data.get('repository'), description=data.get('description') or "",
+                   created_at=data.get('created_at'))
+
+
+class TemplateStore:
+    """File-backed template registry; parsed templates are cached until their file changes"""
+
+    def __init__(self, folder: str = QUERY_TEMPLATE_FOLDER):
+        self.folder = folder
+        self._cache: Dict[str, Tuple[float, QueryTemplate]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.folder, f"{name}.json")
+
+    def save(self, template: QueryTemplate):
+        """Atomically write a template, replacing any previous version"""
+        path = self._path(template.name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(template.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._cache[template.name] = (os.path.getmtime(path), template)
+
+    def get(self, name: str) -> Optional[QueryTemplate]:
+        if not _NAME_RE.match(name):
+            return None
+        path = self._path(name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            with self._lock:
+                self._cache.pop(name, None)
+            return None
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with open(path, 'r') as f:
+            template = QueryTemplate.from_dict(json.load(f))
+        with self._lock:
+            self._cache[name] = (mtime, template)
+        return template
+
+    def list(self) -> List[QueryTemplate]:
+        names = sorted(name[:-5] for name in os.listdir(self.folder) if name.endswith('.json'))
+        return [template for template in map(self.get, names) if template is not None]
+
+    def delete(self, name: str) -> bool:
+        if not _NAME_RE.match(name):
+            return False
+        with self._lock:
+            self._cache.pop(name, None)
+        try:
+            os.remove(self._path(name))
+            return True
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,464 @@
+import os
+import re
+import time
+import hashlib
+from functools import lru_cache
+from urllib.parse import urljoin
+from typing import Optional, Dict, Any, List, Tuple, Iterator, Union
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+RDF_TYPE = f"<{RDF}type>"
+RDF_FIRST = f"<{RDF}first>"
+RDF_REST = f"<{RDF}rest>"
+RDF_NIL = f"<{RDF}nil>"
+
+Triple = Tuple[str, str, str]
+
+# Statements per batch handed to the uploader by the streaming conversion
+CONVERT_BATCH_TRIPLES = int(os.getenv("CONVERT_BATCH_TRIPLES", "20000"))
+
+KEYWORDS = {'@base', '@container', '@context', '@direction', '@graph', '@id', '@import', '@included', '@index',
+            '@json', '@language', '@list', '@nest', '@none', '@prefix', '@propagate', '@protected',
+            '@reverse', '@set', '@type', '@value', '@version', '@vocab'}
+
+_ABSOLUTE_IRI_RE = re.compile(r'^[A-Za-z][A-Za-z0-9+.\-]*:')
+_INVALID_IRI_CHARS_RE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+
+class UnsupportedJsonLd(ValueError):
+    """Valid JSON-LD that the local converter does not implement; GraphDB's own parser has to load it"""
+
+
+@lru_cache(maxsize=65536)
+def iri_term(iri: str) -> str:
+    """Format an IRI as an N-Triples term"""
+    if _INVALID_IRI_CHARS_RE.search(iri):
+        raise ValueError(f"Invalid IRI: {iri!r}")
+    return f"<{iri}>"
+
+
+def escape_literal(value: str) -> str:
+    """Escape a string for use inside an N-Triples literal"""
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def literal_term(value: str, datatype: Optional[str] = None, language: Optional[str] = None) -> str:
+    """Format a literal as an N-Triples term"""
+    lexical = f'"{escape_literal(value)}"'
+    if language:
+        return f"{lexical}@{language.lower()}"
+    if datatype and datatype != f"{XSD}string":
+        return f"{lexical}^^{iri_term(datatype)}"
+    return lexical
+
+
+def canonical_double(value: float) -> str:
+    """Canonical xsd:double lexical form used by JSON-LD toRdf (e.g. 5.56761E1)"""
+    mantissa, exponent = f"{value:.15E}".split('E')
+    mantissa = mantissa.rstrip('0')
+    if mantissa.endswith('.'):
+        mantissa += '0'
+    return f"{mantissa}E{int(exponent)}"
+
+
+class JsonLdContext:
+    """The subset of a JSON-LD @context needed to turn compacted documents into triples"""
+
+    def __init__(self, definition: Any = None, parent: Optional["JsonLdContext"] = None):
+        self.terms: Dict[str, Dict[str, Any]] = {key: dict(term) for key, term in parent.terms.items()} if parent else {}
+        self.vocab: Optional[str] = parent.vocab if parent else None
+        self.base: Optional[str] = parent.base if parent else None
+        self.language: Optional[str] = parent.language if parent else None
+        self._expanded: Dict[Tuple[str, bool], Optional[str]] = {}
+
+        definitions = definition if isinstance(definition, list) else [definition]
+        for item in definitions:
+            if item is None:
+                continue
+            if not isinstance(item, dict):
+                raise UnsupportedJsonLd("Remote @context references are not supported, inline the context")
+            self._apply(item)
+
+    def _apply(self, definition: Dict[str, Any]):
+        for keyword in ('@import', '@propagate', '@direction'):
+            if keyword in definition:
+                raise UnsupportedJsonLd(f"{keyword} in a context is not supported")
+        if '@vocab' in definition:
+            self.vocab = definition['@vocab']
+        if '@base' in definition:
+            base = definition['@base']
+            self.base = base if base is None or _ABSOLUTE_IRI_RE.match(base) else self.resolve(base)
+        if '@language' in definition:
+            self.language = definition['@language']
+
+        for key, value in definition.items():
+            if key.startswith('@'):
+                continue
+            if value is None:
+                self.terms.pop(key, None)
+            elif isinstance(value, str):
+                self.terms[key] = {'@id': value}
+            elif isinstance(value, dict):
+                unsupported = [keyword for keyword in ('@reverse', '@context', '@nest', '@index', '@direction')
+                               if keyword in value]
+                if unsupported or value.get('@type') in ('@json', '@none'):
+                    raise UnsupportedJsonLd(f"Term '{key}' uses {', '.join(unsupported) or value['@type']}, "
+                                            "which is not supported")
+                containers = self._container_set(value.get('@container'))
+                if containers - {'@list', '@set', '@language', '@index'}:
+                    raise UnsupportedJsonLd(f"Term '{key}' uses @container {value['@container']}, "
+                                            "which is not supported")
+                self.terms[key] = dict(value, **{'@container': containers})
+
+        # Resolve compact IRIs inside term definitions now that every prefix is known
+        for term in self.terms.values():
+            if term.get('@id') is not None:
+                term['@id'] = self.expand_iri(term['@id'], vocab=True) or term['@id']
+            if '@type' in term and term['@type'] not in ('@id', '@vocab'):
+                term['@type'] = self.expand_iri(term['@type'], vocab=True) or term['@type']
+        # Expansions made while terms were still being resolved may be stale
+        self._expanded.clear()
+
+    @staticmethod
+    def _container_set(container: Any) -> frozenset:
+        if container is None:
+            return frozenset()
+        return frozenset(container if isinstance(container, list) else [container])
+
+    def expand_iri(self, value: str, vocab: bool = False) -> Optional[str]:
+        """Expand a term, compact IRI or relative IRI into an absolute IRI, once per context"""
+        key = (value, vocab)
+        if key not in self._expanded:
+            self._expanded[key] = self._expand_iri(value, vocab)
+        return self._expanded[key]
+
+    def _expand_iri(self, value: str, vocab: bool) -> Optional[str]:
+        if not isinstance(value, str):
+            raise ValueError(f"Expected an IRI string, got {value!r}")
+        if value.startswith('@') or value.startswith('_:'):
+            return value
+        if vocab and value in self.terms and '@id' in self.terms[value]:
+            return self.terms[value]['@id']
+        # A term defined without @id expands like an undefined one: compact IRI, absolute IRI or @vocab
+        if ':' in value:
+            prefix, suffix = value.split(':', 1)
+            if not suffix.startswith('//') and prefix in self.terms and self.terms[prefix].get('@id'):
+                return self.terms[prefix]['@id'] + suffix
+            if _ABSOLUTE_IRI_RE.match(value):
+                return value
+        if vocab and self.vocab is not None:
+            return self.vocab + value
+        return None if vocab else self.resolve(value)
+
+    def resolve(self, value: str) -> str:
+        """Resolve a relative IRI against @base; without one it depends on the document URL, known only to GraphDB"""
+        if self.base is None:
+            raise UnsupportedJsonLd(f"Relative IRI '{value}' cannot be resolved without @base")
+        return urljoin(self.base, value)
+
+    def expand_type(self, value: str) -> str:
+        """Expand an @type value or @vocab-coerced string: vocabulary-relative first, then document-relative"""
+        return self.expand_iri(value, vocab=True) or self.resolve(value)
+
+    def keyword(self, key: str) -> Optional[str]:
+        """The keyword a node key stands for, following aliases defined in the context"""
+        if key.startswith('@'):
+            return key if key in KEYWORDS else None
+        alias = self.terms.get(key, {}).get('@id')
+        return alias if alias in KEYWORDS else None
+
+    def expand_keys(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a node or value object with keyword aliases replaced by the keywords themselves"""
+        expanded: Dict[str, Any] = {}
+        for key, value in node.items():
+            name = self.keyword(key) or key
+            if name in expanded:
+                raise ValueError(f"Colliding keywords: '{key}' and another key both mean {name}")
+            expanded[name] = value
+        return expanded
+
+    def term_definition(self, key: str) -> Dict[str, Any]:
+        return self.terms.get(key, {})
+
+
+class JsonLdConverter:
+    """Converts a JSON-LD document into N-Triples terms, one top-level subject at a time"""
+
+    def __init__(self, document: Union[Dict[str, Any], List[Any]]):
+        self.document = document
+        self._blank_counter = 0
+
+    def new_blank_node(self) -> str:
+        self._blank_counter += 1
+        return f"_:b{self._blank_counter}"
+
+    def top_level_nodes(self) -> Iterator[Tuple[Dict[str, Any], JsonLdContext]]:
+        """Yield every top-level node object with the context it is evaluated in"""
+        document = self.document
+        if isinstance(document, list):
+            for node in document:
+                yield from self._unwrap(node, JsonLdContext())
+        else:
+            yield from self._unwrap(document, JsonLdContext())
+
+    def _unwrap(self, node: Any, context: JsonLdContext) -> Iterator[Tuple[Dict[str, Any], JsonLdContext]]:
+        if not isinstance(node, dict):
+            return
+        if '@context' in node:
+            context = JsonLdContext(node['@context'], context)
+        keys = context.expand_keys(node)
+        if '@graph' in keys:
+            if set(keys) - {'@context', '@graph'}:
+                raise UnsupportedJsonLd("Named graphs inside a document (@graph with @id or properties) "
+                                        "are not supported")
+            graph = keys['@graph']
+            for child in graph if isinstance(graph, list) else [graph]:
+                yield from self._unwrap(child, context)
+        else:
+            yield node, context
+
+    def iter_subjects(self) -> Iterator[Tuple[str, List[Triple]]]:
+        """Yield (subject term, triples) for every top-level node, nested nodes included"""
+        for node, context in self.top_level_nodes():
+            triples: List[Triple] = []
+            subject = self._node_triples(node, context, triples)
+            yield subject, triples
+
+    def iter_triples(self) -> Iterator[Triple]:
+        for _, triples in self.iter_subjects():
+            yield from triples
+
+    def _node_triples(self, node: Dict[str, Any], context: JsonLdContext, triples: List[Triple]) -> str:
+        """Emit the triples of a node object and return its subject term"""
+        if '@context' in node:
+            context = JsonLdContext(node['@context'], context)
+        keys = context.expand_keys(node)
+
+        node_id = keys.get('@id')
+        if node_id is None:
+            subject = self.new_blank_node()
+        else:
+            expanded = context.expand_iri(node_id)
+            subject = expanded if expanded.startswith('_:') else iri_term(expanded)
+
+        types = keys.get('@type', [])
+        for node_type in types if isinstance(types, list) else [types]:
+            type_iri = context.expand_type(node_type)
+            triples.append((subject, RDF_TYPE, type_iri if type_iri.startswith('_:') else iri_term(type_iri)))
+
+        for key, value in node.items():
+            keyword = context.keyword(key)
+            if keyword in ('@id', '@type', '@context', '@index'):
+                continue
+            if keyword is not None:
+                raise UnsupportedJsonLd(f"{keyword} in a node object is not supported")
+            if key.startswith('@'):
+                # Keyword-like keys that are not keywords are ignored by JSON-LD expansion
+                continue
+            predicate_iri = context.expand_iri(key, vocab=True)
+            if not predicate_iri or predicate_iri.startswith('_:'):
+                # Undefined terms and blank-node properties are dropped, as in JSON-LD expansion
+                continue
+            if not _ABSOLUTE_IRI_RE.match(predicate_iri):
+                raise UnsupportedJsonLd(f"Property '{key}' does not expand to an absolute IRI")
+            predicate = iri_term(predicate_iri)
+            definition = context.term_definition(key)
+            containers = definition.get('@container', frozenset())
+            if '@language' in containers:
+                objects = self._language_map_terms(key, value)
+            else:
+                if '@index' in containers:
+                    if not isinstance(value, dict):
+                        raise ValueError(f"Index map '{key}' must be a JSON object")
+                    value = list(value.values())
+                values = list(self._flatten(value))
+                if '@list' in containers:
+                    values = [{'@list': values}]
+                objects = [self._object_term(item, definition, context, triples) for item in values]
+            for obj in objects:
+                if obj is not None:
+                    triples.append((subject, predicate, obj))
+        return subject
+
+    def _flatten(self, value: Any) -> Iterator[Any]:
+        """Values of a property; nested arrays outside @list are flattened as in JSON-LD 1.1 expansion"""
+        if isinstance(value, list):
+            for item in value:
+                yield from self._flatten(item)
+        else:
+            yield value
+
+    @staticmethod
+    def _language_map_terms(key: str, value: Any) -> List[str]:
+        """Literals of a language map ({"en": "...", "de": [...]}); @none means no language tag"""
+        if not isinstance(value, dict):
+            raise ValueError(f"Language map '{key}' must be a JSON object")
+        terms = []
+        for language, strings in value.items():
+            for string in strings if isinstance(strings, list) else [strings]:
+                if string is None:
+                    continue
+                if not isinstance(string, str):
+                    raise ValueError(f"Language map '{key}' may only hold strings")
+                terms.append(literal_term(string, None, None if language == '@none' else language))
+        return terms
+
+    def _object_term(self, value: Any, definition: Dict[str, Any], context: JsonLdContext,
+                     triples: List[Triple]) -> Optional[str]:
+        """Convert a property value into an object term, emitting nested triples as needed"""
+        coerced_type = definition.get('@type')
+
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return literal_term('true' if value else 'false', f"{XSD}boolean")
+        if isinstance(value, int):
+            return literal_term(str(value), coerced_type if coerced_type not in (None, '@id', '@vocab') else f"{XSD}integer")
+        if isinstance(value, float):
+            if value.is_integer() and abs(value) < 1e21:
+                return literal_term(str(int(value)), f"{XSD}integer")
+            return literal_term(canonical_double(value), f"{XSD}double")
+        if isinstance(value, str):
+            if coerced_type in ('@id', '@vocab'):
+                iri = context.expand_type(value) if coerced_type == '@vocab' else context.expand_iri(value)
+                return iri if iri.startswith('_:') else iri_term(iri)
+            language = definition.get('@language', context.language) if coerced_type is None else None
+            return literal_term(value, coerced_type, language)
+        if isinstance(value, dict):
+            if '@context' in value:
+                return self._node_triples(value, context, triples)
+            keys = context.expand_keys(value)
+            if '@value' in keys:
+                unsupported = set(keys) - {'@value', '@type', '@language', '@index'}
+                if unsupported or keys.get('@type') == '@json':
+                    raise UnsupportedJsonLd(f"Value object with {', '.join(sorted(unsupported)) or '@json'} "
+                                            "is not supported")
+                raw = keys['@value']
+                if raw is None:
+                    return None
+                if isinstance(raw, (dict, list)):
+                    raise ValueError("@value must be a string, number or boolean")
+                datatype = keys.get('@type')
+                datatype = context.expand_type(datatype) if datatype else None
+                if isinstance(raw, (bool, int, float)) and datatype is None:
+                    return self._object_term(raw, {}, context, triples)
+                if isinstance(raw, float):
+                    raw = canonical_double(raw)
+                elif isinstance(raw, bool):
+                    raw = 'true' if raw else 'false'
+                return literal_term(str(raw), datatype, keys.get('@language'))
+            if '@list' in keys:
+                items = keys['@list']
+                return self._list_term(items if isinstance(items, list) else [items], definition, context, triples)
+            if '@set' in keys:
+                raise UnsupportedJsonLd("@set objects are not supported, use a plain array")
+            if '@id' in keys and len(keys) == 1:
+                iri = context.expand_iri(keys['@id'])
+                return iri if iri.startswith('_:') else iri_term(iri)
+            return self._node_triples(value, context, triples)
+        if isinstance(value, list):
+            raise UnsupportedJsonLd("Lists of lists are not supported")
+        return None
+
+    def _list_term(self, items: List[Any], definition: Dict[str, Any], context: JsonLdContext,
+                   triples: List[Triple]) -> str:
+        """Emit an rdf:first/rdf:rest chain and return its head"""
+        items = [item for item in items if item is not None]
+        if not items:
+            return RDF_NIL
+        head = self.new_blank_node()
+        current = head
+        for index, item in enumerate(items):
+            obj = self._object_term(item, definition, context, triples)
+            if obj is not None:
+                triples.append((current, RDF_FIRST, obj))
+            rest = RDF_NIL if index == len(items) - 1 else self.new_blank_node()
+            triples.append((current, RDF_REST, rest))
+            current = rest
+        return head
+
+
+def ntriples_line(triple: Triple) -> str:
+    """Serialise a triple as one N-Triples line"""
+    return f"{triple[0]} {triple[1]} {triple[2]} .\n"
+
+
+def canonicalise_blank_nodes(triples: List[Triple]) -> List[Triple]:
+    """Relabel blank nodes in order of first appearance so equal content gives equal output"""
+    labels: Dict[str, str] = {}
+
+    def relabel(term: str) -> str:
+        if not term.startswith('_:'):
+            return term
+        if term not in labels:
+            labels[term] = f"_:c{len(labels)}"
+        return labels[term]
+
+    return [(relabel(s), p, relabel(o)) for s, p, o in triples]
+
+
+class ConversionStats:
+    """Counters and timing of one streaming JSON-LD to N-Triples/N-Quads conversion"""
+
+    def __init__(self):
+        self.subjects = 0
+        self.triples = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "subjects": self.subjects,
+            "triples": self.triples,
+            "duplicates_dropped": self.duplicates,
+            "batches": self.batches,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 3),
+            "triples_per_second": round(self.triples / self.seconds) if self.seconds else None,
+        }
+
+
+def iter_ntriples_batches(document: Union[Dict[str, Any], List[Any]], graph: Optional[str] = None,
+                          batch_triples: int = CONVERT_BATCH_TRIPLES,
+                          stats: Optional[ConversionStats] = None) -> Iterator[bytes]:
+    """Stream a JSON-LD document as encoded N-Triples (N-Quads with a graph) batches, dropping duplicate statements"""
+    stats = stats or ConversionStats()
+    suffix = f" {iri_term(graph)} .\n" if graph else " .\n"
+    seen = set()
+    lines: List[str] = []
+    started = time.perf_counter()
+
+    def flush() -> bytes:
+        batch = ''.join(lines).encode('utf-8')
+        lines.clear()
+        stats.batches += 1
+        stats.bytes += len(batch)
+        return batch
+
+    for _, triples in JsonLdConverter(document).iter_subjects():
+        stats.subjects += 1
+        for s, p, o in triples:
+            line = f"{s} {p} {o}{suffix}"
+            digest = hashlib.blake2b(line.encode('utf-8'), digest_size=16).digest()
+            if digest in seen:
+                stats.duplicates += 1
+                continue
+            seen.add(digest)
+            lines.append(line)
+            stats.triples += 1
+        if len(lines) >= batch_triples:
+            batch = flush()
+            # Only count time spent converting, not time the consumer spends sending
+            stats.seconds += time.perf_counter() - started
+            yield batch
+            started = time.perf_counter()
+    if lines:
+        batch = flush()
+        stats.seconds += time.perf_counter() - started
+        yield batch
+    else:
+        stats.seconds += time.perf_counter() - started
@@ -0,0 +1,118 @@
+import os
+import copy
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Metadata cache configuration
+METADATA_TTL_SECONDS = float(os.getenv("METADATA_TTL_SECONDS", "30"))
+METADATA_FETCH_WORKERS = int(os.getenv("METADATA_FETCH_WORKERS", "8"))
+
+UNKNOWN = "Unknown"
+
+
+class RepositoryMetadata:
+    """TTL cache of the repository catalogue and per-repository stats, fetched concurrently"""
+
+    def __init__(self, fetch_catalogue: Callable[[], List[Dict[str, Any]]],
+                 fetch_size: Callable[[str], int],
+                 fetch_graphs: Callable[[str], List[str]],
+                 ttl: float = METADATA_TTL_SECONDS,
+                 workers: int = METADATA_FETCH_WORKERS):
+        self.fetch_catalogue = fetch_catalogue
+        self.fetch_size = fetch_size
+        self.fetch_graphs = fetch_graphs
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metadata")
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _get(self, key: Tuple, loader: Callable[[], Any]) -> Any:
+        """Return a fresh cached value or load it once, even under concurrent requests"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._counters["hits"] += 1
+                return entry[1]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] > time.monotonic():
+                    self._counters["hits"] += 1
+                    return entry[1]
+                self._counters["misses"] += 1
+                generation = self._generation
+            value = loader()
+            with self._lock:
+                # Do not keep a value that an invalidation raced with
+                if generation == self._generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+
+    def catalogue(self) -> List[Dict[str, Any]]:
+        """Return the repository listing (a copy callers may modify)"""
+        return copy.deepcopy(self._get(("catalogue",), self.fetch_catalogue))
+
+    def size(self, repository: str) -> int:
+        return self._get(("size", repository), lambda: self.fetch_size(repository))
+
+    def graphs(self, repository: str) -> List[str]:
+        return list(self._get(("graphs", repository), lambda: self.fetch_graphs(repository)))
+
+    def info(self, repository: str) -> Optional[Dict[str, Any]]:
+        """Catalogue entry plus triple count and named graphs, or None if the repository does not exist"""
+        catalogue = self._executor.submit(self.catalogue)
+        size = self._executor.submit(self.size, repository)
+        graphs = self._executor.submit(self.graphs, repository)
+
+        repo_info = next((repo for repo in catalogue.result() if repo['id'] == repository), None)
+        if not repo_info:
+            return None
+
+        try:
+            repo_info['triple_count'] = size.result()
+        except Exception as e:
+            logger.warning(f"Could not get size of repository '{repository}': {str(e)}")
+            repo_info['triple_count'] = UNKNOWN
+        try:
+            repo_info['named_graphs'] = graphs.result()
+        except Exception as e:
+            logger.warning(f"Could not list named graphs of repository '{repository}': {str(e)}")
+            repo_info['named_graphs'] = []
+        return repo_info
+
+    def invalidate(self, repository: Optional[str] = None):
+        """Drop cached stats of one repository, or everything including the catalogue"""
+        with self._lock:
+            self._generation += 1
+            self._counters["invalidations"] += 1
+            if repository is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if len(key) > 1 and key[1] == repository]:
+                del self._entries[key]
+
+    def invalidate_catalogue(self):
+        with self._lock:
+            self._generation += 1
+            self._counters["invalidations"] += 1
+            self._entries.pop(("catalogue",), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "fresh_entries": sum(1 for expires, _ in self._entries.values() if expires > now),
+                "counters": dict(self._counters),
+            }
@@ -0,0 +1,131 @@
+import os
+import copy
+from typing import Optional, Dict, Any, List
+
+# Repository profiles
+REPOSITORY_PROFILE_DEFAULT = os.getenv("REPOSITORY_PROFILE_DEFAULT", "read-optimized")  # used by /repositories/create
+REPOSITORY_PROFILE_SERVING = os.getenv("REPOSITORY_PROFILE_SERVING", "read-optimized")  # switched to after provisioning
+
+SYSTEM_NS = "http://www.ontotext.com/owlim/system#"
+
+# GraphDB repository parameters per profile; anything not listed keeps the base value below
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Fastest raw ingest: no inference and no optional indexes to maintain while loading
+    "bulk-load": {
+        "description": "Initial loads: empty ruleset, predicate list, literal and context indexes off",
+        "params": {
+            "ruleset": "empty",
+            "enablePredicateList": "false",
+            "enableLiteralIndex": "false",
+            "enableContextIndex": "false",
+        },
+    },
+    # Serving configuration: inference plus every index that speeds up queries
+    "read-optimized": {
+        "description": "Query serving: rdfsplus-optimized inference, all optional indexes on",
+        "params": {
+            "ruleset": "rdfsplus-optimized",
+            "enablePredicateList": "true",
+            "enableLiteralIndex": "true",
+            "enableContextIndex": "true",
+        },
+    },
+    # Frequent small writes: lighter inference, only the context index needed by graph replace and clear
+    "write-heavy": {
+        "description": "Frequent updates: rdfs-optimized inference, context index only",
+        "params": {
+            "ruleset": "rdfs-optimized",
+            "enablePredicateList": "false",
+            "enableLiteralIndex": "false",
+            "enableContextIndex": "true",
+        },
+    },
+}
+
+_ALIASES = {"read-optimised": "read-optimized", "bulk": "bulk-load"}
+
+_PARAM_LABELS = {
+    "baseURL": "Base URL",
+    "defaultNS": "Default namespaces for imports(';' delimited)",
+    "imports": "Imported RDF files(';' delimited)",
+    "ruleset": "Ruleset",
+    "storageFolder": "Storage folder",
+    "repositoryType": "Repository type",
+    "checkForInconsistencies": "Enable consistency checks",
+    "disableSameAs": "Disable owl:sameAs",
+    "enablePredicateList": "Enable predicate list index",
+    "enableLiteralIndex": "Enable literal index",
+    "enableContextIndex": "Enable context index",
+    "readOnly": "Read-only",
+}
+
+_BASE_PARAMS = {
+    "baseURL": "http://example.org/owlim#",
+    "defaultNS": "",
+    "imports": "",
+    "storageFolder": "storage",
+    "repositoryType": "file-repository",
+    "checkForInconsistencies": "false",
+    "disableSameAs": "true",
+    "readOnly": "false",
+}
+
+
+def resolve_profile(name: Optional[str]) -> str:
+    """Canonical profile name, raising ValueError for unknown ones"""
+    name = (name or REPOSITORY_PROFILE_DEFAULT).strip().lower()
+    name = _ALIASES.get(name, name)
+    if name not in PROFILES:
+        raise ValueError(f"Unknown repository profile '{name}'. Use: {', '.join(PROFILES)}")
+    return name
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    return [{"name": name, "description": profile["description"], "params": dict(profile["params"]),
+             "default": name == REPOSITORY_PROFILE_DEFAULT, "serving": name == REPOSITORY_PROFILE_SERVING}
+            for name, profile in PROFILES.items()]
+
+
+def profile_params(profile: str, ruleset: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+    """GraphDB 'params' block for a profile, optionally with a different ruleset"""
+    values = {**_BASE_PARAMS, **PROFILES[profile]["params"]}
+    if ruleset:
+        values["ruleset"] = ruleset
+    return {key: {"name": key, "label": _PARAM_LABELS.get(key, key), "value": value} for key, value in values.items()}
+
+
+def repository_config(repository_id: str, title: str, profile: str, ruleset: Optional[str] = None) -> Dict[str, Any]:
+    """Repository creation payload for GraphDB's REST API"""
+    return {
+        "id": repository_id,
+        "title": title,
+        "type": "graphdb",
+        "params": profile_params(profile, ruleset),
+    }
+
+
+def reconfigure(current: Dict[str, Any], profile: str, ruleset: Optional[str] = None) -> Dict[str, Any]:
+    """Existing repository configuration with a profile's parameters applied on top"""
+    config = copy.deepcopy(current)
+    params = config.setdefault("params", {})
+    for key, param in profile_params(profile, ruleset).items():
+        if key in _BASE_PARAMS:
+            continue  # storage location, base URL and the like are never changed by a profile
+        params.setdefault(key, {"name": key, "label": param["label"]})["value"] = param["value"]
+    return config
+
+
+def current_ruleset(config: Dict[str, Any]) -> Optional[str]:
+    return config.get("params", {}).get("ruleset", {}).get("value")
+
+
+def switch_ruleset_update(ruleset: str) -> str:
+    """SPARQL update making a built-in or already known ruleset the repository default"""
+    if not ruleset or any(char in ruleset for char in '"\\\n\r'):
+        raise ValueError(f"Invalid ruleset name: {ruleset!r}")
+    return (f"PREFIX sys: <{SYSTEM_NS}>\n"
+            f"INSERT DATA {{ _:b sys:addRuleset \"{ruleset}\" . _:b sys:defaultRuleset \"{ruleset}\" }}")
+
+
+# Recomputes every inferred statement with the current default ruleset
+REINFER_UPDATE = f"PREFIX sys: <{SYSTEM_NS}>\nINSERT DATA {{ [] sys:reinfer [] }}"
@@ -0,0 +1,63 @@
+import os
+import hashlib
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows only runs the single-process development server
+    fcntl = None
+
+# State that every server worker process on the host has to agree on
+SHARED_STATE_FOLDER = os.getenv("SHARED_STATE_FOLDER", os.path.join("uploads", "shared_state"))
+
+_COUNTER_WIDTH = 20
+
+
+class WriteGenerations:
+    """Per-repository write counters kept in files, so a write seen by one worker reaches all of them"""
+
+    def __init__(self, folder: str = os.path.join(SHARED_STATE_FOLDER, "generations")):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, repository: str) -> str:
+        key = hashlib.sha1(repository.encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, f"{key}.gen")
+
+    def current(self, repository: str) -> int:
+        """Number of write boundaries (start and end of every write) any worker has recorded"""
+        try:
+            with open(self._path(repository), 'rb') as f:
+                return int(f.read(_COUNTER_WIDTH) or 0)
+        except FileNotFoundError:
+            return 0
+
+    def bump(self, repository: str) -> int:
+        """Advance the repository's counter and return the new value"""
+        fd = os.open(self._path(repository), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            value = int(os.read(fd, _COUNTER_WIDTH) or 0) + 1
+            # Fixed width and no truncation, so a concurrent reader sees the old or the new value
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, str(value).zfill(_COUNTER_WIDTH).encode('ascii'))
+            return value
+        finally:
+            os.close(fd)
+
+
+def process_alive(pid: Optional[int]) -> bool:
+    """Whether a process of this host still exists"""
+    if not pid:
+        return False
+    if os.name == 'nt':
+        # os.kill() would terminate the process there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
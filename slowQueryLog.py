@@ -0,0 +1,425 @@
+import os
+import re
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows only runs the single-process development server
+    fcntl = None
+
+from queryCache import normalize_query
+from queryTemplates import mask_query, matching_brace
+
+logger = logging.getLogger(__name__)
+
+# Queries and updates slower than this are kept in the log
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "1000"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "500"))  # entries kept in memory
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "")  # JSON lines file entries are appended to, empty disables
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"  # capture GraphDB plans automatically
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "1000"))
+SLOW_QUERY_SAMPLES = 256  # durations kept per fingerprint for percentiles
+SLOW_QUERY_MAX_TEXT = 4000  # characters of query text stored per entry
+SLOW_QUERY_MAX_SAMPLE = int(os.getenv("SLOW_QUERY_MAX_SAMPLE", "16384"))  # longest query kept per fingerprint for explain
+
+EXPLAIN_GRAPH = "<http://www.ontotext.com/explain>"
+
+# Literals and numbers are replaced so queries differing only in constants share a fingerprint
+_CONSTANT_RE = re.compile(r'(<[^<>"{}|^`\\\s]*>)'
+                          r'|"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+                          r'|(?<![\w?$:.-])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w:])')
+# Tokens of a query whose literals are already replaced, to tell which IRIs are constants
+_TERM_TOKEN_RE = re.compile(r'(?P<iri><[^<>"{}|^`\\\s]*>)'
+                            r'|(?P<var>[?$]\w+)'
+                            r'|(?P<pname>(?:[A-Za-z][\w-]*(?:\.[\w-]+)*)?:[\w%-]*(?:\.[\w%-]+)*)'
+                            r'|(?P<word>[A-Za-z_]\w*)'
+                            r'|(?P<datatype>\^\^)'
+                            r'|(?P<lang>@[A-Za-z][\w-]*)'
+                            r'|(?P<placeholder>\?)'
+                            r'|(?P<punct>[{}()\[\].;,/|^])')
+# The IRI after these keywords names a graph or service and is part of the query's shape
+_NAMING_KEYWORDS = {'GRAPH', 'SERVICE', 'FROM', 'WITH', 'USING', 'INTO', 'TO'}
+_PLACEHOLDER_RUN_RE = re.compile(r'\?(?![\w])(?:\s+\?(?![\w]))+')
+_FORM_RE = re.compile(r'\b(SELECT|CONSTRUCT|DESCRIBE|ASK)\b', re.IGNORECASE)
+
+
+def _mask_constant_iris(text: str) -> str:
+    """Replace IRIs and prefixed names in subject/object positions and expressions by '?', VALUES rows by '?+'
+
+    Predicates, datatypes, function names and graph or service names are kept.
+    """
+    spans = []
+    depth = parens = 0
+    values_depth = values_start = None
+    values_pending = keep_next = after_datatype = False
+    position = 'S'
+    blank_nodes = []
+    for match in _TERM_TOKEN_RE.finditer(text):
+        kind, token = match.lastgroup, match.group()
+        if kind == 'datatype':
+            after_datatype = True
+            continue
+        if after_datatype:
+            after_datatype = False
+            if kind in ('iri', 'pname'):
+                continue
+        if kind == 'lang':
+            continue
+        if kind == 'punct':
+            if token == '{':
+                depth += 1
+                if values_pending:
+                    values_depth, values_start, values_pending = depth, match.end(), False
+                position = 'S'
+            elif token == '}':
+                if values_depth == depth:
+                    # However many rows of whatever constants, it is the same query
+                    spans.append((values_start, match.start(), ' ?+ '))
+                    values_depth = None
+                depth = max(0, depth - 1)
+                position = 'S'
+            elif token == '(':
+                parens += 1
+            elif token == ')':
+                parens = max(0, parens - 1)
+            elif parens or values_depth is not None:
+                continue
+            elif token == '.':
+                position = 'S'
+            elif token == ';':
+                position = 'P'
+            elif token == ',':
+                position = 'O'
+            elif token == '[':
+                # A blank node property list starts with a predicate and is a term where it stands
+                blank_nodes.append('P' if position == 'S' else 'O')
+                position = 'P'
+            elif token == ']' and blank_nodes:
+                position = blank_nodes.pop()
+            elif token in '/|' and position == 'O':
+                # Property path: the next term continues the predicate
+                position = 'P'
+            continue
+        if kind == 'word':
+            keyword = token.upper()
+            if token == 'a' and not parens:
+                position = 'O'
+            elif keyword == 'VALUES':
+                values_pending = True
+            elif keyword in _NAMING_KEYWORDS:
+                keep_next = True
+            elif keyword not in ('NAMED', 'SILENT') and not parens:
+                position = 'S'
+            continue
+        if kind == 'placeholder' and position == 'O' and match.start() > 0 and not text[match.start() - 1].isspace():
+            # A '?' glued to a predicate is a path modifier, not a replaced literal
+            continue
+
+        if kind in ('iri', 'pname') and depth and not keep_next and values_depth is None:
+            if parens:
+                if not text.startswith('(', match.end()):
+                    spans.append((*match.span(), '?'))
+            elif position in ('S', 'O'):
+                spans.append((*match.span(), '?'))
+        keep_next = False
+        if not parens and values_depth is None:
+            position = 'P' if position == 'S' else 'O'
+
+    parts, last = [], 0
+    for start, end, replacement in spans:
+        parts.append(text[last:start])
+        parts.append(replacement)
+        last = end
+    parts.append(text[last:])
+    return ''.join(parts)
+
+
+def query_fingerprint(query: str) -> str:
+    """Normalised query text with constants replaced by '?' (runs of them, e.g. VALUES rows, by '?+')"""
+    normalized = _CONSTANT_RE.sub(lambda m: m.group(1) or '?', normalize_query(query))
+    return _PLACEHOLDER_RUN_RE.sub('?+', _mask_constant_iris(normalized))
+
+
+def fingerprint_id(fingerprint: str) -> str:
+    return hashlib.blake2b(fingerprint.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def explain_query(query: str) -> str:
+    """Rewrite a query to ask GraphDB for its plan instead of its results"""
+    masked = mask_query(query)
+    form = _FORM_RE.search(masked)
+    if not form:
+        raise ValueError("Only SELECT, CONSTRUCT, DESCRIBE and ASK queries can be explained")
+    position = form.end()
+    if form.group(1).upper() == 'CONSTRUCT':
+        template = masked.find('{', position)
+        if template >= 0 and not masked[position:template].strip():
+            position = matching_brace(masked, template) + 1
+    where = re.compile(r'\bWHERE\b|\{', re.IGNORECASE).search(masked, position)
+    if not where:
+        raise ValueError("Query has no WHERE clause")
+    return f"{query[:where.start()]}FROM {EXPLAIN_GRAPH}\n{query[where.start():]}"
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class _Fingerprint:
+    """Aggregated executions of one query shape"""
+    __slots__ = ('id', 'fingerprint', 'kind', 'count', 'slow_count', 'total_ms', 'max_ms', 'samples',
+                 'repository', 'query', 'last_seen', 'plan', 'plan_at', 'explaining')
+
+    def __init__(self, fid: str, fingerprint: str, kind: str):
+        self.id = fid
+        self.fingerprint = fingerprint
+        self.kind = kind
+        self.count = 0
+        self.slow_count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=SLOW_QUERY_SAMPLES)
+        self.repository = None
+        self.query = None
+        self.last_seen = None
+        self.plan = None
+        self.plan_at = None
+        self.explaining = False
+
+    def to_dict(self, with_plan: bool = True) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        data = {
+            "fingerprint_id": self.id,
+            "fingerprint": self.fingerprint[:SLOW_QUERY_MAX_TEXT],
+            "kind": self.kind,
+            "count": self.count,
+            "slow_count": self.slow_count,
+            "total_ms": round(self.total_ms, 1),
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "p50_ms": round(_percentile(ordered, 0.5), 1) if ordered else 0.0,
+            "p95_ms": round(_percentile(ordered, 0.95), 1) if ordered else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "last_repository": self.repository,
+            "last_seen": self.last_seen,
+            "has_plan": self.plan is not None,
+        }
+        if with_plan and self.plan is not None:
+            data["plan"] = self.plan
+            data["plan_captured_at"] = self.plan_at
+        return data
+
+
+class SlowQueryLog:
+    """Ring buffer of slow queries plus per-fingerprint latency aggregates, with optional plan capture"""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 size: int = SLOW_QUERY_LOG_SIZE,
+                 path: str = SLOW_QUERY_LOG_FILE,
+                 auto_explain: bool = SLOW_QUERY_EXPLAIN,
+                 max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS,
+                 explain_fn: Optional[Callable[[str, str], str]] = None):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self.auto_explain = auto_explain
+        self.max_fingerprints = max_fingerprints
+        # (repository, explain query) -> plan text
+        self.explain_fn = explain_fn
+        self._lock = threading.Lock()
+        self._entries: deque = deque(maxlen=size)
+        self._fingerprints: "OrderedDict[str, _Fingerprint]" = OrderedDict()
+        self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        self._persisted = 0
+        if path:
+            self._load()
+
+    def _load(self):
+        """Restore the most recent persisted entries (aggregates start empty)"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with self._file_lock(exclusive=False), open(self.path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        self._entries.append(json.loads(line))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read slow query log {self.path}: {str(e)}")
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Coordinate with the other worker processes: appends share the lock, trimming the file takes it alone"""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    def record(self, kind: str, repository: str, query: str, duration_ms: float,
+               result_bytes: int = 0, status: str = "success") -> Optional[Dict[str, Any]]:
+        """Account for one execution, returning the log entry if it was slow"""
+        fingerprint = query_fingerprint(query)
+        fid = fingerprint_id(fingerprint)
+        slow = duration_ms >= self.threshold_ms
+        now = time.time()
+        with self._lock:
+            aggregate = self._fingerprints.get(fid)
+            if aggregate is None:
+                aggregate = self._fingerprints[fid] = _Fingerprint(fid, fingerprint, kind)
+                if len(self._fingerprints) > self.max_fingerprints:
+                    self._fingerprints.popitem(last=False)
+            else:
+                self._fingerprints.move_to_end(fid)
+            aggregate.count += 1
+            aggregate.total_ms += duration_ms
+            aggregate.max_ms = max(aggregate.max_ms, duration_ms)
+            aggregate.samples.append(duration_ms)
+            aggregate.repository = repository
+            # Updates can carry whole datasets and cannot be explained, so only queries keep a sample
+            if kind == "query" and len(query) <= SLOW_QUERY_MAX_SAMPLE:
+                aggregate.query = query
+            aggregate.last_seen = now
+            if not slow:
+                return None
+
+            aggregate.slow_count += 1
+            entry = {
+                "fingerprint_id": fid,
+                "kind": kind,
+                "repository": repository,
+                "duration_ms": round(duration_ms, 1),
+                "result_bytes": result_bytes,
+                "status": status,
+                "timestamp": now,
+                "query": (query if kind == "query" else fingerprint)[:SLOW_QUERY_MAX_TEXT],
+            }
+            self._entries.append(entry)
+            explain = (self.auto_explain and self.explain_fn is not None and kind == "query"
+                       and aggregate.plan is None and not aggregate.explaining)
+            if explain:
+                aggregate.explaining = True
+
+        if self.path:
+            self._persist(entry)
+        logger.warning(f"Slow {kind} on {repository} took {duration_ms:.0f} ms (fingerprint {fid})")
+        if explain:
+            self._explainer.submit(self._capture_plan, fid, repository, query)
+        return entry
+
+    def _persist(self, entry: Dict[str, Any]):
+        """Append an entry as a single O_APPEND write, trimming the file after every SLOW_QUERY_LOG_SIZE appends
+
+        Every server worker appends to the same file, so lines from different processes never interleave.
+        """
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+        try:
+            with self._file_lock(exclusive=False):
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+            with self._lock:
+                self._persisted += 1
+                trim = self._persisted >= self._entries.maxlen
+                if trim:
+                    self._persisted = 0
+            if trim:
+                self._trim()
+        except OSError as e:
+            logger.warning(f"Could not write slow query log {self.path}: {str(e)}")
+
+    def _trim(self):
+        """Keep only the newest SLOW_QUERY_LOG_SIZE lines of the file, whichever worker wrote them"""
+        with self._file_lock(exclusive=True):
+            with open(self.path, 'rb') as f:
+                kept = deque(f, maxlen=self._entries.maxlen)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.writelines(kept)
+            os.replace(tmp_path, self.path)
+
+    def _capture_plan(self, fid: str, repository: str, query: str) -> Optional[str]:
+        plan = None
+        try:
+            plan = self.explain_fn(repository, explain_query(query))
+        except Exception as e:
+            logger.warning(f"Could not explain query {fid}: {str(e)}")
+        with self._lock:
+            aggregate = self._fingerprints.get(fid)
+            if aggregate is not None:
+                aggregate.explaining = False
+                if plan is not None:
+                    aggregate.plan = plan
+                    aggregate.plan_at = time.time()
+        return plan
+
+    def explain(self, fid: str) -> Dict[str, Any]:
+        """Re-run the latest query of a fingerprint with GraphDB's explain and store the plan"""
+        if self.explain_fn is None:
+            raise RuntimeError("Query plans cannot be captured without an explain function")
+        with self._lock:
+            aggregate = self._fingerprints.get(fid)
+            if aggregate is None:
+                raise KeyError(fid)
+            if aggregate.kind != "query":
+                raise ValueError("Only queries can be explained, not updates")
+            if aggregate.query is None:
+                raise ValueError(f"No query of this fingerprint was short enough ({SLOW_QUERY_MAX_SAMPLE} "
+                                 f"characters) to keep for explain")
+            repository, query = aggregate.repository, aggregate.query
+        plan = self.explain_fn(repository, explain_query(query))
+        with self._lock:
+            aggregate.plan = plan
+            aggregate.plan_at = time.time()
+            return aggregate.to_dict()
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest slow entries first"""
+        with self._lock:
+            return list(reversed(self._entries))[:limit]
+
+    def top(self, limit: int = 20, by: str = "total_ms") -> List[Dict[str, Any]]:
+        """Fingerprints ranked by total, p95, max or mean time, or by count"""
+        with self._lock:
+            rows = [aggregate.to_dict(with_plan=False) for aggregate in self._fingerprints.values()]
+        rows.sort(key=lambda row: row.get(by, 0), reverse=True)
+        return rows[:limit]
+
+    def fingerprint(self, fid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            aggregate = self._fingerprints.get(fid)
+            return aggregate.to_dict() if aggregate else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._fingerprints.clear()
+            self._persisted = 0
+        if self.path:
+            with self._file_lock(exclusive=True):
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold_ms,
+                "entries": len(self._entries),
+                "max_entries": self._entries.maxlen,
+                "fingerprints": len(self._fingerprints),
+                "auto_explain": self.auto_explain,
+                "persisted_to": self.path or None,
+            }
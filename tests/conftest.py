@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import tempfile
+import types
+
+import pytest
+
+# The application modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep state files written by the app out of the working tree
+_STATE_DIR = tempfile.mkdtemp(prefix="ingraph-tests-")
+os.environ.setdefault("DELTA_STATE_FOLDER", os.path.join(_STATE_DIR, "delta_state"))
+os.environ.setdefault("QUERY_TEMPLATE_FOLDER", os.path.join(_STATE_DIR, "query_templates"))
+os.environ.setdefault("SHARED_STATE_FOLDER", os.path.join(_STATE_DIR, "shared_state"))
+
+
+class FakeResponse:
+    """The parts of requests.Response the app uses, with a body that can be handed out in chunks"""
+
+    def __init__(self, body=b'', status_code=200, headers=None, chunks=None):
+        self.chunks = list(chunks) if chunks is not None else [body]
+        self.status_code = status_code
+        self.headers = {'Content-Type': 'application/sparql-results+json', **(headers or {})}
+        self.chunks_read = 0
+        self.closed = False
+
+    @property
+    def content(self):
+        return b''.join(self.chunks)
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=None):
+        for chunk in self.chunks:
+            if self.closed:
+                return
+            self.chunks_read += 1
+            yield chunk
+
+    def iter_lines(self, chunk_size=None, decode_unicode=False):
+        for line in self.content.splitlines():
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+class FakeGraphDB:
+    """Stands in for make_graphdb_request: records every call and answers through a replaceable handler"""
+
+    def __init__(self):
+        self.calls = []
+        self.handler = lambda call: FakeResponse(b'{}')
+        self.on_chunk = lambda chunk: None
+
+    def __call__(self, method, url, headers=None, data=None, files=None, route_class='metadata',
+                 idempotent=None, stream=False, params=None):
+        call = types.SimpleNamespace(method=method, url=url, headers=headers or {}, params=params or {},
+                                     stream=stream, route_class=route_class, data=data, body=None, chunks=None)
+        if data is not None and not isinstance(data, (bytes, str)):
+            call.chunks = []
+            for chunk in data:
+                self.on_chunk(chunk)
+                call.chunks.append(chunk)
+            call.body = b''.join(call.chunks)
+        else:
+            call.body = data.encode('utf-8') if isinstance(data, str) else data
+        self.calls.append(call)
+        return self.handler(call)
+
+
+@pytest.fixture
+def graphdb():
+    return FakeGraphDB()
+
+
+@pytest.fixture
+def ingraph(monkeypatch, graphdb):
+    """The Flask app module with GraphDB replaced by the graphdb fixture and emptied caches"""
+    import inGraphApp
+    monkeypatch.setattr(inGraphApp, 'make_graphdb_request', graphdb)
+    monkeypatch.setattr(inGraphApp.health_prober, 'ensure_started', lambda: None)
+    inGraphApp.query_cache.clear()
+    inGraphApp.slow_queries.clear()
+    return inGraphApp
+
+
+@pytest.fixture
+def client(ingraph):
+    return ingraph.app.test_client()
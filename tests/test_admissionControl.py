@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from conftest import FakeResponse
+from admissionControl import AdmissionController, AdmissionRejected
+
+QUERY = 'SELECT * WHERE { ?s ?p ?o }'
+
+
+def test_queued_query_gets_the_slot_when_it_is_released():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    granted_at = admission.acquire("repo")
+    granted = []
+    waiter = threading.Thread(target=lambda: granted.append(admission.acquire("repo")))
+    waiter.start()
+    while admission.stats()["waiting"] < 1:
+        time.sleep(0.01)
+
+    with pytest.raises(AdmissionRejected, match="queue is full") as rejected:
+        admission.acquire("repo")
+    assert rejected.value.retry_after >= 1
+    admission.release("repo", granted_at)
+    waiter.join()
+
+    assert len(granted) == 1
+    assert admission.stats()["counters"] == {"admitted": 2, "queued": 1, "rejected_queue_full": 1,
+                                             "rejected_timeout": 0}
+
+
+def test_per_repository_limit_leaves_room_for_other_repositories():
+    admission = AdmissionController(max_concurrent=2, max_per_repository=1, max_queue=1, queue_timeout=0.05)
+    admission.acquire("busy")
+
+    with pytest.raises(AdmissionRejected, match="timed out"):
+        admission.acquire("busy")
+    admission.acquire("other")
+    assert admission.stats()["running_by_repository"] == {"busy": 1, "other": 1}
+
+
+def test_busy_server_answers_429_with_retry_after(client, ingraph, graphdb, monkeypatch):
+    admission = AdmissionController(max_concurrent=1, max_queue=0)
+    monkeypatch.setattr(ingraph, 'admission', admission)
+    graphdb.handler = lambda call: FakeResponse(b'{"head": {"vars": []}, "results": {"bindings": []}}')
+    held = admission.acquire("repo")
+
+    response = client.post('/query', data={'repository': 'repo', 'query': QUERY})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) == response.get_json()["retry_after"] >= 1
+    assert graphdb.calls == []
+
+    admission.release("repo", held)
+    response = client.post('/query', data={'repository': 'repo', 'query': QUERY, 'timeout': '100000'})
+    assert response.status_code == 200
+    # The client's timeout is capped at the configured GraphDB-side maximum
+    assert graphdb.calls[0].params == {'timeout': ingraph.QUERY_MAX_EXECUTION_SECONDS}
+    assert admission.stats()["running"] == 0
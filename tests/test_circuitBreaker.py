@@ -0,0 +1,87 @@
+import time
+
+import pytest
+import requests
+
+from circuitBreaker import CircuitBreaker, BackendUnavailable, CLOSED, OPEN, HALF_OPEN
+from graphdbClient import GraphDBClient
+
+QUERY = 'SELECT * WHERE { ?s ?p ?o }'
+
+
+class DownSession:
+    """A requests session whose every request fails to connect"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def request(self, *args, **kwargs):
+        self.calls += 1
+        raise requests.exceptions.ConnectionError("Connection refused")
+
+
+def cool_down(breaker):
+    time.sleep(breaker.reset_timeout + 0.01)
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05, half_open_max=1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_after() == 1
+
+    cool_down(breaker)
+    assert breaker.available()
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Only one trial request at a time while half-open
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    cool_down(breaker)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["counters"] == {"opened": 2, "short_circuited": 2}
+
+
+def test_successful_probe_lets_trial_traffic_through_early():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert not breaker.available()
+    breaker.record_success()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_open_circuit_fails_fast_without_calling_graphdb():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = GraphDBClient("http://graphdb:7200", max_retries=0, breaker=breaker)
+    client.session = DownSession()
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.request('GET', client.url('/rest/repositories'))
+
+    with pytest.raises(BackendUnavailable) as unavailable:
+        client.request('GET', client.url('/rest/repositories'))
+    assert client.session.calls == 2
+    assert unavailable.value.retry_after > 1
+
+
+def test_open_circuit_answers_503_and_keeps_local_endpoints_up(client, ingraph, graphdb, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    monkeypatch.setattr(ingraph, 'breaker', breaker)
+    breaker.record_failure()
+
+    response = client.post('/query', data={'repository': 'repo', 'query': QUERY})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) == response.get_json()["retry_after"] > 1
+    assert graphdb.calls == []
+    assert client.get('/graphdb/health').get_json()["circuit"]["state"] == OPEN
+
+    breaker.record_success()
+    assert client.post('/query', data={'repository': 'repo', 'query': QUERY}).status_code == 200
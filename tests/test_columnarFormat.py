@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from conftest import FakeResponse
+from columnarFormat import (encode_columnar, encode_columnar_binary, decode_columnar_binary,
+                            columnar_to_sparql_json, encode_results)
+
+SCHEMA = "https://intendproject.eu/schema/"
+RESULTS = {
+    "head": {"vars": ["s", "o", "extra"]},
+    "results": {"bindings": [
+        {"s": {"type": "uri", "value": SCHEMA + "node1"},
+         "o": {"type": "literal", "value": "8", "datatype": "http://www.w3.org/2001/XMLSchema#integer"}},
+        {"s": {"type": "uri", "value": SCHEMA + "node1"},
+         "o": {"type": "literal", "value": "Oslo", "xml:lang": "no"},
+         "extra": {"type": "bnode", "value": "b0"}},
+        {"s": {"type": "uri", "value": "http://other.org/x#y"},
+         "o": {"type": "literal", "value": "plain ✓"},
+         "extra": {"type": "uri", "value": "urn:x"}},
+    ]}
+}
+
+
+def test_terms_are_stored_once_and_iris_share_prefixes():
+    columnar = encode_columnar(RESULTS)
+
+    assert columnar["rows"] == 3
+    assert columnar["columns"]["s"] == [0, 0, len(columnar["terms"]) - 3]
+    assert columnar["columns"]["extra"][0] == -1
+    assert columnar["prefixes"][:2] == [SCHEMA, "http://www.w3.org/2001/XMLSchema#"]
+    assert columnar["terms"][0] == ["u", 0, "node1"]
+    assert ["u", -1, "urn:x"] in columnar["terms"]
+
+
+@pytest.mark.parametrize("results", [RESULTS, {"head": {"vars": ["s"]}, "results": {"bindings": []}},
+                                     {"head": {}, "boolean": True}])
+def test_json_and_binary_variants_round_trip(results):
+    columnar = encode_columnar(results)
+    assert columnar_to_sparql_json(columnar) == results
+    assert decode_columnar_binary(encode_columnar_binary(columnar)) == columnar
+
+
+def test_query_returns_columnar_results(client, graphdb):
+    graphdb.handler = lambda call: FakeResponse(json.dumps(RESULTS).encode('utf-8'))
+    form = {'repository': 'repo', 'query': 'SELECT * WHERE { ?s ?o ?extra }'}
+
+    response = client.post('/query', data={**form, 'format': 'columnar'})
+    assert response.status_code == 200
+    assert response.content_type == 'application/vnd.ingraph.columnar+json'
+    assert columnar_to_sparql_json(json.loads(response.data)) == RESULTS
+    # GraphDB is always asked for SPARQL JSON
+    assert graphdb.calls[0].headers['Accept'] == 'application/sparql-results+json'
+
+    response = client.post('/query', data={**form, 'format': 'columnar-bin'})
+    assert response.content_type == 'application/vnd.ingraph.columnar'
+    assert columnar_to_sparql_json(decode_columnar_binary(response.data)) == RESULTS
+    assert response.data == encode_results(json.dumps(RESULTS).encode('utf-8'), 'columnar-bin')
+
+    assert client.post('/query', data={**form, 'format': 'columnar', 'stream': 'true'}).status_code == 400
@@ -0,0 +1,99 @@
+import pytest
+
+from deltaUpload import subject_fingerprints, plan_delta, build_delta_update, previous_triples, blank_node_structures
+from rdfConvert import canonicalise_blank_nodes
+
+
+DOCUMENT = {"@context": {"ex": "http://x/"}, "@graph": [
+    {"@id": "ex:a", "ex:name": "A"},
+    {"@id": "ex:b", "ex:name": "B"},
+    {"ex:name": "anonymous"},
+]}
+
+
+def fingerprints(document):
+    return {subject: digest for subject, (digest, _) in subject_fingerprints(document).items()}
+
+
+def test_plan_delta_classifies_subjects():
+    previous = fingerprints(DOCUMENT)
+    changed = {"@context": DOCUMENT["@context"], "@graph": [
+        {"@id": "ex:a", "ex:name": "A2"},
+        {"@id": "ex:c", "ex:name": "C"},
+        {"ex:name": "anonymous"},
+    ]}
+    plan = plan_delta(previous, subject_fingerprints(changed))
+    assert plan["added"] == ["<http://x/c>"]
+    assert plan["changed"] == ["<http://x/a>"]
+    assert plan["removed"] == ["<http://x/b>"]
+    assert plan["unchanged"] == 1
+
+
+def test_blank_subject_fingerprint_is_stable():
+    assert fingerprints(DOCUMENT) == fingerprints(DOCUMENT)
+    assert any(subject.startswith("_:") for subject in fingerprints(DOCUMENT))
+
+
+def stored(document):
+    """Triples per subject as DeltaStateStore keeps them"""
+    return {subject: [list(triple) for triple in canonicalise_blank_nodes(triples)]
+            for subject, (_, triples) in subject_fingerprints(document).items()}
+
+
+def test_update_deletes_exactly_the_previous_triples():
+    triples = previous_triples(stored(DOCUMENT), ["<http://x/a>"])
+    update = build_delta_update(triples, [("<http://x/a>", "<http://x/name>", '"A2"')])
+    assert update == ('DELETE DATA {\n  <http://x/a> <http://x/name> "A" .\n} ;\n'
+                      'INSERT DATA {\n  <http://x/a> <http://x/name> "A2" .\n}')
+    assert "?s ?p ?o" not in update
+
+
+def test_update_in_named_graph():
+    triples = previous_triples(stored(DOCUMENT), ["<http://x/a>"])
+    update = build_delta_update(triples, [("<http://x/a>", "<http://x/name>", '"A2"')], graph="http://x/g")
+    assert update.startswith('DELETE DATA {\n  GRAPH <http://x/g> {\n  <http://x/a> <http://x/name> "A" .\n  }\n}')
+    assert "INSERT DATA {\n  GRAPH <http://x/g> {\n" in update
+
+
+def test_kept_triples_are_not_deleted():
+    triples = previous_triples(stored(DOCUMENT), ["<http://x/a>", "<http://x/b>"])
+    update = build_delta_update(triples, [], keep={'<http://x/a> <http://x/name> "A" .\n'})
+    assert update == 'DELETE DATA {\n  <http://x/b> <http://x/name> "B" .\n}'
+
+
+def test_nested_blank_nodes_are_deleted_at_any_depth():
+    document = {"@context": {"ex": "http://x/"}, "@id": "ex:a",
+                "ex:address": {"ex:street": "S", "ex:geo": {"ex:lat": "1"}}}
+    triples = previous_triples(stored(document), ["<http://x/a>"])
+    assert len(blank_node_structures(triples)) == 1
+    update = build_delta_update(triples, [])
+    assert update == (
+        'DELETE { <http://x/a> <http://x/address> ?b0 . ?b0 <http://x/street> "S" . ?b0 <http://x/geo> ?b1 . '
+        '?b1 <http://x/lat> "1" . }\nWHERE {\n'
+        '  OPTIONAL { SELECT ?b0 ?b1 WHERE { <http://x/a> <http://x/address> ?b0 . ?b0 <http://x/street> "S" . '
+        '?b0 <http://x/geo> ?b1 . ?b1 <http://x/lat> "1" . FILTER(isBlank(?b0) && isBlank(?b1)) } LIMIT 1 }\n}')
+
+
+def test_identical_blank_structures_match_different_nodes():
+    document = {"@context": {"ex": "http://x/"}, "@id": "ex:a", "ex:tag": [{"ex:v": "t"}, {"ex:v": "t"}]}
+    update = build_delta_update(previous_triples(stored(document), ["<http://x/a>"]), [])
+    assert update.count("OPTIONAL") == 1
+    assert "?b0 != ?b1" in update
+
+
+def test_removed_top_level_blank_node_is_deleted_by_shape():
+    previous = stored(DOCUMENT)
+    plan = plan_delta(fingerprints(DOCUMENT), subject_fingerprints({"@id": "http://x/a", "http://x/name": "A"}))
+    update = build_delta_update(previous_triples(previous, plan["changed"] + plan["removed"]), [])
+    assert '?b0 <http://x/name> "anonymous" .' in update
+    assert "FILTER(isBlank(?b0))" in update
+
+
+def test_nothing_to_do_gives_empty_update():
+    assert build_delta_update([], []) == ""
+
+
+def test_injected_graph_rejected():
+    with pytest.raises(ValueError):
+        build_delta_update([("<http://x/a>", "<http://x/p>", '"v"')], [],
+                           graph="http://x/g> { ?s ?p ?o } } ; DROP ALL ; #")
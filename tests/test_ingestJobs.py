@@ -0,0 +1,102 @@
+import io
+import threading
+import time
+
+import pytest
+
+from conftest import FakeResponse
+from ingestJobs import IngestJobManager, JobQueueFull, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_job_goes_from_queued_to_running_to_succeeded(tmp_path):
+    release = threading.Event()
+
+    def run(job, content):
+        job.set_stage("load")
+        release.wait(5)
+        job.add_bytes(len(content))
+        job.set_stage("done")
+
+    jobs = IngestJobManager(run, workers=1, folder=str(tmp_path))
+    first = jobs.submit("repo", "a.jsonld", b"{}")
+    second = jobs.submit("repo", "b.jsonld", b"{}")
+    wait_for(lambda: jobs.status(first.id)["stage"] == "load")
+
+    assert jobs.status(first.id)["status"] == JOB_RUNNING
+    assert jobs.status(second.id)["status"] == JOB_QUEUED
+    assert jobs.stats()["active_workers"] == 1
+    release.set()
+    wait_for(lambda: jobs.status(second.id)["finished_at"] is not None)
+
+    status = jobs.status(first.id)
+    assert (status["status"], status["stage"]) == (JOB_SUCCEEDED, "done")
+    assert status["progress"]["bytes_loaded"] == status["progress"]["bytes_total"] == 2
+    assert status["progress"]["percent"] == 100.0
+    assert status["duration_seconds"] >= 0
+    assert [entry["job_id"] for entry in jobs.statuses()] == [first.id, second.id]
+
+
+def test_failed_job_records_stage_and_error(tmp_path):
+    def run(job, content):
+        job.set_stage("validate")
+        raise ValueError("Invalid JSON-LD")
+
+    jobs = IngestJobManager(run, workers=1, folder=str(tmp_path))
+    job = jobs.submit("repo", "bad.jsonld", b"{")
+    wait_for(lambda: jobs.status(job.id)["finished_at"] is not None)
+
+    status = jobs.status(job.id)
+    assert status["status"] == JOB_FAILED
+    assert status["error"] == {"stage": "validate", "message": "Invalid JSON-LD"}
+
+
+def test_full_queue_rejects_new_jobs(tmp_path):
+    release = threading.Event()
+    jobs = IngestJobManager(lambda job, content: release.wait(5), workers=1, max_queue=1, folder=str(tmp_path))
+    running = jobs.submit("repo", "a.jsonld", b"{}")
+    wait_for(lambda: jobs.status(running.id)["status"] == JOB_RUNNING)
+    jobs.submit("repo", "b.jsonld", b"{}")
+
+    with pytest.raises(JobQueueFull):
+        jobs.submit("repo", "c.jsonld", b"{}")
+    release.set()
+
+
+def test_oldest_finished_jobs_are_pruned(tmp_path):
+    jobs = IngestJobManager(lambda job, content: None, workers=1, retention=2, folder=str(tmp_path))
+    submitted = []
+    for name in ("a", "b", "c"):
+        submitted.append(jobs.submit("repo", f"{name}.jsonld", b"{}"))
+        wait_for(lambda: jobs.status(submitted[-1].id)["status"] == JOB_SUCCEEDED)
+    jobs.submit("repo", "d.jsonld", b"{}")
+
+    assert jobs.status(submitted[0].id) is None
+    assert jobs.status(submitted[1].id) is None
+    assert jobs.status(submitted[2].id) is not None
+
+
+def test_async_upload_can_be_polled_until_done(client, graphdb):
+    count = b'{"results": {"bindings": [{"count": {"value": "3"}}]}}'
+    graphdb.handler = lambda call: FakeResponse(count if call.route_class == 'query' else b'')
+    document = b'{"@id": "http://x/a", "http://x/p": "v"}'
+    data = {"repository": "repo", "async": "true", "file": (io.BytesIO(document), "kg.jsonld")}
+
+    response = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert response.get_json()["status_url"] == f"/jobs/{job_id}"
+    wait_for(lambda: client.get(f"/jobs/{job_id}").get_json()["status"] == JOB_SUCCEEDED)
+
+    status = client.get(f"/jobs/{job_id}").get_json()
+    assert status["stage"] == "done"
+    assert status["progress"]["total_triples"] == "3"
+    assert status["conversion"]["triples"] == 1
+    assert client.get("/jobs/0123456789abcdef0123456789abcdef").status_code == 404
+
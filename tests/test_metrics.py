@@ -0,0 +1,77 @@
+from conftest import FakeResponse
+from metrics import MetricsRegistry
+
+CHUNKS = [b'{"head": {"vars": []}, ', b'"results": {"bindings": []}}']
+
+
+def series(text, name):
+    """The samples of one metric in an exposition, as {label string: value}"""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith(name + '{') or line.startswith(name + ' '):
+            labels, _, value = line[len(name):].rpartition(' ')
+            samples[labels] = float(value)
+    return samples
+
+
+def test_registry_renders_the_prometheus_text_format():
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    registry.describe('jobs_total', 'counter', 'Jobs run')
+    registry.describe('queue_depth', 'gauge', 'Jobs waiting')
+    registry.describe('job_seconds', 'histogram', 'Job duration')
+    registry.inc('jobs_total', (('status', 'ok'),))
+    registry.inc('jobs_total', (('status', 'ok'),), 2)
+    registry.add('queue_depth', (), 3)
+    registry.add('queue_depth', (), -1)
+    registry.observe('job_seconds', (('repo', 'a "quoted"\\name'),), 0.5)
+    registry.observe('job_seconds', (('repo', 'a "quoted"\\name'),), 5)
+
+    assert registry.render().splitlines() == [
+        '# HELP jobs_total Jobs run',
+        '# TYPE jobs_total counter',
+        'jobs_total{status="ok"} 3',
+        '# HELP queue_depth Jobs waiting',
+        '# TYPE queue_depth gauge',
+        'queue_depth 2',
+        '# HELP job_seconds Job duration',
+        '# TYPE job_seconds histogram',
+        'job_seconds_bucket{repo="a \\"quoted\\"\\\\name",le="0.1"} 0',
+        'job_seconds_bucket{repo="a \\"quoted\\"\\\\name",le="1"} 1',
+        'job_seconds_bucket{repo="a \\"quoted\\"\\\\name",le="+Inf"} 2',
+        'job_seconds_sum{repo="a \\"quoted\\"\\\\name"} 5.5',
+        'job_seconds_count{repo="a \\"quoted\\"\\\\name"} 2',
+    ]
+
+
+def test_requests_are_counted_by_route_repository_and_status(client, graphdb):
+    graphdb.handler = lambda call: FakeResponse(chunks=CHUNKS)
+    # Request metrics are recorded once the response is closed, as the WSGI server does after sending it
+    client.post('/query', data={'repository': 'metrics-repo', 'query': 'SELECT * WHERE { ?s ?p ?o }'}).close()
+    client.post('/query', data={'repository': 'metrics-repo'}).close()
+
+    response = client.get('/metrics')
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    requests = series(response.text, 'ingraph_http_requests_total')
+    labels = '{route="/query",method="POST",repository="metrics-repo",status="%s"}'
+    assert (requests[labels % '200'], requests[labels % '400']) == (1, 1)
+    durations = series(response.text, 'ingraph_http_request_duration_seconds_count')
+    assert durations['{route="/query",repository="metrics-repo"}'] == 2
+    graphdb_requests = series(response.text, 'ingraph_graphdb_requests_total')
+    assert all(label.startswith('{route_class=') for label in graphdb_requests)
+
+
+def test_in_flight_gauge_follows_a_stream_until_it_is_closed(client, graphdb):
+    graphdb.handler = lambda call: FakeResponse(chunks=CHUNKS)
+    label = '{route="/query",repository="in-flight-repo"}'
+    unlabelled = '{route="/query",repository=""}'
+    before = series(client.get('/metrics').text, 'ingraph_http_requests_in_flight').get(unlabelled, 0)
+
+    response = client.post('/query', data={'repository': 'in-flight-repo', 'query': 'SELECT * WHERE { ?s ?p ?o }',
+                                           'stream': 'true'}, buffered=False)
+    assert series(client.get('/metrics').text, 'ingraph_http_requests_in_flight')[label] == 1
+    response.close()
+
+    in_flight = series(client.get('/metrics').text, 'ingraph_http_requests_in_flight')
+    assert in_flight[label] == 0
+    # Once the body named the repository, the request moved there from the unlabelled series
+    assert in_flight[unlabelled] == before
@@ -0,0 +1,157 @@
+import json
+import socket
+
+import pytest
+
+from conftest import FakeResponse
+
+QUERY = 'SELECT * WHERE { ?s ?p ?o }'
+CHUNKS = [b'{"head": {"vars": []}, ', b'"results": ', b'{"bindings": []}}']
+
+
+class DisconnectingResponse(FakeResponse):
+    """Upstream body during which the client closes its end of the connection"""
+
+    def __init__(self, peer, after_chunks, **kwargs):
+        super().__init__(chunks=CHUNKS, **kwargs)
+        self.peer = peer
+        self.after_chunks = after_chunks
+
+    def iter_content(self, chunk_size=None):
+        for chunk in super().iter_content(chunk_size):
+            if self.chunks_read == self.after_chunks:
+                self.peer.close()
+            yield chunk
+
+
+@pytest.fixture
+def connection():
+    """The server end of a client connection, as the WSGI server hands it over, and the client end"""
+    server, peer = socket.socketpair()
+    yield server, peer
+    server.close()
+    peer.close()
+
+
+def test_buffered_query_closes_upstream_when_client_disconnects(client, ingraph, graphdb, connection):
+    server, peer = connection
+    upstream = DisconnectingResponse(peer, after_chunks=1)
+    graphdb.handler = lambda call: upstream
+
+    response = client.post('/query', data={'repository': 'repo', 'query': QUERY},
+                           environ_base={'werkzeug.socket': server})
+
+    assert response.status_code == 499
+    assert graphdb.calls[0].stream is True
+    assert upstream.closed
+    assert upstream.chunks_read == 1
+    assert ingraph.query_cache.stats()["entries"] == 0
+    assert ingraph.slow_queries.top()[0]["count"] == 1
+    assert ingraph.admission.stats()["running"] == 0
+
+
+def test_buffered_query_completes_while_client_is_connected(client, graphdb, connection):
+    server, _ = connection
+    upstream = FakeResponse(chunks=CHUNKS)
+    graphdb.handler = lambda call: upstream
+
+    response = client.post('/query', data={'repository': 'repo', 'query': QUERY},
+                           environ_base={'werkzeug.socket': server})
+
+    assert response.status_code == 200
+    assert response.get_json()["results"] == b''.join(CHUNKS).decode('utf-8')
+    assert upstream.chunks_read == len(CHUNKS)
+    assert upstream.closed
+
+
+def test_query_of_departed_client_is_not_sent(client, graphdb, connection):
+    server, peer = connection
+    peer.close()
+
+    response = client.post('/query', data={'repository': 'repo', 'query': QUERY},
+                           environ_base={'werkzeug.socket': server})
+
+    assert response.status_code == 499
+    assert graphdb.calls == []
+
+
+def test_streamed_query_is_passed_through_chunk_by_chunk(client, ingraph, graphdb):
+    upstream = FakeResponse(chunks=CHUNKS, headers={'Content-Length': str(len(b''.join(CHUNKS)))})
+    graphdb.handler = lambda call: upstream
+
+    response = client.post('/query', data={'repository': 'repo', 'query': QUERY, 'stream': 'true'},
+                           buffered=False)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    assert graphdb.calls[0].stream is True
+    body = iter(response.response)
+    # Each chunk reaches the client before the next one is read from GraphDB
+    for read, expected in enumerate(CHUNKS, start=1):
+        assert next(body) == expected
+        assert upstream.chunks_read == read
+    assert ingraph.admission.stats()["running"] == 1
+    response.close()
+    assert upstream.closed
+    assert ingraph.admission.stats()["running"] == 0
+
+
+def test_streamed_query_closes_upstream_when_client_stops_reading(client, ingraph, graphdb):
+    upstream = FakeResponse(chunks=CHUNKS)
+    graphdb.handler = lambda call: upstream
+
+    response = client.post('/query', data={'repository': 'repo', 'query': QUERY, 'stream': 'true'},
+                           buffered=False)
+    assert next(iter(response.response)) == CHUNKS[0]
+    response.close()
+
+    assert upstream.closed
+    assert upstream.chunks_read == 1
+    assert ingraph.admission.stats()["running"] == 0
+
+
+def test_update_invalidates_cached_results(client, graphdb):
+    graphdb.handler = lambda call: FakeResponse(chunks=CHUNKS)
+    ask = {'repository': 'repo', 'query': QUERY}
+
+    assert client.post('/query', data=ask).headers['X-Cache'] == 'MISS'
+    assert client.post('/query', data=ask).headers['X-Cache'] == 'HIT'
+    assert client.post('/update', data={'repository': 'repo', 'query': 'CLEAR DEFAULT'}).status_code == 200
+    assert client.post('/query', data=ask).headers['X-Cache'] == 'MISS'
+    assert client.post('/query', data={**ask, 'repository': 'other'}).headers['X-Cache'] == 'MISS'
+    assert len([call for call in graphdb.calls if call.route_class == 'query']) == 3
+
+
+def test_batch_streams_one_ndjson_record_per_query_and_a_summary(client, graphdb):
+    def answer(call):
+        if b'fail' in call.body:
+            raise RuntimeError("MALFORMED QUERY")
+        return FakeResponse(chunks=CHUNKS)
+    graphdb.handler = answer
+    queries = [{"id": "ok", "query": QUERY},
+               {"id": "bad", "query": "SELECT * WHERE { ?s ?p 'fail' }"},
+               {"id": "empty", "query": ""},
+               {"id": "csv", "query": QUERY, "format": "csv", "repository": "other"}]
+
+    response = client.post('/query/batch', json={"repository": "repo", "queries": queries, "max_parallel": 2})
+
+    assert response.status_code == 200
+    assert response.content_type == 'application/x-ndjson'
+    *records, summary = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+    by_id = {record["id"]: record for record in records}
+    assert sorted(by_id) == ["bad", "csv", "empty", "ok"]
+    assert by_id["ok"]["status"] == "success" and by_id["ok"]["repository"] == "repo"
+    assert by_id["ok"]["results"] == json.loads(b''.join(CHUNKS))
+    assert by_id["csv"]["repository"] == "other" and by_id["csv"]["status"] == "success"
+    assert by_id["bad"] == {**by_id["bad"], "status": "error", "error": "MALFORMED QUERY"}
+    assert by_id["empty"]["status"] == "error"
+    assert {key: summary[key] for key in ("summary", "count", "succeeded", "failed")} == \
+        {"summary": True, "count": 4, "succeeded": 2, "failed": 2}
+
+
+def test_batch_rejects_malformed_requests(client, graphdb):
+    assert client.post('/query/batch', json={"queries": []}).status_code == 400
+    assert client.post('/query/batch', json={"queries": ["SELECT"]}).status_code == 400
+    assert client.post('/query/batch', json={"queries": [{"query": QUERY}], "max_parallel": "x"}).status_code == 400
+    assert graphdb.calls == []
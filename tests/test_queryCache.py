@@ -0,0 +1,168 @@
+import threading
+import time
+
+from queryCache import QueryCache, QueryAbandoned
+
+QUERY = "SELECT * WHERE { ?s ?p ?o }"
+
+
+def status(result):
+    body, _, cache_status = result
+    return body, cache_status
+
+
+def loader(body, calls=None):
+    def load():
+        if calls is not None:
+            calls.append(body)
+        return body, "application/sparql-results+json"
+    return load
+
+
+def test_identical_queries_hit_regardless_of_whitespace_and_comments():
+    cache = QueryCache()
+    assert cache.get_or_load("repo", QUERY, "json", loader(b"r1"))[2] == "MISS"
+    again = cache.get_or_load("repo", "SELECT *  WHERE {\n ?s ?p ?o } # again", "json", loader(b"r2"))
+    assert status(again) == (b"r1", "HIT")
+    assert cache.get_or_load("repo", QUERY, "csv", loader(b"r3"))[2] == "MISS"
+    assert cache.get_or_load("other", QUERY, "json", loader(b"r4"))[2] == "MISS"
+
+
+def test_concurrent_identical_queries_load_once():
+    cache = QueryCache()
+    release = threading.Event()
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        release.wait(5)
+        return b"result", "application/sparql-results+json"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("repo", QUERY, "json", slow_load)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["counters"]["coalesced"] < 7:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert sorted(cache_status for _, _, cache_status in results) == ["COALESCED"] * 7 + ["MISS"]
+    assert {body for body, _, _ in results} == {b"result"}
+
+
+def test_leader_failure_reaches_waiting_requests():
+    cache = QueryCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_load():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("GraphDB said no")
+
+    errors = []
+
+    def request():
+        try:
+            cache.get_or_load("repo", QUERY, "json", failing_load)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=request)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=request)
+    follower.start()
+    while cache.stats()["counters"]["coalesced"] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert errors == ["GraphDB said no"] * 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_waiting_request_loads_itself_when_the_leader_was_abandoned():
+    cache = QueryCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def abandoned_load():
+        started.set()
+        release.wait(5)
+        raise QueryAbandoned("client went away")
+
+    abandoned = []
+
+    def leading_request():
+        try:
+            cache.get_or_load("repo", QUERY, "json", abandoned_load)
+        except QueryAbandoned:
+            abandoned.append(True)
+
+    leader = threading.Thread(target=leading_request)
+    leader.start()
+    started.wait(5)
+    result = []
+    follower = threading.Thread(target=lambda: result.append(cache.get_or_load("repo", QUERY, "json",
+                                                                                 loader(b"fresh"))))
+    follower.start()
+    while cache.stats()["counters"]["coalesced"] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert abandoned == [True]
+    assert result == [(b"fresh", "application/sparql-results+json", "MISS")]
+
+
+def test_write_invalidates_only_its_repository():
+    cache = QueryCache()
+    cache.get_or_load("repo", QUERY, "json", loader(b"old"))
+    cache.get_or_load("other", QUERY, "json", loader(b"kept"))
+    with cache.writing("repo"):
+        pass
+
+    assert status(cache.get_or_load("repo", QUERY, "json", loader(b"new"))) == (b"new", "MISS")
+    assert status(cache.get_or_load("other", QUERY, "json", loader(b"unused"))) == (b"kept", "HIT")
+
+
+def test_result_loaded_across_a_write_is_not_cached():
+    cache = QueryCache()
+
+    def load_during_write():
+        with cache.writing("repo"):
+            pass
+        return b"maybe stale", "application/sparql-results+json"
+
+    assert cache.get_or_load("repo", QUERY, "json", load_during_write)[0] == b"maybe stale"
+    assert status(cache.get_or_load("repo", QUERY, "json", loader(b"fresh"))) == (b"fresh", "MISS")
+
+
+def test_non_deterministic_queries_bypass_the_cache():
+    cache = QueryCache()
+    calls = []
+    query = "SELECT (RAND() AS ?r) WHERE {}"
+    for _ in range(2):
+        assert cache.get_or_load("repo", query, "json", loader(b"r", calls))[2] == "BYPASS"
+    assert len(calls) == 2
+
+
+def test_least_recently_used_results_are_evicted_by_size():
+    cache = QueryCache(max_bytes=10, max_entry_bytes=10)
+    cache.get_or_load("repo", "SELECT ?a WHERE {}", "json", loader(b"aaaa"))
+    cache.get_or_load("repo", "SELECT ?b WHERE {}", "json", loader(b"bbbb"))
+    cache.get_or_load("repo", "SELECT ?a WHERE {}", "json", loader(b"unused"))
+    cache.get_or_load("repo", "SELECT ?c WHERE {}", "json", loader(b"cccc"))
+
+    assert cache.stats()["bytes"] == 8
+    assert cache.get_or_load("repo", "SELECT ?a WHERE {}", "json", loader(b"x"))[2] == "HIT"
+    assert cache.get_or_load("repo", "SELECT ?b WHERE {}", "json", loader(b"bbbb"))[2] == "MISS"
+    assert cache.get_or_load("repo", "SELECT ?z WHERE {}", "json", loader(b"too large result"))[2] == "MISS"
+    assert cache.get_or_load("repo", "SELECT ?z WHERE {}", "json", loader(b"too large result"))[2] == "MISS"
@@ -0,0 +1,83 @@
+import pytest
+
+from queryPaging import PagedQuery, PagingError, encode_cursor, decode_cursor
+
+
+def test_tiebreak_added_after_order_by():
+    paged = PagedQuery("SELECT ?s ?o WHERE { ?s ?p ?o } ORDER BY ?o", 10)
+    assert paged.page_query(20) == "SELECT ?s ?o WHERE { ?s ?p ?o } ORDER BY ?o ?s ?o\nLIMIT 11 OFFSET 20"
+
+
+def test_tiebreak_stays_out_of_trailing_comment():
+    paged = PagedQuery("SELECT ?s WHERE { ?s ?p ?o } ORDER BY ?s # note", 10)
+    query = paged.page_query(20)
+    assert query == "SELECT ?s WHERE { ?s ?p ?o } ORDER BY ?s ?s # note\nLIMIT 11 OFFSET 20"
+
+
+def test_hash_inside_iri_is_not_a_comment():
+    paged = PagedQuery("SELECT ?s WHERE { ?s a <http://x.org/ns#Thing> } ORDER BY ?s", 5)
+    assert paged.page_query(0).startswith("SELECT ?s WHERE { ?s a <http://x.org/ns#Thing> } ORDER BY ?s ?s\n")
+
+
+def test_order_by_added_when_missing():
+    paged = PagedQuery("SELECT * WHERE { ?s ?p ?o }", 2)
+    assert paged.page_query(0) == "SELECT * WHERE { ?s ?p ?o }\nORDER BY ?s ?p ?o\nLIMIT 3 OFFSET 0"
+
+
+def test_keyset_filters_after_last_key():
+    paged = PagedQuery("SELECT ?s WHERE { ?s ?p ?o }", 2, key="?s")
+    assert paged.mode == "keyset"
+    query = paged.page_query(after='a"b')
+    assert 'FILTER(STR(?s) > "a\\"b")' in query
+    assert query.endswith("ORDER BY STR(?s)\nLIMIT 3")
+
+
+def test_keyset_on_grouped_variable_next_to_an_alias():
+    paged = PagedQuery("SELECT ?g (COUNT(?s) AS ?n) WHERE { ?s ?p ?g } GROUP BY ?g", 2, key="g")
+    assert 'FILTER(STR(?g) > "x") } GROUP BY ?g\nORDER BY STR(?g)' in paged.page_query(after="x")
+
+
+@pytest.mark.parametrize("query, key", [
+    ("ASK { ?s ?p ?o }", None),
+    ("SELECT ?s WHERE { ?s ?p ?o } LIMIT 5", None),
+    ("SELECT ?s WHERE { ?s ?p ?o } ORDER BY ?s", "s"),
+    ("SELECT ?s WHERE { ?s ?p ?o }", "o"),
+    ("SELECT (STR(?s) AS ?k) WHERE { ?s ?p ?o }", "k"),
+    ("SELECT ?g (COUNT(?s) AS ?n) WHERE { ?s ?p ?g } GROUP BY ?g", "n"),
+])
+def test_unpageable_queries_rejected(query, key):
+    with pytest.raises(PagingError):
+        PagedQuery(query, 10, key=key)
+
+
+def test_split_page_reports_more_rows_and_last_key():
+    paged = PagedQuery("SELECT ?s WHERE { ?s ?p ?o }", 2, key="s")
+    rows = [{"s": {"type": "uri", "value": f"http://x/{n}"}} for n in range(3)]
+    page, has_more, last_key = paged.split_page({"head": {"vars": ["s"]}, "results": {"bindings": rows}})
+    assert len(page["results"]["bindings"]) == 2
+    assert has_more
+    assert last_key == "http://x/1"
+
+
+def test_cursor_round_trip():
+    paged = PagedQuery("SELECT ?s WHERE { ?s ?p ?o }", 4)
+    state = decode_cursor(paged.next_cursor("repo", 8, None))
+    assert (state["r"], state["o"], state["n"], state["k"]) == ("repo", 12, 4, None)
+    assert PagedQuery.from_state(state).page_query(state["o"]).endswith("LIMIT 5 OFFSET 12")
+
+
+@pytest.mark.parametrize("state", [
+    {"r": "repo", "q": "SELECT ?s WHERE { ?s ?p ?o }", "n": 4, "k": None, "o": -1},
+    {"r": "repo", "q": "SELECT ?s WHERE { ?s ?p ?o }", "n": 4, "k": None, "o": "12"},
+    {"r": "repo", "q": "SELECT ?s WHERE { ?s ?p ?o }", "n": True, "k": None, "o": 0},
+    {"r": "repo", "q": "SELECT ?s WHERE { ?s ?p ?o }", "n": 4, "k": "s"},
+    {"r": 1, "q": "SELECT ?s WHERE { ?s ?p ?o }", "n": 4, "k": None, "o": 0},
+])
+def test_malformed_cursor_rejected(state):
+    with pytest.raises(PagingError):
+        decode_cursor(encode_cursor(state))
+
+
+def test_garbage_cursor_rejected():
+    with pytest.raises(PagingError):
+        decode_cursor("not-a-cursor")
@@ -0,0 +1,69 @@
+import pytest
+
+from queryTemplates import QueryTemplate, TemplateError
+
+
+def render(template, *bindings):
+    return template.render([terms for terms, _ in template.binding_rows(list(bindings))])
+
+
+def test_values_injected_and_dollar_variables_rewritten():
+    template = QueryTemplate("label", "SELECT ?label WHERE { $s rdfs:label ?label }", [{"name": "s"}])
+    query = render(template, {"s": "http://x/a"}, {"s": "http://x/b"})
+    assert query == ("SELECT ?label  ?s WHERE { VALUES (?s) { (<http://x/a>) (<http://x/b>) }  "
+                     "?s rdfs:label ?label }")
+
+
+def test_duplicate_bindings_rendered_once():
+    template = QueryTemplate("label", "SELECT * WHERE { $s ?p ?o }", [{"name": "s"}])
+    query = render(template, {"s": "http://x/a"}, {"s": "http://x/a"})
+    assert query.count("<http://x/a>") == 1
+
+
+def test_aggregate_without_group_by_groups_by_parameters():
+    template = QueryTemplate("count", "SELECT (COUNT(?o) AS ?n) WHERE { $s ?p ?o }", [{"name": "s"}])
+    query = render(template, {"s": "http://x/a"})
+    assert query.startswith("SELECT (COUNT(?o) AS ?n)  ?s WHERE {")
+    assert query.endswith("?s ?p ?o } GROUP BY ?s ")
+
+
+def test_existing_group_by_extended_with_parameters():
+    template = QueryTemplate("count", "SELECT ?p (COUNT(?o) AS ?n) WHERE { $s ?p ?o } GROUP BY ?p",
+                             [{"name": "s"}])
+    query = render(template, {"s": "http://x/a"})
+    assert query.endswith("} GROUP BY ?s  ?p")
+    assert "GROUP BY" in query and query.count("GROUP BY") == 1
+
+
+def test_aggregate_in_comment_or_string_is_ignored():
+    template = QueryTemplate("plain", 'SELECT ?o WHERE { $s ?p ?o FILTER(?o != "COUNT(x)") } # SUM(',
+                             [{"name": "s"}])
+    assert "GROUP BY" not in render(template, {"s": "http://x/a"})
+
+
+def test_limit_makes_template_unbatchable():
+    template = QueryTemplate("top", "SELECT ?o WHERE { $s ?p ?o } LIMIT 1", [{"name": "s"}])
+    assert not template.batchable
+
+
+def test_typed_parameters_rendered_as_literals():
+    template = QueryTemplate("age", "SELECT ?s WHERE { ?s ?p $age }", [{"name": "age", "type": "integer"}])
+    assert '"42"^^<http://www.w3.org/2001/XMLSchema#integer>' in render(template, {"age": 42})
+
+
+@pytest.mark.parametrize("binding", [{"s": "http://x/a> } DROP ALL #"}, {"s": 5}, {}, {"s": "http://x/a", "t": 1}])
+def test_invalid_bindings_rejected(binding):
+    template = QueryTemplate("label", "SELECT ?o WHERE { $s ?p ?o }", [{"name": "s"}])
+    with pytest.raises(TemplateError):
+        template.binding_rows([binding])
+
+
+def test_split_results_per_binding_drops_added_columns():
+    template = QueryTemplate("label", "SELECT ?o WHERE { $s ?p ?o }", [{"name": "s"}])
+    results = {"head": {"vars": ["o", "s"]}, "results": {"bindings": [
+        {"o": {"type": "literal", "value": "1"}, "s": {"type": "uri", "value": "http://x/a"}},
+        {"o": {"type": "literal", "value": "2"}, "s": {"type": "uri", "value": "http://x/b"}},
+    ]}}
+    split = template.split(results, [("http://x/b",), ("http://x/c",)])
+    assert split[0] == {"head": {"vars": ["o"]}, "results": {"bindings": [{"o": {"type": "literal", "value": "2"}}]}}
+    assert split[1]["results"]["bindings"] == []
@@ -0,0 +1,87 @@
+import pytest
+
+from rdfConvert import iri_term, literal_term, JsonLdConverter, UnsupportedJsonLd
+
+
+def test_iri_term():
+    assert iri_term("http://x/a") == "<http://x/a>"
+
+
+@pytest.mark.parametrize("iri", ["http://x/a b", "http://x/<a>", 'http://x/"', "http://x/{a}"])
+def test_iri_term_rejects_invalid_characters(iri):
+    with pytest.raises(ValueError):
+        iri_term(iri)
+
+
+def test_literal_term_escapes_and_types():
+    assert literal_term('a"b\n') == '"a\\"b\\n"'
+    assert literal_term("1", "http://www.w3.org/2001/XMLSchema#integer") == \
+        '"1"^^<http://www.w3.org/2001/XMLSchema#integer>'
+    assert literal_term("hi", language="en") == '"hi"@en'
+
+
+def test_converter_expands_context_and_types():
+    document = {"@context": {"ex": "http://x/"}, "@id": "ex:a", "@type": "ex:T", "ex:name": "A"}
+    triples = set(JsonLdConverter(document).iter_triples())
+    assert triples == {
+        ("<http://x/a>", "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>", "<http://x/T>"),
+        ("<http://x/a>", "<http://x/name>", '"A"'),
+    }
+
+
+def triples_of(document):
+    return set(JsonLdConverter(document).iter_triples())
+
+
+def test_keyword_aliases():
+    document = {"@context": {"@vocab": "http://x/", "id": "@id", "type": "@type"},
+                "id": "http://x/a", "type": "Station", "name": "A"}
+    assert triples_of(document) == {
+        ("<http://x/a>", "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>", "<http://x/Station>"),
+        ("<http://x/a>", "<http://x/name>", '"A"'),
+    }
+
+
+def test_term_without_id_expands_with_vocab():
+    document = {"@context": {"@vocab": "http://x/",
+                             "temp": {"@type": "http://www.w3.org/2001/XMLSchema#float"}},
+                "@id": "http://x/a", "temp": "21.5"}
+    assert triples_of(document) == {
+        ("<http://x/a>", "<http://x/temp>", '"21.5"^^<http://www.w3.org/2001/XMLSchema#float>'),
+    }
+
+
+def test_language_map():
+    document = {"@context": {"label": {"@id": "http://x/label", "@container": "@language"}},
+                "@id": "http://x/a", "label": {"en": "Station", "de": ["Station", "Messstelle"], "@none": "S"}}
+    assert triples_of(document) == {
+        ("<http://x/a>", "<http://x/label>", '"Station"@en'),
+        ("<http://x/a>", "<http://x/label>", '"Station"@de'),
+        ("<http://x/a>", "<http://x/label>", '"Messstelle"@de'),
+        ("<http://x/a>", "<http://x/label>", '"S"'),
+    }
+
+
+def test_relative_id_resolved_against_base():
+    document = {"@context": {"@base": "http://x/data/", "p": {"@id": "http://x/p", "@type": "@id"}},
+                "@id": "a", "p": "../b"}
+    assert triples_of(document) == {("<http://x/data/a>", "<http://x/p>", "<http://x/b>")}
+
+
+@pytest.mark.parametrize("document", [
+    {"@id": "relative", "http://x/p": "v"},
+    {"@context": {"@vocab": "http://x/"}, "@id": "http://x/a", "@reverse": {"knows": {"@id": "http://x/b"}}},
+    {"@context": {"knownBy": {"@reverse": "http://x/knows"}}, "@id": "http://x/a", "knownBy": {"@id": "http://x/b"}},
+    {"@context": {"rev": "@reverse"}, "@id": "http://x/a", "rev": {"http://x/knows": {"@id": "http://x/b"}}},
+    {"@context": "http://schema.org/", "@id": "http://x/a"},
+    {"@id": "http://x/g", "@graph": [{"@id": "http://x/a", "http://x/p": "v"}]},
+    {"@context": {"p": {"@id": "http://x/p", "@container": "@type"}}, "@id": "http://x/a", "p": {}},
+    {"@context": {"p": {"@id": "http://x/p", "@context": {"@vocab": "http://y/"}}}, "@id": "http://x/a"},
+])
+def test_unsupported_constructs_raise(document):
+    with pytest.raises(UnsupportedJsonLd):
+        list(JsonLdConverter(document).iter_triples())
+
+
+def test_unsupported_is_a_value_error():
+    assert issubclass(UnsupportedJsonLd, ValueError)
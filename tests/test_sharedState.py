@@ -0,0 +1,141 @@
+import multiprocessing
+import time
+
+from sharedState import WriteGenerations
+from queryCache import QueryCache
+from ingestJobs import IngestJobManager, JOB_SUCCEEDED, JOB_FAILED
+from tripleIndex import TripleReplica
+
+
+def _bump_many(folder, count):
+    generations = WriteGenerations(folder)
+    for _ in range(count):
+        generations.bump("repo")
+
+
+def test_counter_bumps_from_several_processes_are_not_lost(tmp_path):
+    processes = [multiprocessing.Process(target=_bump_many, args=(str(tmp_path), 100)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert WriteGenerations(str(tmp_path)).current("repo") == 300
+
+
+def test_write_in_one_worker_invalidates_the_cache_of_another(tmp_path):
+    shared = WriteGenerations(str(tmp_path))
+    worker_a, worker_b = QueryCache(shared=shared), QueryCache(shared=WriteGenerations(str(tmp_path)))
+    query = "SELECT * WHERE { ?s ?p ?o }"
+    assert worker_a.get_or_load("repo", query, "json", lambda: (b"old", "json"))[2] == "MISS"
+    assert worker_a.get_or_load("repo", query, "json", lambda: (b"old", "json"))[2] == "HIT"
+
+    # Worker B writes: the shared counter moves around the write
+    shared.bump("repo")
+    with worker_b.writing("repo"):
+        pass
+    shared.bump("repo")
+
+    body, _, status = worker_a.get_or_load("repo", query, "json", lambda: (b"new", "json"))
+    assert (body, status) == (b"new", "MISS")
+    # Other repositories keep their entries
+    worker_a.get_or_load("other", query, "json", lambda: (b"x", "json"))
+    shared.bump("repo")
+    assert worker_a.get_or_load("other", query, "json", lambda: (b"y", "json"))[2] == "HIT"
+
+
+def test_result_loaded_across_another_workers_write_is_not_stored(tmp_path):
+    shared = WriteGenerations(str(tmp_path))
+    cache = QueryCache(shared=shared)
+    query = "SELECT * WHERE { ?s ?p ?o }"
+
+    def load_while_writing():
+        shared.bump("repo")
+        return b"maybe stale", "json"
+
+    cache.get_or_load("repo", query, "json", load_while_writing)
+    assert cache.get_or_load("repo", query, "json", lambda: (b"fresh", "json"))[0] == b"fresh"
+
+
+def test_replica_rebuilds_after_another_workers_write(tmp_path):
+    shared = WriteGenerations(str(tmp_path))
+    exports = []
+
+    def export(repository):
+        exports.append(repository)
+        return ['<http://x/a> <http://x/p> "v" .']
+
+    replica = TripleReplica(export, repositories="repo", shared=shared)
+    query = "SELECT ?o WHERE { <http://x/a> <http://x/p> ?o }"
+    assert replica.select("repo", query) is None
+    _wait_for(lambda: replica.select("repo", query) is not None)
+    assert len(exports) == 1
+
+    shared.bump("repo")
+    shared.bump("repo")
+    assert replica.select("repo", query) is None
+    _wait_for(lambda: replica.select("repo", query) is not None)
+    assert len(exports) == 2
+
+
+def test_replica_load_not_applied_over_a_concurrent_write(tmp_path):
+    shared = WriteGenerations(str(tmp_path))
+    exports = []
+
+    def export(repository):
+        exports.append(repository)
+        return []
+
+    replica = TripleReplica(export, repositories="repo", shared=shared, inferred=False)
+    replica.apply_load("repo", [], None, True, write_counters=(shared.bump("repo"), shared.bump("repo")))
+    assert replica.stats()["replicas"]["repo"]["state"] == "ready"
+
+    line = b'<http://x/a> <http://x/p> "v" .\n'
+    replica.apply_load("repo", [line], None, False, write_counters=(shared.bump("repo"), shared.bump("repo")))
+    assert replica.stats()["replicas"]["repo"]["triples"] == 1
+    assert exports == []
+
+    before = shared.bump("repo")
+    shared.bump("repo")  # a write by another worker finished in between
+    after = shared.bump("repo")
+    replica.apply_load("repo", [line], None, False, write_counters=(before, after))
+    # Rebuilt from GraphDB's export instead of trusting the local index
+    _wait_for(lambda: exports == ["repo"] and replica.stats()["replicas"]["repo"]["state"] == "ready")
+
+
+def test_job_can_be_polled_through_another_worker(tmp_path):
+    def run(job, content):
+        job.set_stage("load")
+        job.add_bytes(len(content))
+
+    worker_a = IngestJobManager(run, workers=1, folder=str(tmp_path))
+    worker_b = IngestJobManager(run, workers=1, folder=str(tmp_path))
+    job = worker_a.submit("repo", "kg.jsonld", b"{}")
+    _wait_for(lambda: (worker_b.status(job.id) or {}).get("status") == JOB_SUCCEEDED)
+    status = worker_b.status(job.id)
+    assert status["progress"]["bytes_loaded"] == 2
+    assert [entry["job_id"] for entry in worker_b.statuses()] == [job.id]
+    assert worker_b.status("../../etc/passwd") is None
+
+
+def test_job_of_an_exited_worker_is_reported_failed(tmp_path):
+    worker = IngestJobManager(lambda job, content: None, workers=1, folder=str(tmp_path))
+    reader = IngestJobManager(lambda job, content: None, folder=str(tmp_path))
+    process = multiprocessing.Process(target=time.sleep, args=(0,))
+    process.start()
+    process.join()
+    job = worker.get(worker.submit("repo", "kg.jsonld", b"{}").id)
+    # The worker publishes the finished job after setting finished_at, so wait for the file itself
+    _wait_for(lambda: (reader.status(job.id) or {}).get("status") == JOB_SUCCEEDED)
+    job.status, job.worker_pid = "running", process.pid
+    worker._publish(job, force=True)
+
+    status = reader.status(job.id)
+    assert status["status"] == JOB_FAILED
+    assert "exited" in status["error"]["message"]
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
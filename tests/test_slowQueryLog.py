@@ -0,0 +1,95 @@
+import json
+import multiprocessing
+
+import pytest
+
+import slowQueryLog
+from slowQueryLog import SlowQueryLog, query_fingerprint, fingerprint_id
+
+
+def test_fingerprint_replaces_subject_and_object_iris_but_keeps_predicates():
+    first = query_fingerprint('SELECT ?o WHERE { <http://x/a> <http://x/p> ?o . ?o a <http://x/C> }')
+    second = query_fingerprint('SELECT  ?o WHERE { <http://x/b> <http://x/p> ?o . ?o a <http://x/D> }')
+    assert first == second == 'SELECT ?o WHERE { ? <http://x/p> ?o . ?o a ? }'
+    assert query_fingerprint('SELECT ?o WHERE { <http://x/a> <http://x/q> ?o }') != first
+
+
+def test_fingerprint_keeps_graph_names_datatypes_and_functions():
+    fingerprint = query_fingerprint(
+        'PREFIX ex: <http://x/> SELECT * FROM <http://g> WHERE { GRAPH <http://g2> { ex:a ex:p "1"^^xsd:int ; '
+        'ex:q [ ex:r ex:b ] . FILTER(?o != ex:c && xsd:integer(?o) > 3) } }')
+    assert fingerprint == ('PREFIX ex: <http://x/> SELECT * FROM <http://g> WHERE { GRAPH <http://g2> { ? ex:p ?^^xsd:int ; '
+                           'ex:q [ ex:r ? ] . FILTER(?o != ? && xsd:integer(?o) > ?) } }')
+
+
+@pytest.mark.parametrize("rows", ['<http://a>', '<http://a> <http://b> ex:c', '(<http://a> 1) (<http://b> UNDEF)'])
+def test_fingerprint_folds_values_rows(rows):
+    variables = '(?s ?n)' if rows.startswith('(') else '?s'
+    fingerprint = query_fingerprint(f'SELECT * WHERE {{ VALUES {variables} {{ {rows} }} ?s ?p ?o }}')
+    assert fingerprint == f'SELECT * WHERE {{ VALUES {variables} {{ ?+ }} ?s ?p ?o }}'
+
+
+def test_executions_are_aggregated_per_fingerprint():
+    log = SlowQueryLog(threshold_ms=100, path="")
+    for subject, duration in (("a", 10), ("b", 200), ("c", 30), ("d", 400)):
+        log.record("query", "repo", f"SELECT ?o WHERE {{ <http://x/{subject}> <http://x/p> ?o }}", duration)
+    log.record("query", "repo", "SELECT * WHERE { ?s ?p ?o }", 50)
+
+    top = log.top(by="total_ms")
+    assert [row["count"] for row in top] == [4, 1]
+    assert top[0]["slow_count"] == 2
+    assert top[0]["total_ms"] == 640.0
+    assert (top[0]["p50_ms"], top[0]["p95_ms"], top[0]["max_ms"]) == (30.0, 400.0, 400.0)
+    assert [entry["duration_ms"] for entry in log.recent()] == [400.0, 200.0]
+    assert log.top(by="count", limit=1)[0]["fingerprint_id"] == top[0]["fingerprint_id"]
+
+
+def test_updates_and_overlong_queries_keep_no_sample(monkeypatch):
+    monkeypatch.setattr(slowQueryLog, 'SLOW_QUERY_MAX_SAMPLE', 200)
+    log = SlowQueryLog(threshold_ms=0, path="", explain_fn=lambda repository, query: "plan")
+    update = 'INSERT DATA { <http://x/a> <http://x/p> "secret payload" }'
+    entry = log.record("update", "repo", update, 5)
+    assert "secret payload" not in entry["query"]
+    assert log._fingerprints[entry["fingerprint_id"]].query is None
+
+    short = 'SELECT * WHERE { ?s <http://x/p> "v" }'
+    fid = log.record("query", "repo", short, 5)["fingerprint_id"]
+    log.record("query", "repo", short.replace('"v"', '"' + 'v' * 300 + '"'), 5)
+    assert log._fingerprints[fid].query == short
+
+    long_only = log.record("query", "repo", 'SELECT * WHERE { ?s <http://x/q> "' + 'v' * 300 + '" }', 5)
+    with pytest.raises(ValueError):
+        log.explain(long_only["fingerprint_id"])
+
+
+def test_slow_entries_are_persisted_and_trimmed(tmp_path):
+    path = str(tmp_path / "slow.jsonl")
+    log = SlowQueryLog(threshold_ms=0, size=3, path=path)
+    for n in range(7):
+        log.record("query", "repo", f"SELECT * WHERE {{ ?s ?p {n} }}", n)
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    # Trimmed to the newest three lines after the sixth append
+    assert [entry["duration_ms"] for entry in lines] == [3, 4, 5, 6]
+    assert [entry["duration_ms"] for entry in SlowQueryLog(threshold_ms=0, size=3, path=path).recent()] == [6, 5, 4]
+
+
+def _append_entries(path, size, count):
+    log = SlowQueryLog(threshold_ms=0, size=size, path=path)
+    for n in range(count):
+        log.record("query", "repo", "SELECT * WHERE { ?s ?p ?o } # " + "x" * 5000, n)
+
+
+@pytest.mark.parametrize("size", [1000, 50])
+def test_workers_append_whole_lines_to_one_file(tmp_path, size):
+    path = str(tmp_path / "slow.jsonl")
+    workers = [multiprocessing.Process(target=_append_entries, args=(path, size, 200)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    with open(path) as f:
+        entries = [json.loads(line) for line in f]
+    # Without trimming nothing is lost; with it, every worker trims to the newest lines of all of them
+    assert len(entries) == 800 if size == 1000 else len(entries) <= size + 4 * (size - 1)
+    assert {entry["fingerprint_id"] for entry in entries} == {fingerprint_id(query_fingerprint("SELECT * WHERE { ?s ?p ?o }"))}
@@ -0,0 +1,30 @@
+from tripleIndex import TripleIndex, parse_pattern_query, literal
+
+A = ('uri', 'http://x/a')
+B = ('uri', 'http://x/b')
+NAME = ('uri', 'http://x/name')
+G = ('uri', 'http://x/g')
+
+
+def test_pattern_query_recognised():
+    query = parse_pattern_query("PREFIX ex: <http://x/> SELECT DISTINCT ?o WHERE { ex:a ex:name ?o } LIMIT 5")
+    assert query.variables == ["o"]
+    assert query.pattern == (A, NAME, "o")
+    assert query.distinct and query.limit == 5
+
+
+def test_complex_query_not_recognised():
+    assert parse_pattern_query("SELECT ?o WHERE { ?s ?p ?o . ?o ?q ?r }") is None
+    assert parse_pattern_query("SELECT ?o WHERE { ex:a ?p ?o }") is None
+
+
+def test_match_and_remove_graph():
+    index = TripleIndex()
+    index.add(A, NAME, literal("A"), G)
+    index.add(B, NAME, literal("B"))
+    name = index.term_id(NAME)
+    assert len(list(index.match(None, name, None))) == 2
+    assert len(list(index.match(index.term_id(A), None, None))) == 1
+    index.remove_graph(G)
+    assert len(index) == 1
+    assert list(index.match(index.term_id(A), None, None)) == []
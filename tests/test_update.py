@@ -0,0 +1,72 @@
+import pytest
+
+from conftest import FakeResponse
+
+UPDATES = [{"id": "a", "update": "INSERT DATA { <http://x/a> <http://x/p> 1 }"},
+           {"id": "b", "update": "INSERT DATA { <http://x/b> <http://x/p> 'fail' }"},
+           {"id": "c", "update": "DELETE DATA { <http://x/c> <http://x/p> 3 } ;"}]
+
+
+@pytest.fixture
+def failing_graphdb(graphdb):
+    def answer(call):
+        if b'fail' in call.body:
+            raise RuntimeError("MALFORMED UPDATE")
+        return FakeResponse(b'', status_code=204)
+    graphdb.handler = answer
+    return graphdb
+
+
+def operations(response):
+    return {op["id"]: op for op in response.get_json()["operations"]}
+
+
+def test_batch_sends_one_request_per_group(client, ingraph, failing_graphdb, monkeypatch):
+    monkeypatch.setattr(ingraph, 'UPDATE_BATCH_GROUP_SIZE', 2)
+    updates = [UPDATES[0], UPDATES[2], {"id": "d", "update": "CLEAR GRAPH <http://g>"}]
+
+    response = client.post('/update/batch', json={"repository": "repo", "updates": updates})
+
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "success"
+    assert response.get_json()["graphdb_requests"] == 2
+    assert [call.body for call in failing_graphdb.calls] == [
+        b"INSERT DATA { <http://x/a> <http://x/p> 1 } ;\nDELETE DATA { <http://x/c> <http://x/p> 3 }",
+        b"CLEAR GRAPH <http://g>"]
+    assert all(call.url.endswith('/repositories/repo/statements') for call in failing_graphdb.calls)
+
+
+def test_failed_group_is_retried_operation_by_operation(client, failing_graphdb):
+    response = client.post('/update/batch', json={"repository": "repo", "updates": UPDATES})
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert (body["status"], body["succeeded"], body["failed"]) == ("partial", 2, 1)
+    # The grouped request, then each operation on its own
+    assert body["graphdb_requests"] == len(failing_graphdb.calls) == 4
+    assert {key: op["status"] for key, op in operations(response).items()} == \
+        {"a": "success", "b": "failed", "c": "success"}
+    assert operations(response)["b"]["error"] == "MALFORMED UPDATE"
+
+
+def test_atomic_batch_rolls_back_every_operation(client, failing_graphdb):
+    response = client.post('/update/batch', json={"repository": "repo", "atomic": True, "updates": UPDATES})
+
+    assert response.status_code == 500
+    body = response.get_json()
+    assert (body["status"], body["atomic"], body["graphdb_requests"]) == ("failed", True, 1)
+    assert len(failing_graphdb.calls) == 1
+    assert {op["status"] for op in body["operations"]} == {"rolled_back"}
+
+    response = client.post('/update/batch', json={"repository": "repo", "atomic": True,
+                                                  "updates": [UPDATES[0]["update"], UPDATES[2]["update"]]})
+    assert response.status_code == 200
+    assert [op["id"] for op in response.get_json()["operations"]] == [0, 1]
+    assert len(failing_graphdb.calls) == 2
+
+
+def test_batch_rejects_empty_operations(client, graphdb):
+    assert client.post('/update/batch', json={"updates": []}).status_code == 400
+    assert client.post('/update/batch', json={"updates": ["  "]}).status_code == 400
+    assert client.post('/update/batch', json={"updates": "CLEAR ALL"}).status_code == 400
+    assert graphdb.calls == []
@@ -0,0 +1,82 @@
+import io
+import json
+
+import rdfConvert
+
+DOCUMENT = {"@context": {"@vocab": "http://x/", "id": "@id", "type": "@type"},
+            "@graph": [{"id": f"http://x/s{n}", "type": "Station", "name": f"S{n}"} for n in range(5)]}
+
+
+def upload(client, document, **form):
+    data = {"repository": "repo", "count": "false", **form,
+            "file": (io.BytesIO(json.dumps(document).encode('utf-8')), "kg.jsonld")}
+    return client.post('/upload', data=data, content_type='multipart/form-data')
+
+
+def test_converted_upload_is_streamed_batch_by_batch(client, ingraph, graphdb, monkeypatch):
+    produced = []
+
+    def small_batches(document, graph=None, stats=None):
+        for batch in rdfConvert.iter_ntriples_batches(document, graph=graph, batch_triples=2, stats=stats):
+            produced.append(batch)
+            yield batch
+
+    monkeypatch.setattr(ingraph, 'iter_ntriples_batches', small_batches)
+    converted_when_sent = []
+    graphdb.on_chunk = lambda chunk: converted_when_sent.append(len(produced))
+    response = upload(client, DOCUMENT)
+
+    assert response.status_code == 200
+    assert response.get_json()["conversion"]["converted"] is True
+    [call] = graphdb.calls
+    assert call.headers['Content-Type'] == 'application/n-triples'
+    assert len(call.chunks) == len(produced) > 1
+    # Each batch is sent as soon as it is converted, never after the whole file
+    assert converted_when_sent == list(range(1, len(produced) + 1))
+    assert b'<http://x/s0> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://x/Station> .' in call.body
+
+
+def test_unsupported_json_ld_falls_back_to_graphdb_parser(client, graphdb):
+    document = {"@context": {"@vocab": "http://x/"}, "@id": "http://x/a",
+                "@reverse": {"knows": {"@id": "http://x/b"}}}
+    response = upload(client, document)
+
+    assert response.status_code == 200
+    assert response.get_json()["conversion"]["converted"] is False
+    assert "@reverse" in response.get_json()["conversion"]["reason"]
+    [call] = graphdb.calls
+    assert call.headers['Content-Type'] == 'application/ld+json'
+    assert json.loads(call.body) == document
+
+
+def test_invalid_iri_rejected_before_sending(client, graphdb):
+    response = upload(client, {"@id": "http://x/a b", "http://x/p": "v"})
+    assert response.status_code == 400
+    assert graphdb.calls == []
+
+
+def test_delta_upload_leaves_other_sources_of_a_shared_subject_alone(client, graphdb):
+    context = {"@vocab": "http://x/"}
+    stations = {"@context": context, "@id": "http://x/s1", "name": "Oslo S", "shared": "both"}
+    sensors = {"@context": context, "@id": "http://x/s1", "sensor": {"model": "T1"}, "shared": "both"}
+    for source, document in (("stations", stations), ("sensors", sensors)):
+        assert upload(client, document, mode="delta", source=source).status_code == 200
+
+    graphdb.calls.clear()
+    response = upload(client, {**stations, "name": "Oslo Sentral", "shared": None}, mode="delta", source="stations")
+
+    assert response.status_code == 200
+    assert response.get_json()["delta"]["triples_deleted"] == 2
+    update = graphdb.calls[-1].body.decode('utf-8')
+    assert update == ('DELETE DATA {\n  <http://x/s1> <http://x/name> "Oslo S" .\n} ;\n'
+                      'INSERT DATA {\n  <http://x/s1> <http://x/name> "Oslo Sentral" .\n}')
+
+    graphdb.calls.clear()
+    response = upload(client, {"@context": context, "@id": "http://x/s1", "shared": "both"},
+                      mode="delta", source="sensors")
+    assert response.status_code == 200
+    update = graphdb.calls[-1].body.decode('utf-8')
+    # Only the sensor's own blank node goes; the name belongs to the other source
+    assert update.startswith('DELETE { <http://x/s1> <http://x/sensor> ?b0 . ?b0 <http://x/model> "T1" . }')
+    deletes = update.split("INSERT DATA")[0]
+    assert "Oslo" not in deletes and "shared" not in deletes
@@ -0,0 +1,563 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple, Set, Iterable, Iterator, Callable
+
+from queryCache import normalize_query
+from rdfConvert import RDF, XSD
+from sharedState import WriteGenerations
+
+logger = logging.getLogger(__name__)
+
+# Repositories mirrored in memory, comma-separated or '*' for all; empty disables the replica
+TRIPLE_REPLICA = os.getenv("TRIPLE_REPLICA", "")
+TRIPLE_REPLICA_MAX_TRIPLES = int(os.getenv("TRIPLE_REPLICA_MAX_TRIPLES", "2000000"))  # larger repositories are not mirrored
+TRIPLE_REPLICA_MAX_ROWS = int(os.getenv("TRIPLE_REPLICA_MAX_ROWS", "10000"))  # larger results go to GraphDB
+# Re-export after /upload loads so statements inferred by the repository ruleset are mirrored too
+TRIPLE_REPLICA_INFERRED = os.getenv("TRIPLE_REPLICA_INFERRED", "true").lower() == "true"
+
+# ('uri', iri) | ('bnode', label) | ('literal', lexical form, datatype or None, language or None)
+Term = Tuple[Optional[str], ...]
+DEFAULT_GRAPH = ('default',)
+
+_NT_TERM = r'<[^>]*>|_:\S+|"(?:[^"\\]|\\.)*"(?:@[A-Za-z0-9-]+|\^\^<[^>]*>)?'
+_NQUADS_LINE_RE = re.compile(rf'^\s*(<[^>]*>|_:\S+)\s+(<[^>]*>)\s+({_NT_TERM})\s*(<[^>]*>|_:\S+)?\s*\.\s*$')
+_ESCAPE_RE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))', re.DOTALL)
+_ESCAPES = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+# Only "PREFIX ... SELECT [DISTINCT] vars WHERE { s p o } [LIMIT n]" is answered locally
+_PREFIX_RE = re.compile(r'\s*PREFIX\s+([A-Za-z][\w.-]*)?:\s*<([^<>"\s]*)>', re.IGNORECASE)
+_SELECT_RE = re.compile(r'\s*SELECT\s+(?:(DISTINCT|REDUCED)\s+)?(\*|(?:[?$][A-Za-z_]\w*\s*)+?)\s*'
+                        r'(?:WHERE\s*)?\{(.*)\}\s*(?:LIMIT\s+(\d+)\s*)?$', re.IGNORECASE | re.DOTALL)
+_PATTERN_TOKEN_RE = re.compile(r'''\s*(?:
+    (?P<var>[?$][A-Za-z_]\w*)
+  | (?P<iri><[^<>"{}|^`\\\s]*>)
+  | (?P<literal>(?:"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')(?:@(?P<lang>[A-Za-z]+(?:-[A-Za-z0-9]+)*)|\^\^(?P<dt><[^<>\s]*>|[A-Za-z][\w.-]*:[\w-]*))?)
+  | (?P<number>[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)
+  | (?P<bool>true|false)(?![\w:])
+  | (?P<a>a)(?![\w:])
+  | (?P<pname>(?:[A-Za-z][\w-]*(?:\.[\w-]+)*)?:(?:[\w-]|\.(?=[\w-]))*)
+  | (?P<dot>\.)
+)''', re.VERBOSE)
+
+
+def _unescape(value: str) -> str:
+    def replace(match):
+        if match.group(1) or match.group(2):
+            return chr(int(match.group(1) or match.group(2), 16))
+        return _ESCAPES.get(match.group(3), match.group(0))
+    return _ESCAPE_RE.sub(replace, value) if '\\' in value else value
+
+
+def literal(lexical: str, datatype: Optional[str] = None, language: Optional[str] = None) -> Term:
+    """Canonical literal term: xsd:string is implicit and language tags are lower case"""
+    if language:
+        return ('literal', lexical, None, language.lower())
+    return ('literal', lexical, None if datatype == f"{XSD}string" else datatype, None)
+
+
+def parse_term(text: str) -> Term:
+    """Parse one N-Triples term"""
+    if text.startswith('<'):
+        return ('uri', _unescape(text[1:-1]))
+    if text.startswith('_:'):
+        return ('bnode', text[2:])
+    end = text.rindex('"')
+    lexical = _unescape(text[1:end])
+    suffix = text[end + 1:]
+    if suffix.startswith('@'):
+        return literal(lexical, language=suffix[1:])
+    if suffix.startswith('^^'):
+        return literal(lexical, datatype=_unescape(suffix[3:-1]))
+    return literal(lexical)
+
+
+def parse_nquads_line(line: str) -> Optional[Tuple[Term, Term, Term, Term]]:
+    """Split an N-Triples/N-Quads statement into (s, p, o, graph); None for blank lines and comments"""
+    match = _NQUADS_LINE_RE.match(line)
+    if not match:
+        return None
+    graph = parse_term(match.group(4)) if match.group(4) else DEFAULT_GRAPH
+    return parse_term(match.group(1)), parse_term(match.group(2)), parse_term(match.group(3)), graph
+
+
+def term_to_json(term: Term) -> Dict[str, str]:
+    """SPARQL JSON results representation of a term"""
+    if term[0] == 'uri':
+        return {"type": "uri", "value": term[1]}
+    if term[0] == 'bnode':
+        return {"type": "bnode", "value": term[1]}
+    value = {"type": "literal", "value": term[1]}
+    if term[3]:
+        value["xml:lang"] = term[3]
+    elif term[2]:
+        value["datatype"] = term[2]
+    return value
+
+
+class PatternQuery:
+    """A SELECT over a single triple pattern; positions hold a variable name (str) or a constant Term"""
+
+    def __init__(self, variables: List[str], pattern: Tuple[Any, Any, Any], distinct: bool, limit: Optional[int]):
+        self.variables = variables
+        self.pattern = pattern
+        self.distinct = distinct
+        self.limit = limit
+
+
+@lru_cache(maxsize=1024)
+def parse_pattern_query(query: str) -> Optional[PatternQuery]:
+    """Recognise a single triple-pattern SELECT; anything else returns None and goes to GraphDB"""
+    text = normalize_query(query)
+    prefixes: Dict[str, str] = {}
+    position = 0
+    while True:
+        match = _PREFIX_RE.match(text, position)
+        if not match:
+            break
+        prefixes[match.group(1) or ''] = match.group(2)
+        position = match.end()
+    select = _SELECT_RE.match(text, position)
+    if not select:
+        return None
+
+    def expand(pname: str) -> Optional[str]:
+        prefix, _, local = pname.partition(':')
+        return prefixes[prefix] + local if prefix in prefixes else None
+
+    terms: List[Any] = []
+    body = select.group(3)
+    position = 0
+    while position < len(body.rstrip()):
+        token = _PATTERN_TOKEN_RE.match(body, position)
+        if not token:
+            return None
+        position = token.end()
+        kind = token.lastgroup if token.lastgroup not in ('lang', 'dt') else 'literal'
+        if kind == 'dot':
+            if body[position:].strip():
+                return None
+            break
+        if kind == 'var':
+            terms.append(token.group('var')[1:])
+        elif kind == 'iri':
+            terms.append(('uri', _unescape(token.group('iri')[1:-1])))
+        elif kind == 'pname':
+            iri = expand(token.group('pname'))
+            if iri is None:
+                return None
+            terms.append(('uri', iri))
+        elif kind == 'a':
+            terms.append(('uri', f"{RDF}type"))
+        elif kind == 'literal':
+            lexical = _unescape(token.group('literal')[1:token.group('literal').rindex(token.group('literal')[0])])
+            datatype = token.group('dt')
+            if datatype:
+                datatype = datatype[1:-1] if datatype.startswith('<') else expand(datatype)
+                if datatype is None:
+                    return None
+            terms.append(literal(lexical, datatype, token.group('lang')))
+        elif kind == 'number':
+            number = token.group('number')
+            datatype = 'double' if 'e' in number.lower() else 'decimal' if '.' in number else 'integer'
+            terms.append(literal(number, f"{XSD}{datatype}"))
+        elif kind == 'bool':
+            terms.append(literal(token.group('bool'), f"{XSD}boolean"))
+    if len(terms) != 3 or not isinstance(terms[1], str) and terms[1][0] != 'uri':
+        return None
+    if isinstance(terms[0], tuple) and terms[0][0] == 'literal':
+        return None
+
+    pattern_vars = list(dict.fromkeys(term for term in terms if isinstance(term, str)))
+    if select.group(2).strip() == '*':
+        variables = pattern_vars
+    else:
+        variables = [name[1:] for name in select.group(2).split()]
+        if any(name not in pattern_vars for name in variables):
+            return None
+    limit = int(select.group(4)) if select.group(4) else None
+    return PatternQuery(variables, tuple(terms), bool(select.group(1)), limit)
+
+
+class TripleIndex:
+    """Interned-term triple store with SPO, POS and OSP indexes and per-graph membership"""
+
+    def __init__(self):
+        self._ids: Dict[Term, int] = {}
+        self._terms: List[Term] = []
+        self.spo: Dict[int, Dict[int, Set[int]]] = {}
+        self.pos: Dict[int, Dict[int, Set[int]]] = {}
+        self.osp: Dict[int, Dict[int, Set[int]]] = {}
+        # Graph id -> its statements, and how many graphs hold each statement
+        self._graphs: Dict[int, Set[Tuple[int, int, int]]] = {}
+        self._refs: Dict[Tuple[int, int, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def intern(self, term: Term) -> int:
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = self._ids[term] = len(self._terms)
+            self._terms.append(term)
+        return term_id
+
+    def term_id(self, term: Term) -> Optional[int]:
+        return self._ids.get(term)
+
+    def term(self, term_id: int) -> Term:
+        return self._terms[term_id]
+
+    def add(self, s: Term, p: Term, o: Term, graph: Term = DEFAULT_GRAPH):
+        statement = (self.intern(s), self.intern(p), self.intern(o))
+        members = self._graphs.setdefault(self.intern(graph), set())
+        if statement in members:
+            return
+        members.add(statement)
+        refs = self._refs.get(statement, 0)
+        self._refs[statement] = refs + 1
+        if refs == 0:
+            s_id, p_id, o_id = statement
+            self.spo.setdefault(s_id, {}).setdefault(p_id, set()).add(o_id)
+            self.pos.setdefault(p_id, {}).setdefault(o_id, set()).add(s_id)
+            self.osp.setdefault(o_id, {}).setdefault(s_id, set()).add(p_id)
+
+    def remove_graph(self, graph: Term):
+        """Drop every statement of one graph (statements also held by other graphs stay)"""
+        graph_id = self._ids.get(graph)
+        for statement in self._graphs.pop(graph_id, set()) if graph_id is not None else ():
+            refs = self._refs[statement] - 1
+            if refs:
+                self._refs[statement] = refs
+                continue
+            del self._refs[statement]
+            s_id, p_id, o_id = statement
+            _discard(self.spo, s_id, p_id, o_id)
+            _discard(self.pos, p_id, o_id, s_id)
+            _discard(self.osp, o_id, s_id, p_id)
+
+    def match(self, s: Optional[int], p: Optional[int], o: Optional[int]) -> Iterator[Tuple[int, int, int]]:
+        """Statements matching a pattern of term ids, None being a wildcard"""
+        if s is not None:
+            by_predicate = self.spo.get(s, {})
+            predicates = [p] if p is not None else list(by_predicate)
+            for p_id in predicates:
+                objects = by_predicate.get(p_id, ())
+                if o is not None:
+                    if o in objects:
+                        yield s, p_id, o
+                else:
+                    for o_id in objects:
+                        yield s, p_id, o_id
+        elif p is not None:
+            by_object = self.pos.get(p, {})
+            for o_id in ([o] if o is not None else list(by_object)):
+                for s_id in by_object.get(o_id, ()):
+                    yield s_id, p, o_id
+        elif o is not None:
+            for s_id, predicates in self.osp.get(o, {}).items():
+                for p_id in predicates:
+                    yield s_id, p_id, o
+        else:
+            for s_id, by_predicate in self.spo.items():
+                for p_id, objects in by_predicate.items():
+                    for o_id in objects:
+                        yield s_id, p_id, o_id
+
+    def stats(self) -> Dict[str, Any]:
+        return {"triples": len(self._refs), "terms": len(self._terms), "graphs": len(self._graphs),
+                "subjects": len(self.spo), "predicates": len(self.pos)}
+
+
+def _discard(index: Dict[int, Dict[int, Set[int]]], a: int, b: int, c: int):
+    inner = index[a]
+    values = inner[b]
+    values.discard(c)
+    if not values:
+        del inner[b]
+        if not inner:
+            del index[a]
+
+
+class ReplicaTooLarge(Exception):
+    """A repository holds more statements than TRIPLE_REPLICA_MAX_TRIPLES"""
+
+
+class _Replica:
+    def __init__(self):
+        self.index: Optional[TripleIndex] = None
+        self.state = "empty"  # empty | building | ready | stale | too_large | failed
+        self.generation = 0
+        # Shared write counter the index reflects; another worker's write moves it on
+        self.shared_seen: Optional[int] = None
+        self.queued = False
+        self.built_at: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.hits = 0
+        self.lock = threading.RLock()
+
+
+class TripleReplica:
+    """In-process read replicas of small repositories, answering single triple-pattern and entity lookups locally"""
+
+    def __init__(self, export_fn: Callable[[str], Iterable[str]],
+                 repositories: str = TRIPLE_REPLICA,
+                 max_triples: int = TRIPLE_REPLICA_MAX_TRIPLES,
+                 max_rows: int = TRIPLE_REPLICA_MAX_ROWS,
+                 inferred: bool = TRIPLE_REPLICA_INFERRED,
+                 shared: Optional[WriteGenerations] = None):
+        self.export_fn = export_fn
+        self.shared = shared
+        names = [name.strip() for name in repositories.split(',') if name.strip()]
+        self.all_repositories = '*' in names
+        self.repositories = set(names) - {'*'}
+        self.max_triples = max_triples
+        self.max_rows = max_rows
+        self.inferred = inferred
+        self._lock = threading.Lock()
+        self._replicas: Dict[str, _Replica] = {}
+        self._builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="triple-replica")
+
+    def enabled(self, repository: str) -> bool:
+        return self.all_repositories or repository in self.repositories
+
+    def _replica(self, repository: str) -> _Replica:
+        with self._lock:
+            replica = self._replicas.get(repository)
+            if replica is None:
+                replica = self._replicas[repository] = _Replica()
+            return replica
+
+    def _ready(self, repository: str) -> Optional[_Replica]:
+        """The repository's replica if it can answer now; schedules the first build on demand"""
+        if not self.enabled(repository):
+            return None
+        replica = self._replica(repository)
+        if replica.state == "ready":
+            if self.shared is None or self._shared_current(repository) == replica.shared_seen:
+                return replica
+            # Another worker process wrote to the repository since this index was built
+            self.invalidate(repository)
+            return None
+        if replica.state in ("empty", "failed"):
+            self.invalidate(repository)
+        return None
+
+    def _shared_current(self, repository: str) -> Optional[int]:
+        try:
+            return self.shared.current(repository)
+        except OSError:
+            return None
+
+    # Reads
+
+    def select(self, repository: str, query: str) -> Optional[bytes]:
+        """SPARQL JSON results for a single triple-pattern SELECT, or None if GraphDB has to answer it"""
+        if not self.enabled(repository):
+            return None
+        parsed = parse_pattern_query(query)
+        if parsed is None:
+            return None
+        replica = self._ready(repository)
+        if replica is None:
+            return None
+
+        with replica.lock:
+            index = replica.index
+            ids: List[Optional[int]] = []
+            for position in parsed.pattern:
+                if isinstance(position, str):
+                    ids.append(None)
+                    continue
+                term_id = index.term_id(position)
+                if term_id is None:
+                    ids = []
+                    break
+                ids.append(term_id)
+            if not ids and parsed.pattern:
+                rows = []
+            elif all(term_id is None for term_id in ids):
+                # A full scan is not a hot lookup
+                return None
+            else:
+                rows = self._project(index, parsed, ids)
+                if rows is None:
+                    return None
+            replica.hits += 1
+
+        body = {"head": {"vars": parsed.variables}, "results": {"bindings": rows}}
+        return json.dumps(body, separators=(',', ':')).encode('utf-8')
+
+    def _project(self, index: TripleIndex, parsed: PatternQuery, ids: List[Optional[int]]) -> Optional[List[Dict[str, Any]]]:
+        rows = []
+        seen = set()
+        limit = parsed.limit if parsed.limit is not None else self.max_rows + 1
+        for statement in index.match(*ids):
+            binding: Dict[str, int] = {}
+            consistent = True
+            for position, term_id in zip(parsed.pattern, statement):
+                if isinstance(position, str):
+                    if binding.setdefault(position, term_id) != term_id:
+                        consistent = False
+                        break
+            if not consistent:
+                continue
+            key = tuple(binding[name] for name in parsed.variables)
+            if parsed.distinct:
+                if key in seen:
+                    continue
+                seen.add(key)
+            rows.append({name: term_to_json(index.term(term_id)) for name, term_id in zip(parsed.variables, key)})
+            if len(rows) >= limit:
+                break
+        if parsed.limit is None and len(rows) > self.max_rows:
+            return None
+        return rows
+
+    def describe(self, repository: str, iri: str) -> Optional[Dict[str, Any]]:
+        """Outgoing and incoming statements of an entity, or None if the replica is not ready"""
+        replica = self._ready(repository)
+        if replica is None:
+            return None
+        with replica.lock:
+            index = replica.index
+            replica.hits += 1
+            term_id = index.term_id(('uri', iri))
+            if term_id is None:
+                return {"outgoing": [], "incoming": []}
+            outgoing = [{"predicate": term_to_json(index.term(p)), "object": term_to_json(index.term(o))}
+                        for _, p, o in index.match(term_id, None, None)]
+            incoming = [{"subject": term_to_json(index.term(s)), "predicate": term_to_json(index.term(p))}
+                        for s, p, _ in index.match(None, None, term_id)]
+        return {"outgoing": outgoing, "incoming": incoming}
+
+    # Writes
+
+    def apply_load(self, repository: str, batches: List[bytes], graph: Optional[str], replace: bool,
+                   write_counters: Optional[Tuple[int, int]] = None):
+        """Mirror a successful N-Triples/N-Quads load or clear (graph None, 'default' or an IRI, as for /upload)
+
+        write_counters are the shared counter values recorded before and after the write; any other
+        write in between, or one the index had not seen before, means rebuilding from GraphDB instead.
+        """
+        if not self.enabled(repository):
+            return
+        replica = self._replica(repository)
+        with replica.lock:
+            # A write the index has not seen, here or in another worker, rules out applying this one on top
+            missed = False
+            if self.shared is not None and write_counters is not None:
+                before, after = write_counters
+                missed = after != before + 1 or (replica.shared_seen != before - 1 and not (replace and graph is None))
+                replica.shared_seen = after
+            if replace and graph is None and not missed:
+                # The whole repository was replaced, so earlier content (or size) no longer matters
+                replica.index = TripleIndex()
+                replica.state = "ready"
+            if replica.state != "ready" or missed:
+                applied = False
+            else:
+                index = replica.index
+                if replace and graph is not None:
+                    index.remove_graph(DEFAULT_GRAPH if graph == 'default' else ('uri', graph))
+                for batch in batches:
+                    for line in batch.decode('utf-8').splitlines():
+                        statement = parse_nquads_line(line)
+                        if statement:
+                            index.add(*statement)
+                if len(index) > self.max_triples:
+                    replica.generation += 1
+                    replica.index, replica.state = None, "too_large"
+                    return
+                applied = True
+        if not applied:
+            self.invalidate(repository)
+        elif self.inferred:
+            # Keep answering from the applied load while a re-export picks up what GraphDB inferred from it
+            self.invalidate(repository, keep_serving=True)
+
+    def invalidate(self, repository: str, keep_serving: bool = False):
+        """Schedule a rebuild from GraphDB after a write; stop serving in the meantime unless told otherwise"""
+        if not self.enabled(repository):
+            return
+        replica = self._replica(repository)
+        with replica.lock:
+            replica.generation += 1
+            if replica.state == "too_large":
+                # Only a full clear (apply_load with graph None) makes a large repository worth exporting again
+                return
+            if not keep_serving:
+                replica.state = "building" if replica.state == "empty" else "stale"
+                replica.index = None
+            if replica.queued:
+                return
+            replica.queued = True
+        self._builder.submit(self._rebuild, repository)
+
+    def _rebuild(self, repository: str):
+        replica = self._replica(repository)
+        with replica.lock:
+            replica.queued = False
+            generation = replica.generation
+        # Read before exporting: a write during the export moves the counter past it
+        shared_seen = self._shared_current(repository) if self.shared is not None else None
+        started = time.monotonic()
+        index = TripleIndex()
+        try:
+            for line in self.export_fn(repository):
+                statement = parse_nquads_line(line)
+                if statement:
+                    index.add(*statement)
+                    if len(index) > self.max_triples:
+                        raise ReplicaTooLarge()
+        except ReplicaTooLarge:
+            with replica.lock:
+                if replica.generation == generation:
+                    replica.index, replica.state = None, "too_large"
+            logger.warning(f"Repository '{repository}' exceeds {self.max_triples} triples, not mirrored in memory")
+            return
+        except Exception as e:
+            with replica.lock:
+                if replica.generation == generation:
+                    replica.index, replica.state, replica.error = None, "failed", str(e)
+            logger.warning(f"Could not build the in-memory replica of '{repository}': {str(e)}")
+            return
+
+        with replica.lock:
+            # A write during the export makes this snapshot outdated; its own rebuild is already queued
+            if replica.generation != generation:
+                return
+            replica.index = index
+            replica.state = "ready"
+            replica.shared_seen = shared_seen
+            replica.error = None
+            replica.built_at = time.time()
+            replica.build_seconds = round(time.monotonic() - started, 3)
+        logger.info(f"In-memory replica of '{repository}' ready: {len(index)} triples in {replica.build_seconds}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            replicas = dict(self._replicas)
+        result = {}
+        for repository, replica in replicas.items():
+            with replica.lock:
+                result[repository] = {
+                    "state": replica.state,
+                    "hits": replica.hits,
+                    "built_at": replica.built_at,
+                    "build_seconds": replica.build_seconds,
+                    "error": replica.error,
+                    **(replica.index.stats() if replica.index is not None else {}),
+                }
+        return {
+            "repositories": "*" if self.all_repositories else sorted(self.repositories),
+            "max_triples": self.max_triples,
+            "refresh_after_load": self.inferred,
+            "replicas": result,
+        }
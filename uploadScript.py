@@ -1,6 +1,27 @@
 import requests
 import os
 
+def post_jsonld(content, filename, repository="second-graph", server_url="http://localhost:5000",
+                session=None, count=True, timeout=None):
+    """
+    POST JSON-LD content to the /upload endpoint and return the raw response
+    
+    Args:
+        content (bytes): JSON-LD document
+        filename (str): File name reported to the server
+        repository (str): Repository name (default: "second-graph")
+        server_url (str): Server URL (default: "http://localhost:5000")
+        session (requests.Session): Optional session to reuse connections
+        count (bool): Ask the server to count the repository triples afterwards
+        timeout (float): Optional request timeout in seconds
+    """
+    files = {"file": (os.path.basename(filename), content, "application/ld+json")}
+    data = {"repository": repository}
+    if not count:
+        data["count"] = "false"
+    sender = session or requests
+    return sender.post(f"{server_url}/upload", files=files, data=data, timeout=timeout)
+
 def upload_jsonld_file(file_path, repository="second-graph", server_url="http://localhost:5000"):
     """
     Upload a JSON-LD file to GraphDB repository
@@ -19,26 +40,25 @@ def upload_jsonld_file(file_path, repository="second-graph", server_url="http://
     try:
         # Prepare the file for upload
         with open(file_path, 'rb') as file:
-            files = {"file": file}
-            data = {"repository": repository}
-            
-            print(f"Uploading {file_path} to repository '{repository}'...")
-            
-            # Make the POST request
-            response = requests.post(f"{server_url}/upload", files=files, data=data)
-            
-            # Check response
-            if response.status_code == 200:
-                result = response.json()
-                print("✅ Upload successful!")
-                print(f"Repository: {result.get('repository')}")
-                print(f"Filename: {result.get('filename')}")
-                print(f"Total triples: {result.get('total_triples')}")
-                return True
-            else:
-                print(f"❌ Upload failed with status code: {response.status_code}")
-                print(f"Error: {response.text}")
-                return False
+            content = file.read()
+        
+        print(f"Uploading {file_path} to repository '{repository}'...")
+        
+        # Make the POST request
+        response = post_jsonld(content, file_path, repository, server_url)
+        
+        # Check response
+        if response.status_code == 200:
+            result = response.json()
+            print("✅ Upload successful!")
+            print(f"Repository: {result.get('repository')}")
+            print(f"Filename: {result.get('filename')}")
+            print(f"Total triples: {result.get('total_triples')}")
+            return True
+        else:
+            print(f"❌ Upload failed with status code: {response.status_code}")
+            print(f"Error: {response.text}")
+            return False
                 
     except requests.exceptions.ConnectionError:
         print("❌ Connection error: Make sure the server is running on http://localhost:5000")